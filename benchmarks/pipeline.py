@@ -0,0 +1,219 @@
+"""
+End-to-end benchmark of the experiment pipeline on synthetic data.
+
+For each dataset (diabetes, compas) and row count, a synthetic extract is
+generated once (benchmarks/synthetic.py, cached under cache/bench_data/)
+and a fresh worker process times the pipeline stages on it:
+
+  make_splits    load the CSV and build train / ID test / OOD splits (no disk cache)
+  encode         one-hot CSR and ordinal layouts (feature_store)
+  fit:<engine>   fit each model engine on the training split
+  group_metrics  overall + per-group metrics on ID and OOD
+  store          run records: arrays, run JSON and the SQLite index, --runs times
+  load_all_runs  read every stored run back
+
+Everything is written to a temporary directory; experiments/ is never
+touched and no real data is needed.
+
+    python benchmarks/pipeline.py                            # 10k and 100k rows
+    python benchmarks/pipeline.py --rows 1000000,10000000 --datasets diabetes
+    python benchmarks/pipeline.py --save-baseline            # record benchmarks/pipeline_baseline.json
+    python benchmarks/pipeline.py --check                    # exit 1 if any stage regressed
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+BASELINE_PATH = Path(__file__).resolve().parent / "pipeline_baseline.json"
+DATA_DIR = REPO_ROOT / "cache" / "bench_data"
+
+# dataset -> env var its loader reads the CSV path from
+DATA_ENV = {
+    "diabetes": "PROMETHEUS_DIABETES_CSV",
+    "compas": "PROMETHEUS_COMPAS_CSV",
+}
+
+ENGINES = ("logreg", "hist_gb")
+
+# Engine whose predictions feed group_metrics and store
+SCORING_ENGINE = "logreg"
+
+# A stage is flagged when it is this much slower than baseline (ratio and absolute floor)
+REGRESSION_RATIO = 1.5
+REGRESSION_FLOOR_MS = 50.0
+
+
+def _timed(timings: Dict[str, List[float]], stage: str, fn, *args, **kwargs):
+    t = time.perf_counter()
+    out = fn(*args, **kwargs)
+    timings.setdefault(stage, []).append((time.perf_counter() - t) * 1000.0)
+    return out
+
+
+def _redirect_store(tmp: Path) -> None:
+    """Point every writer of experiments/ at tmp."""
+    from src import array_store, results_store, run_experiment
+
+    results_store.EXPERIMENTS_DIR = tmp
+    results_store.RESULTS_DB = tmp / "results.sqlite"
+    array_store.EXPERIMENTS_DIR = tmp
+    array_store.ARRAYS_DIR = tmp / "arrays"
+    run_experiment.EXPERIMENTS_DIR = tmp
+
+
+def worker(repeats: int, n_runs: int) -> Dict:
+    """Time each stage in this process on the dataset selected by PROMETHEUS_DATASET."""
+    from dataclasses import replace
+
+    from src.datasets import get_dataset
+    from src.feature_store import clear_encoded_cache, get_encoded, get_ordinal
+    from src.instrumentation import _peak_rss_mb
+    from src.metrics import compute_metrics
+    from src.models import build_model, get_engine
+    from src.results_store import load_all_runs
+    from src.run_experiment import _record_run
+    from src.split_cache import clear_split_cache, get_splits, split_key
+    from src.strategies import StrategyConfig
+
+    # The splitters import sklearn lazily; keep that one-off cost out of make_splits
+    import sklearn.model_selection  # noqa: F401
+
+    ds = get_dataset()
+    timings: Dict[str, List[float]] = {}
+
+    for _ in range(repeats):
+        clear_split_cache()
+        clear_encoded_cache()
+        splits = _timed(timings, "make_splits", get_splits, ds, use_disk=False)
+        t = time.perf_counter()
+        enc, ordinal = get_encoded(ds), get_ordinal(ds)
+        timings.setdefault("encode", []).append((time.perf_counter() - t) * 1000.0)
+
+    config = StrategyConfig(name="bench")
+    fitted = {}
+    for engine in ENGINES:
+        cfg = replace(config, model=engine)
+        feats = enc if get_engine(engine).sparse else ordinal
+        for _ in range(repeats):
+            model = build_model(cfg, feats.X_train.shape[0], categorical=feats.categorical)
+            _timed(timings, f"fit:{engine}", model.fit, feats.X_train, feats.y_train)
+        fitted[engine] = model, feats
+
+    # Score with one engine, on the layout it was fit on
+    model, feats = fitted[SCORING_ENGINE]
+    id_proba = model.predict_proba(feats.X_id)[:, 1]
+    ood_proba = model.predict_proba(feats.X_ood)[:, 1]
+    for _ in range(repeats):
+        t = time.perf_counter()
+        compute_metrics(enc.y_id, id_proba, groups=enc.groups_id)
+        compute_metrics(enc.y_ood, ood_proba, groups=enc.groups_ood)
+        timings.setdefault("group_metrics", []).append((time.perf_counter() - t) * 1000.0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _redirect_store(Path(tmp))
+        key = split_key(ds)
+        with contextlib.redirect_stdout(io.StringIO()):  # _record_run prints each record
+            for i in range(n_runs):
+                _timed(timings, "store", _record_run, replace(config, name=f"bench{i}"), f"{i:016x}", key,
+                       enc.y_id, enc.y_ood, enc.groups_id, enc.groups_ood, id_proba, ood_proba)
+        for _ in range(repeats):
+            runs = _timed(timings, "load_all_runs", load_all_runs)
+        assert len(runs) == n_runs
+
+    return {
+        "rows": sum(len(part) for part in splits[0::2]),
+        "stages": {stage: statistics.median(times) for stage, times in timings.items()},
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def dataset_csv(dataset: str, rows: int, seed: int = 0) -> Path:
+    """Synthetic extract for (dataset, rows), generated on first use."""
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from synthetic import write_csv
+
+    path = DATA_DIR / f"{dataset}-{rows}-s{seed}.csv"
+    if not path.exists():
+        print(f"Generating {path.name} ...", flush=True)
+        write_csv(dataset, rows, path, seed=seed)
+    return path
+
+
+def measure(datasets: List[str], rows: List[int], repeats: int = 3, n_runs: int = 20) -> Dict[str, Dict]:
+    results = {}
+    for dataset in datasets:
+        for n in rows:
+            env = dict(os.environ, PROMETHEUS_DATASET=dataset, PROMETHEUS_TRACE="0",
+                       PROMETHEUS_WORKERS="1", **{DATA_ENV[dataset]: str(dataset_csv(dataset, n))})
+            out = subprocess.run([sys.executable, __file__, "--worker", "--repeats", str(repeats),
+                                  "--runs", str(n_runs)],
+                                 cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+            if out.returncode != 0:
+                raise RuntimeError(f"{dataset} @ {n} rows failed:\n{out.stderr}")
+            results[f"{dataset}@{n}"] = json.loads(out.stdout.strip().splitlines()[-1])
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict]) -> List[str]:
+    regressions = []
+    for name, res in results.items():
+        if name not in baseline:
+            continue
+        for stage, cur_ms in res["stages"].items():
+            base_ms = baseline[name]["stages"].get(stage)
+            if base_ms is None:
+                continue
+            if cur_ms > base_ms * REGRESSION_RATIO and cur_ms - base_ms > REGRESSION_FLOOR_MS:
+                regressions.append(f"{name} {stage}: {base_ms:.0f} ms -> {cur_ms:.0f} ms")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--datasets", default="diabetes,compas")
+    parser.add_argument("--rows", default="10000,100000", help="Comma-separated row counts")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=20, help="Run records written by the store stage")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        sys.path.insert(0, str(REPO_ROOT))
+        print(json.dumps(worker(args.repeats, args.runs)))
+        return 0
+
+    results = measure(args.datasets.split(","), [int(n) for n in args.rows.split(",")],
+                      repeats=args.repeats, n_runs=args.runs)
+    for name, res in results.items():
+        stages = "  ".join(f"{stage} {ms:.0f}" for stage, ms in res["stages"].items())
+        print(f"{name:<18} {res['rows']:>9} rows  {res['peak_rss_mb']:7.0f} MB   [{stages}] ms")
+
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps(results, indent=2))
+        print("Saved baseline to", BASELINE_PATH)
+
+    if args.check:
+        if not BASELINE_PATH.exists():
+            print("No baseline at", BASELINE_PATH)
+            return 1
+        regressions = compare(results, json.loads(BASELINE_PATH.read_text()))
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
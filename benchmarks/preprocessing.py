@@ -0,0 +1,108 @@
+"""
+Preprocessing benchmark: object-dtype splits with per-row label mapping
+(the pre-compaction path) against compact_splits with vectorized labels.
+
+Both paths start from the same raw make_splits output of the current
+dataset (PROMETHEUS_DATASET) and end with the encoded matrices
+feature_store builds. Reported per path: median wall time of each stage,
+peak traced allocation, and the in-memory size of the split frames.
+
+    python benchmarks/preprocessing.py
+    python benchmarks/preprocessing.py --repeats 5
+"""
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.datasets import get_dataset  # noqa: E402
+from src.preprocessing import compact_splits, encode_labels  # noqa: E402
+
+
+def _legacy_labels(splits) -> List[np.ndarray]:
+    return [y.apply(lambda v: 0 if v == "NO" else 1).to_numpy() for y in splits[1::2]]
+
+
+def _compact_labels(splits) -> List[np.ndarray]:
+    return [encode_labels(y).to_numpy() for y in splits[1::2]]
+
+
+def _encode(splits) -> List[sp.csr_matrix]:
+    """Same column selection and encoder as feature_store.build_encoded."""
+    from sklearn.preprocessing import OneHotEncoder
+
+    X_train = splits[0]
+    cat_cols = list(X_train.select_dtypes(include=["object", "category"]).columns)
+    num_cols = list(X_train.select_dtypes(include=["number"]).columns)
+    encoder = OneHotEncoder(handle_unknown="ignore", sparse_output=True).fit(X_train[cat_cols])
+    return [sp.hstack([sp.csr_matrix(X[num_cols].to_numpy(dtype=np.float64)),
+                       encoder.transform(X[cat_cols])], format="csr")
+            for X in splits[0::2]]
+
+
+def _frame_mb(splits) -> float:
+    return sum(int(np.sum(part.memory_usage(deep=True))) for part in splits) / 1e6
+
+
+def _timed(fn: Callable, *args) -> Tuple[float, object]:
+    t = time.perf_counter()
+    out = fn(*args)
+    return (time.perf_counter() - t) * 1000.0, out
+
+
+def _run_path(raw, compact: bool) -> Dict[str, float]:
+    tracemalloc.start()
+    prep_ms, splits = _timed(compact_splits, raw) if compact else (0.0, raw)
+    label_ms, labels = _timed(_compact_labels if compact else _legacy_labels, splits)
+    encode_ms, _ = _timed(_encode, splits)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "compact_ms": prep_ms,
+        "labels_ms": label_ms,
+        "encode_ms": encode_ms,
+        "total_ms": prep_ms + label_ms + encode_ms,
+        "peak_mb": peak / 1e6,
+        "frames_mb": _frame_mb(splits),
+        "_labels": labels,
+    }
+
+
+def measure(repeats: int = 3) -> Dict[str, Dict[str, float]]:
+    raw = tuple(get_dataset().make_splits())
+    results = {}
+    for name, compact in (("object", False), ("compact", True)):
+        runs = [_run_path(raw, compact) for _ in range(repeats)]
+        results[name] = {key: statistics.median(r[key] for r in runs)
+                         for key in runs[0] if not key.startswith("_")}
+        results[name]["_labels"] = runs[0]["_labels"]
+
+    # Both paths must agree on the labels they produce
+    for a, b in zip(results["object"].pop("_labels"), results["compact"].pop("_labels")):
+        assert np.array_equal(a, b), "label encodings differ"
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    results = measure(repeats=args.repeats)
+    keys = list(results["object"])
+    print(f"{'':<10}" + "".join(f"{k:>12}" for k in keys))
+    for name, res in results.items():
+        print(f"{name:<10}" + "".join(f"{res[k]:12.1f}" for k in keys))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Import-time benchmark for the project's entry points.
+
+Each entry point is imported in a fresh interpreter several times; the
+median wall time is reported, along with the slowest modules from
+`python -X importtime`.
+
+    python benchmarks/startup.py                   # report
+    python benchmarks/startup.py --save-baseline   # record benchmarks/startup_baseline.json
+    python benchmarks/startup.py --check           # exit 1 if any entry point regressed
+
+The committed baseline was recorded on a single-core reference machine;
+re-record it with --save-baseline on the machine that runs --check.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+BASELINE_PATH = Path(__file__).resolve().parent / "startup_baseline.json"
+
+# name -> code run in a fresh interpreter
+ENTRY_POINTS = {
+    "src.agent_graph": "import src.agent_graph",
+    "src.simple_agent_loop": "import src.simple_agent_loop",
+    "src.llm_client": "import src.llm_client",
+    "src.run_experiment": "import src.run_experiment",
+    "src.results_text": "import src.results_text",
+    "src.analyze_results": "import src.analyze_results",
+}
+
+# A run is flagged when it is this much slower than baseline (ratio and absolute floor)
+REGRESSION_RATIO = 1.5
+REGRESSION_FLOOR_MS = 50.0
+
+
+def _time_import(code: str) -> float:
+    timer = f"import time; t = time.perf_counter(); {code}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", timer], cwd=REPO_ROOT,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1]) * 1000.0
+
+
+def _shallow_imports(code: str) -> List[Tuple[str, float]]:
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_ROOT,
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2][1:]
+        # Nesting is shown by indentation (2 spaces per level). Keep the
+        # entry point and its direct imports so nothing is double counted.
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        if depth <= 1:
+            rows.append((name.strip(), int(parts[1]) / 1000.0))
+    return rows
+
+
+def _slowest_modules(code: str, top: int) -> List[Tuple[str, float]]:
+    # Skip what a bare interpreter imports anyway (site, encodings, ...)
+    skip = {name for name, _ in _shallow_imports("pass")} | {code.split()[-1]}
+    rows = [(name, ms) for name, ms in _shallow_imports(code) if name not in skip]
+    return sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+
+
+def measure(repeats: int = 5, top: int = 5) -> Dict[str, Dict]:
+    results = {}
+    for name, code in ENTRY_POINTS.items():
+        times = [_time_import(code) for _ in range(repeats)]
+        results[name] = {
+            "median_ms": statistics.median(times),
+            "min_ms": min(times),
+            "slowest_imports": _slowest_modules(code, top),
+        }
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict]) -> List[str]:
+    regressions = []
+    for name, res in results.items():
+        if name not in baseline:
+            continue
+        base_ms = baseline[name]["median_ms"]
+        cur_ms = res["median_ms"]
+        if cur_ms > base_ms * REGRESSION_RATIO and cur_ms - base_ms > REGRESSION_FLOOR_MS:
+            regressions.append(f"{name}: {base_ms:.0f} ms -> {cur_ms:.0f} ms")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    results = measure(repeats=args.repeats)
+    for name, res in results.items():
+        slowest = ", ".join(f"{mod} {ms:.0f}ms" for mod, ms in res["slowest_imports"])
+        print(f"{name:<24} {res['median_ms']:8.1f} ms   [{slowest}]")
+
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps(results, indent=2))
+        print("Saved baseline to", BASELINE_PATH)
+
+    if args.check:
+        if not BASELINE_PATH.exists():
+            print("No baseline at", BASELINE_PATH)
+            return 1
+        regressions = compare(results, json.loads(BASELINE_PATH.read_text()))
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Synthetic stand-ins for the diabetes readmission and COMPAS extracts.
+
+The frames have the column names, dtypes and value vocabularies that
+data_loading / compas_splits expect, plus the structure the pipeline
+measures:
+
+  diabetes  OOD = admission_source_id 1 (ER), with shifted utilisation
+            and a shifted label model; groups Sex x prior-ER-visit with
+            group-dependent base rates and a few Unknown/Invalid rows
+  compas    OOD = the latest 20% by c_days_from_compas, with a drifting
+            recidivism rate; groups Race x Sex; rows that the standard
+            ProPublica filters drop
+
+Rows are generated in chunks, so files of 10M+ rows never sit in memory.
+
+    python benchmarks/synthetic.py diabetes 100000 /tmp/diabetes.csv
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Iterator
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 500_000
+
+# --------------------------------------------------------------------
+# Diabetes readmission (UCI 130-US hospitals schema)
+# --------------------------------------------------------------------
+ER_SOURCE_ID = 1
+RACES = ["Caucasian", "AfricanAmerican", "Hispanic", "Asian", "Other", "?"]
+RACE_P = [0.74, 0.19, 0.02, 0.01, 0.02, 0.02]
+GENDERS = ["Female", "Male", "Unknown/Invalid"]
+GENDER_P = [0.537, 0.4627, 0.0003]
+AGES = [f"[{lo}-{lo + 10})" for lo in range(0, 100, 10)]
+AGE_P = [0.002, 0.007, 0.016, 0.037, 0.095, 0.17, 0.221, 0.256, 0.169, 0.027]
+WEIGHTS = ["?", "[50-75)", "[75-100)", "[100-125)", "[125-150)"]
+WEIGHT_P = [0.968, 0.01, 0.013, 0.006, 0.003]
+PAYER_CODES = ["?", "MC", "HM", "SP", "BC", "MD", "CP", "UN", "CM", "OG", "PO", "DM", "CH", "WC", "OT", "MP", "SI"]
+SPECIALTIES = ["?"] + [f"Specialty-{i}" for i in range(70)]
+GLU = ["None", "Norm", ">200", ">300"]
+GLU_P = [0.947, 0.026, 0.015, 0.012]
+A1C = ["None", "Norm", ">7", ">8"]
+A1C_P = [0.833, 0.049, 0.037, 0.081]
+MEDS = ["No", "Steady", "Up", "Down"]
+MED_P = [0.8, 0.18, 0.01, 0.01]
+INSULIN_P = [0.47, 0.3, 0.11, 0.12]
+# ~900 ICD-9 style codes, Zipf-distributed like the real diag_* columns
+DIAG_CODES = ([f"{c}" for c in range(1, 800)] + [f"250.{i:02d}" for i in range(1, 94)]
+              + [f"V{c}" for c in range(1, 60)] + ["?"])
+
+
+def _choice(rng: np.random.Generator, values, n: int, p=None) -> np.ndarray:
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=n, p=p)]
+
+
+def _zipf_choice(rng: np.random.Generator, values, n: int, a: float = 1.3) -> np.ndarray:
+    idx = np.minimum(rng.zipf(a, size=n) - 1, len(values) - 1)
+    return np.asarray(values, dtype=object)[idx]
+
+
+def diabetes_chunk(rng: np.random.Generator, start: int, n: int) -> pd.DataFrame:
+    # Admission source: 1 = ER (the OOD domain), roughly 35% of encounters
+    source = np.where(rng.random(n) < 0.35, ER_SOURCE_ID, rng.choice([2, 4, 6, 7, 17], size=n))
+    er = source == ER_SOURCE_ID
+    gender = _choice(rng, GENDERS, n, GENDER_P)
+
+    # ER admissions come with more prior emergency / inpatient use
+    number_emergency = rng.poisson(np.where(er, 0.45, 0.12))
+    number_inpatient = rng.poisson(np.where(er, 0.9, 0.5))
+    number_outpatient = rng.poisson(0.37, size=n)
+    time_in_hospital = np.clip(rng.poisson(np.where(er, 4.8, 4.1)) + 1, 1, 14)
+    num_lab = np.clip(rng.normal(43, 20, size=n).round(), 1, 132).astype(int)
+    num_procedures = rng.integers(0, 7, size=n)
+    num_medications = np.clip(rng.poisson(16, size=n), 1, 81)
+    number_diagnoses = np.clip(rng.poisson(7.4, size=n), 1, 16)
+    age_idx = rng.choice(len(AGES), size=n, p=AGE_P)
+    insulin = _choice(rng, MEDS, n, INSULIN_P)
+    a1c = _choice(rng, A1C, n, A1C_P)
+
+    # Label model: shared utilisation effects, a shifted intercept and slope
+    # for ER admissions, and group effects for Sex x prior-ER-visit
+    prior_er = number_emergency > 0
+    logit = (-0.55 + 0.28 * number_inpatient + 0.05 * time_in_hospital + 0.02 * (number_diagnoses - 7)
+             + 0.06 * (age_idx - 6) + 0.2 * (insulin != "No") - 0.1 * (a1c == "Norm")
+             + np.where(er, 0.25 + 0.15 * number_emergency, 0.0)
+             + np.where(prior_er & (gender == "Male"), 0.35, 0.0)
+             - np.where(~prior_er & (gender == "Female"), 0.1, 0.0))
+    positive = rng.random(n) < 1.0 / (1.0 + np.exp(-logit))
+    readmitted = np.where(positive, np.where(rng.random(n) < 0.3, "<30", ">30"), "NO")
+
+    return pd.DataFrame({
+        "encounter_id": np.arange(start, start + n, dtype=np.int64) * 7 + 12522,
+        "patient_nbr": rng.integers(135, 189_502_619, size=n),
+        "race": _choice(rng, RACES, n, RACE_P),
+        "gender": gender,
+        "age": np.asarray(AGES, dtype=object)[age_idx],
+        "weight": _choice(rng, WEIGHTS, n, WEIGHT_P),
+        "admission_type_id": rng.choice([1, 2, 3, 5, 6], size=n, p=[0.53, 0.18, 0.19, 0.05, 0.05]),
+        "discharge_disposition_id": rng.choice([1, 2, 3, 6, 18, 22], size=n,
+                                               p=[0.59, 0.02, 0.14, 0.13, 0.04, 0.08]),
+        "admission_source_id": source,
+        "time_in_hospital": time_in_hospital,
+        "payer_code": _zipf_choice(rng, PAYER_CODES, n, a=1.6),
+        "medical_specialty": _zipf_choice(rng, SPECIALTIES, n, a=1.5),
+        "num_lab_procedures": num_lab,
+        "num_procedures": num_procedures,
+        "num_medications": num_medications,
+        "number_outpatient": number_outpatient,
+        "number_emergency": number_emergency,
+        "number_inpatient": number_inpatient,
+        "diag_1": _zipf_choice(rng, DIAG_CODES, n),
+        "diag_2": _zipf_choice(rng, DIAG_CODES, n),
+        "diag_3": _zipf_choice(rng, DIAG_CODES, n),
+        "number_diagnoses": number_diagnoses,
+        "max_glu_serum": _choice(rng, GLU, n, GLU_P),
+        "A1Cresult": a1c,
+        "metformin": _choice(rng, MEDS, n, MED_P),
+        "insulin": insulin,
+        "change": _choice(rng, ["No", "Ch"], n, [0.54, 0.46]),
+        "diabetesMed": _choice(rng, ["Yes", "No"], n, [0.77, 0.23]),
+        "readmitted": readmitted,
+    })
+
+
+# --------------------------------------------------------------------
+# COMPAS (ProPublica compas-scores-two-years schema)
+# --------------------------------------------------------------------
+COMPAS_RACES = ["African-American", "Caucasian", "Hispanic", "Other", "Asian", "Native American"]
+COMPAS_RACE_P = [0.51, 0.34, 0.08, 0.055, 0.005, 0.01]
+CHARGE_DESCS = [f"Charge-{i}" for i in range(400)]
+SCORE_TEXT = ["Low", "Medium", "High"]
+MAX_COMPAS_DAYS = 1100
+
+
+def compas_chunk(rng: np.random.Generator, start: int, n: int) -> pd.DataFrame:
+    race = _choice(rng, COMPAS_RACES, n, COMPAS_RACE_P)
+    sex = _choice(rng, ["Male", "Female"], n, [0.81, 0.19])
+    age = np.clip(rng.gamma(4.0, 8.5, size=n).round() + 18, 18, 96).astype(int)
+    priors = rng.negative_binomial(1, 0.23, size=n)
+    juv_fel = rng.poisson(0.07, size=n)
+    juv_misd = rng.poisson(0.09, size=n)
+    juv_other = rng.poisson(0.11, size=n)
+    days = rng.integers(0, MAX_COMPAS_DAYS, size=n)
+
+    # Recidivism drifts upward over time (the OOD split is the latest 20%)
+    logit = (-0.9 + 0.13 * np.minimum(priors, 15) - 0.035 * (age - 35) + 0.3 * juv_fel
+             + 0.25 * (sex == "Male") + 0.15 * (race == "African-American")
+             + 0.6 * days / MAX_COMPAS_DAYS)
+    recid = rng.random(n) < 1.0 / (1.0 + np.exp(-logit))
+    decile = np.clip((logit * 2.2 + 5.5 + rng.normal(0, 1.3, size=n)).round(), 1, 10).astype(int)
+    score_text = np.asarray(SCORE_TEXT, dtype=object)[np.digitize(decile, [5, 8])]
+
+    # Rows the ProPublica filters remove: out-of-window screening, is_recid -1,
+    # charge degree "0", score_text N/A
+    screening = rng.integers(-5, 6, size=n)
+    screening = np.where(rng.random(n) < 0.08, rng.integers(-400, 400, size=n), screening)
+    is_recid = np.where(rng.random(n) < 0.01, -1, recid.astype(int))
+    charge_degree = np.where(rng.random(n) < 0.005, "0", _choice(rng, ["F", "M"], n, [0.64, 0.36]))
+    score_text = np.where(rng.random(n) < 0.003, "N/A", score_text)
+
+    return pd.DataFrame({
+        "id": np.arange(start, start + n, dtype=np.int64) + 1,
+        "sex": sex,
+        "age": age,
+        "race": race,
+        "juv_fel_count": juv_fel,
+        "decile_score": decile,
+        "juv_misd_count": juv_misd,
+        "juv_other_count": juv_other,
+        "priors_count": priors,
+        "days_b_screening_arrest": screening,
+        "c_days_from_compas": days,
+        "c_charge_degree": charge_degree,
+        "c_charge_desc": _zipf_choice(rng, CHARGE_DESCS, n, a=1.4),
+        "is_recid": is_recid,
+        "score_text": score_text,
+        "two_year_recid": recid.astype(int),
+    })
+
+
+GENERATORS: Dict[str, Callable[[np.random.Generator, int, int], pd.DataFrame]] = {
+    "diabetes": diabetes_chunk,
+    "compas": compas_chunk,
+}
+
+
+def iter_chunks(dataset: str, n_rows: int, seed: int = 0,
+                chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    gen = GENERATORS[dataset]
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_rows, chunk_rows):
+        yield gen(rng, start, min(chunk_rows, n_rows - start))
+
+
+def write_csv(dataset: str, n_rows: int, path: Path, seed: int = 0) -> Path:
+    """Generate n_rows rows chunk by chunk into a CSV (written to a temp name, then renamed)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    for i, chunk in enumerate(iter_chunks(dataset, n_rows, seed)):
+        chunk.to_csv(tmp, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    tmp.replace(path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic diabetes / COMPAS CSV")
+    parser.add_argument("dataset", choices=sorted(GENERATORS))
+    parser.add_argument("rows", type=int)
+    parser.add_argument("out", type=Path)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print("Wrote", write_csv(args.dataset, args.rows, args.out, seed=args.seed))
+    sys.exit(0)
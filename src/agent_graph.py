@@ -1,17 +1,21 @@
 # agent_graph.py
+import argparse
+import asyncio
 import os
+import time
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional
 from typing_extensions import TypedDict
 
-from langgraph.graph import StateGraph, END
-from langchain_groq import ChatGroq
 
-from .results_store import load_all_runs
-from .analyze_results import rank_by_ood_accuracy
-from .selection import is_better, run_score   # <-- make sure this line exists
+from .results_store import EXPERIMENTS_DIR, top_runs
+from .instrumentation import set_trace, traced
+from .selection import select_best
 from .strategies import StrategyConfig
-from .run_experiment import run_experiment
-from .llm_client import call_llm_and_get_strategies
+from .llm_client import achat, call_llm_and_get_strategies, chat, llm_stats
+
+# langgraph and the experiment stack (pandas/sklearn via .parallel) are
+# imported inside the functions that need them, keeping import fast.
 
 
 
@@ -21,6 +25,10 @@ class GraphState(TypedDict):
     proposed_configs: List[Dict[str, Any]]
     step: int
     max_steps: int
+    n_workers: int
+    use_halving: bool
+    n_seeds: int
+    async_mode: bool
 
     # NEW AGENT FIELDS
     strategy_rationale: str
@@ -28,38 +36,45 @@ class GraphState(TypedDict):
     critic_notes: str
     judge_score: float
 
-# ---------- STRATEGY AGENT (Groq) ----------
-STRATEGY_LLM = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    temperature=0.3,
-    api_key=os.getenv("GROQ_API_KEY")
-)
-
-# ---------- RESEARCH AGENT ----------
-RESEARCH_LLM = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    temperature=0.2,
-    api_key=os.getenv("GROQ_API_KEY")
-)
-
-# ---------- CRITIC AGENT ----------
-CRITIC_LLM = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    temperature=0.05,
-    api_key=os.getenv("GROQ_API_KEY")
-)
-
-# ---------- JUDGE AGENT ----------
-JUDGE_LLM = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    temperature=0.0,
-    api_key=os.getenv("GROQ_API_KEY")
-)
+# ---------- AGENT SAMPLING TEMPERATURES ----------
+# All agents share the pooled client in llm_client; calls are tracked per agent.
+# (The strategy agent's request is built in llm_client.call_llm_and_get_strategies.)
+AGENT_TEMPERATURES = {
+    "research": 0.2,
+    "critic": 0.05,
+    "judge": 0.0,
+}
+
+# ---------- ASYNC MODE LIMITS ----------
+LLM_CONCURRENCY = int(os.getenv("PROMETHEUS_LLM_CONCURRENCY", "4"))
+LLM_TIMEOUT_S = float(os.getenv("PROMETHEUS_LLM_TIMEOUT", "120"))
+
+# ---------- RUNS IN STATE ----------
+# all_runs holds the top stored runs by OOD accuracy (one indexed query),
+# not the whole store: GraphState is checkpointed after every node.
+STATE_RUNS = int(os.getenv("PROMETHEUS_STATE_RUNS", "20"))
+
+# ---------- CHECKPOINTING ----------
+# GraphState is saved after every node in a local SQLite file, one
+# langgraph thread per session id, so `--resume <session>` restarts at the
+# node that failed. Fits that finished inside a failed run_experiments
+# node are in the results store and are reused by fingerprint. With
+# --seeds, that covers each candidate's own fit and finished aggregates;
+# the extra seed replicas of an unfinished aggregate are not stored and
+# are refit. Needs langgraph-checkpoint-sqlite (and aiosqlite for --async);
+# without it sessions run unsaved.
+CHECKPOINT_DB = os.getenv("PROMETHEUS_CHECKPOINT_DB", str(EXPERIMENTS_DIR / "agent_sessions.sqlite"))
+
+def _invoke(agent: str, prompt: str) -> str:
+    """One agent call through the shared client (cached, counted per agent)."""
+    return chat(agent, prompt, temperature=AGENT_TEMPERATURES[agent])
+
+async def _ainvoke(agent: str, prompt: str) -> str:
+    return await achat(agent, prompt, temperature=AGENT_TEMPERATURES[agent])
 
 def load_results_node(state: GraphState) -> GraphState:
-    runs = load_all_runs()
-    ranked = rank_by_ood_accuracy(runs) if runs else []
-    best = ranked[0] if ranked else None
+    runs = top_runs("ood_accuracy", limit=STATE_RUNS)
+    best = runs[0] if runs else None
     return {**state, "all_runs": runs, "best_run": best}
 
 def strategy_node(state: GraphState) -> GraphState:
@@ -71,13 +86,13 @@ def strategy_node(state: GraphState) -> GraphState:
         "strategy_rationale": rationale,
     }
 
-def research_node(state: GraphState) -> GraphState:
+def _research_prompt(state: GraphState) -> str:
     best = state.get("best_run")
 
     if best is None:
-        notes_prompt = "No results yet. Suggest generic improvements."
-    else:
-        notes_prompt = f"""
+        return "No results yet. Suggest generic improvements."
+
+    return f"""
 Analyze this run like a research scientist.
 
 ID accuracy = {best['id']['accuracy']}
@@ -86,12 +101,8 @@ OOD accuracy = {best['ood']['accuracy']}
 Give suggestions to reduce OOD gap.
         """
 
-    response = RESEARCH_LLM.invoke(notes_prompt).content
-    return {**state, "research_notes": response}
-
-def critic_node(state: GraphState) -> GraphState:
-    cfgs = state.get("proposed_configs", [])
-    prompt = f"""
+def _critic_prompt(cfgs: List[Dict[str, Any]]) -> str:
+    return f"""
 You are the CRITIC agent.
 Evaluate these proposed strategies:
 
@@ -100,29 +111,82 @@ Evaluate these proposed strategies:
 Provide short critique and risks.
     """
 
-    response = CRITIC_LLM.invoke(prompt).content
+def research_node(state: GraphState) -> GraphState:
+    response = _invoke("research", _research_prompt(state))
+    return {**state, "research_notes": response}
+
+def critic_node(state: GraphState) -> GraphState:
+    cfgs = state.get("proposed_configs", [])
+    response = _invoke("critic", _critic_prompt(cfgs))
     return {**state, "critic_notes": response}
 
 
+# ---------- ASYNC AGENTS ----------
+# In async mode strategy and research run as parallel branches of one graph
+# step (research does not need the proposals) and critic follows strategy.
+# Each agent is its own node, so every finished call is checkpointed: a
+# resumed session reruns only the call that failed, never the 0.2-temperature
+# strategy call once its proposals are saved. At most LLM_CONCURRENCY nodes
+# run at once (the graph's max_concurrency, see _run_graph).
+async def _with_timeout(coro):
+    """
+    One LLM call under the per-call timeout. The calls run on worker threads
+    (asyncio.to_thread), which a timeout cannot stop: the node fails at once,
+    but its thread keeps waiting on the request until it returns or hits the
+    HTTP client's own timeout (PROMETHEUS_LLM_HTTP_TIMEOUT), and that late
+    response is discarded. asyncio.run waits for such threads before it
+    returns, so keep the HTTP timeout close to LLM_TIMEOUT_S.
+    """
+    return await asyncio.wait_for(coro, timeout=LLM_TIMEOUT_S)
 
+# Parallel branches update only the keys they own (the others are not
+# written twice in the same step)
+async def astrategy_node(state: GraphState) -> Dict[str, Any]:
+    strategies, rationale = await _with_timeout(asyncio.to_thread(call_llm_and_get_strategies))
+    return {"proposed_configs": [s.__dict__ for s in strategies], "strategy_rationale": rationale}
 
-def run_experiments_node(state: GraphState) -> GraphState:
-    best_run = state.get("best_run")
+async def aresearch_node(state: GraphState) -> Dict[str, Any]:
+    return {"research_notes": await _with_timeout(_ainvoke("research", _research_prompt(state)))}
 
-    for cfg_dict in state.get("proposed_configs", []):
-        cfg = StrategyConfig(**cfg_dict)
-        cand_run = run_experiment(cfg)
+async def acritic_node(state: GraphState) -> Dict[str, Any]:
+    cfgs = state.get("proposed_configs", [])
+    return {"critic_notes": await _with_timeout(_ainvoke("critic", _critic_prompt(cfgs)))}
 
-        if is_better(cand_run, best_run):
-            best_run = cand_run
+
+def run_experiments_node(state: GraphState) -> GraphState:
+    from .parallel import run_experiments_parallel
+    from .multi_seed import evaluate_with_seeds
+    from .scheduler import successive_halving
+
+    cfgs = [StrategyConfig(**cfg_dict) for cfg_dict in state.get("proposed_configs", [])]
+
+    # Runs come back in proposal order, so the fold is deterministic.
+    # With halving, only configs that stay competitive on small budgets get a full fit.
+    # With seeds, selection compares mean scores and ignores gains within their
+    # error bars; each candidate's full fit is reused as its first replica.
+    n_seeds = state.get("n_seeds", 1)
+    cand_runs: List[Dict[str, Any]] = []
+    if state.get("use_halving"):
+        cand_runs = successive_halving(cfgs, n_workers=state.get("n_workers"),
+                                       schedule_id=f"step{state.get('step', 0)}-{os.getpid()}")
+        cfgs = [StrategyConfig(**r["config"]) for r in cand_runs]
+    elif n_seeds <= 1:
+        cand_runs = run_experiments_parallel(cfgs, n_workers=state.get("n_workers"))
+
+    if n_seeds > 1 and cfgs:
+        cand_runs = evaluate_with_seeds(cfgs, n_seeds=n_seeds, n_workers=state.get("n_workers"))
+    best_run = select_best(cand_runs, state.get("best_run"))
 
     return {**state, "best_run": best_run}
 
 
 def evaluate_node(state: GraphState) -> GraphState:
-    runs = load_all_runs()
-    ranked = rank_by_ood_accuracy(runs) if runs else []
-    best = ranked[0] if ranked else None
+    runs = top_runs("ood_accuracy", limit=STATE_RUNS)
+    # Keep the run run_experiments_node selected (error-bar aware); the top
+    # stored run stands in only while no run has cleared the baseline floor
+    best = state.get("best_run")
+    if best is None:
+        best = runs[0] if runs else None
     return {**state, "all_runs": runs, "best_run": best}
 
 def judge_node(state: GraphState) -> GraphState:
@@ -169,7 +233,8 @@ Output format example:
     # 2. Call LLM
     # -----------------------------
     try:
-        raw = JUDGE_LLM.invoke(score_prompt).content.strip()
+        # temperature 0.0: repeat prompts are served from the local cache
+        raw = _invoke("judge", score_prompt).strip()
         score = float(raw)
     except Exception:
         score = 0.0
@@ -187,61 +252,188 @@ def should_continue(state: GraphState) -> str:
     judge_score = state.get("judge_score", 0.0)
 
     if judge_score >= 0.8:
-        return END
+        return "end"
 
     if step >= max_steps:
-        return END
+        return "end"
 
     return "strategy"
 
-def build_agent_graph():
+def build_agent_graph(async_mode: bool = False, checkpointer=None):
+    """
+    async_mode=True runs research alongside strategy -> critic (async
+    nodes); the graph must then be run with ainvoke.
+    With a checkpointer, state is saved after every node.
+    """
+    from langgraph.graph import END, StateGraph
+
     builder = StateGraph(GraphState)
 
-    builder.add_node("load_results", load_results_node)
-    builder.add_node("strategy", strategy_node)
-    builder.add_node("research", research_node)
-    builder.add_node("critic", critic_node)
-    builder.add_node("run_experiments", run_experiments_node)
-    builder.add_node("evaluate", evaluate_node)
-    builder.add_node("judge", judge_node)
-    builder.add_node("decide_continue", decide_continue_node)
+    def add_node(name: str, fn) -> None:
+        # Every node is one instrumentation span, tagged with its step
+        builder.add_node(name, traced(name, cat="node", attrs=lambda state: {"step": state.get("step", 0)})(fn))
+
+    add_node("load_results", load_results_node)
+    if async_mode:
+        add_node("strategy", astrategy_node)
+        add_node("research", aresearch_node)
+        add_node("critic", acritic_node)
+    else:
+        add_node("strategy", strategy_node)
+        add_node("research", research_node)
+        add_node("critic", critic_node)
+    add_node("run_experiments", run_experiments_node)
+    add_node("evaluate", evaluate_node)
+    add_node("judge", judge_node)
+    add_node("decide_continue", decide_continue_node)
 
     builder.set_entry_point("load_results")
 
-    builder.add_edge("load_results", "strategy")
-    builder.add_edge("strategy", "research")
-    builder.add_edge("research", "critic")
-    builder.add_edge("critic", "run_experiments")
+    # Async mode fans out to strategy and research, and joins them before the fits
+    propose_entry = ["strategy", "research"] if async_mode else ["strategy"]
+    if async_mode:
+        builder.add_edge("load_results", "strategy")
+        builder.add_edge("load_results", "research")
+        builder.add_edge("strategy", "critic")
+        builder.add_edge(["critic", "research"], "run_experiments")
+    else:
+        builder.add_edge("load_results", "strategy")
+        builder.add_edge("strategy", "research")
+        builder.add_edge("research", "critic")
+        builder.add_edge("critic", "run_experiments")
     builder.add_edge("run_experiments", "evaluate")
     builder.add_edge("evaluate", "judge")
     builder.add_edge("judge", "decide_continue")
 
     builder.add_conditional_edges(
         "decide_continue",
-        should_continue,
-        {
-            "strategy": "strategy",
-            END: END,
-        },
+        lambda state: propose_entry if should_continue(state) == "strategy" else END,
+        [*propose_entry, END],
     )
 
-    return builder.compile()
-
-def main(max_steps: int = 3):
-    graph = build_agent_graph()
-    initial: GraphState = {
-        "best_run": None,
-        "all_runs": [],
-        "proposed_configs": [],
-        "step": 0,
-        "max_steps": max_steps,
-        "strategy_rationale": "",
-        "research_notes": "",
-        "critic_notes": "",
-        "judge_score": 0.0,
-    }
+    return builder.compile(checkpointer=checkpointer)
+
+
+def _session_config(session: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": session}}
+
+
+def _checkpoint_path() -> str:
+    os.makedirs(os.path.dirname(os.path.abspath(CHECKPOINT_DB)), exist_ok=True)
+    return CHECKPOINT_DB
+
+
+def checkpointing_available(async_mode: bool = False) -> bool:
+    try:
+        if async_mode:
+            import langgraph.checkpoint.sqlite.aio  # noqa: F401  (needs aiosqlite)
+        else:
+            import langgraph.checkpoint.sqlite  # noqa: F401
+    except ImportError:
+        return False
+    return True
 
-    final = graph.invoke(initial)
+
+@contextmanager
+def _sync_checkpointer():
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError:
+        yield None
+        return
+    with SqliteSaver.from_conn_string(_checkpoint_path()) as saver:
+        yield saver
+
+
+def saved_state(session: str) -> Optional[Dict[str, Any]]:
+    """Latest checkpointed GraphState of a session, or None if it has none."""
+    with _sync_checkpointer() as saver:
+        if saver is None:
+            raise RuntimeError("Resuming needs langgraph-checkpoint-sqlite (pip install langgraph-checkpoint-sqlite)")
+        saved = saver.get_tuple(_session_config(session))
+    return dict(saved.checkpoint["channel_values"]) if saved else None
+
+
+def _run_graph(inputs: Optional[GraphState], session: str, async_mode: bool) -> Dict[str, Any]:
+    """
+    Run (inputs) or resume (inputs=None) a session's graph to the end and
+    return the final state. Without the SQLite checkpointer installed the
+    graph still runs, just without checkpoints.
+    """
+    config = _session_config(session)
+
+    if async_mode:
+        # Bounds the agent calls running at once (strategy and research overlap)
+        config["max_concurrency"] = LLM_CONCURRENCY
+        async def run():
+            try:
+                from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+            except ImportError:
+                return await build_agent_graph(async_mode=True).ainvoke(
+                    inputs, {"max_concurrency": LLM_CONCURRENCY})
+            async with AsyncSqliteSaver.from_conn_string(_checkpoint_path()) as saver:
+                graph = build_agent_graph(async_mode=True, checkpointer=saver)
+                if inputs is None and not (await graph.aget_state(config)).next:
+                    print(f"Session {session} already finished")
+                else:
+                    await graph.ainvoke(inputs, config)
+                return (await graph.aget_state(config)).values
+        return asyncio.run(run())
+
+    with _sync_checkpointer() as saver:
+        graph = build_agent_graph(async_mode=False, checkpointer=saver)
+        if saver is None:
+            return graph.invoke(inputs)
+        if inputs is None and not graph.get_state(config).next:
+            print(f"Session {session} already finished")
+        else:
+            graph.invoke(inputs, config)
+        return graph.get_state(config).values
+
+
+def main(max_steps: int = 3, n_workers: Optional[int] = None, async_mode: bool = False,
+         use_halving: bool = False, n_seeds: int = 1, resume: Optional[str] = None):
+    """
+    Run a new research session, or with resume=<session id> continue a
+    checkpointed one from the node that was running when it stopped.
+    A resumed session keeps the settings it was started with.
+    """
+    from .parallel import resolve_workers
+
+    if resume is not None:
+        state = saved_state(resume)
+        if state is None:
+            raise SystemExit(f"No checkpoints for session {resume!r} in {CHECKPOINT_DB}")
+        session, inputs = resume, None
+        async_mode = bool(state.get("async_mode", False))
+        print(f"Resuming session {session} at step {state.get('step', 0)}")
+    else:
+        session = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        inputs: Optional[GraphState] = {
+            "best_run": None,
+            "all_runs": [],
+            "proposed_configs": [],
+            "step": 0,
+            "max_steps": max_steps,
+            "n_workers": resolve_workers(n_workers),
+            "use_halving": use_halving,
+            "n_seeds": n_seeds,
+            "async_mode": async_mode,
+            "strategy_rationale": "",
+            "research_notes": "",
+            "critic_notes": "",
+            "judge_score": 0.0,
+        }
+        if checkpointing_available(async_mode):
+            print(f"Session {session} (resume with --resume {session})")
+        else:
+            print(f"Session {session}. Warning: langgraph-checkpoint-sqlite"
+                  f"{' / aiosqlite' if async_mode else ''} is not installed; "
+                  "this session is not checkpointed and cannot be resumed")
+
+    # Spans of this session (graph nodes, LLM calls, experiment stages) share its id
+    set_trace(session)
+    final = _run_graph(inputs, session, async_mode)
     best = final.get("best_run")
 
     print("\n=== Final Summary ===")
@@ -250,6 +442,8 @@ def main(max_steps: int = 3):
     print("Strategy rationale:", final["strategy_rationale"])
     print("Research notes:", final["research_notes"])
     print("Critic notes:", final["critic_notes"])
+    print("LLM usage by agent:", llm_stats())
+    print(f"Timings: python -m src.instrumentation --trace {session} [--chrome trace.json]")
 
     if best:
         print("\nBest Strategy:")
@@ -258,5 +452,19 @@ def main(max_steps: int = 3):
         print(best["ood"])
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-steps", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parallel experiment workers (0 = all cores)")
+    parser.add_argument("--async", dest="async_mode", action="store_true",
+                        help="Run independent agent LLM calls concurrently")
+    parser.add_argument("--halving", action="store_true",
+                        help="Successive halving: screen proposals on small budgets before full fits")
+    parser.add_argument("--seeds", type=int, default=1,
+                        help="Evaluate candidates over N training seeds; selection uses mean and error bars")
+    parser.add_argument("--resume", metavar="SESSION", default=None,
+                        help="Continue a checkpointed session from the node where it stopped")
+    args = parser.parse_args()
+    main(max_steps=args.max_steps, n_workers=args.workers, async_mode=args.async_mode,
+         use_halving=args.halving, n_seeds=args.seeds, resume=args.resume)
 
@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+EXPERIMENTS_DIR = Path(__file__).resolve().parents[1] / "experiments"
+ARRAYS_DIR = EXPERIMENTS_DIR / "arrays"
+
+# Layout under ARRAYS_DIR:
+#   splits/<split_id>/{y,groups,meta_<col>}_{id,ood}.npy + labels.json   (written once per split)
+#   runs/<run_key>/{id,ood}_proba.npy                                    (one pair per run)
+
+
+def _compact_codes(values) -> tuple:
+    """Factorize values into the smallest int dtype that fits, plus the labels."""
+    codes, uniques = pd.factorize(np.asarray(values), use_na_sentinel=True)
+    dtype = np.int8 if len(uniques) < 127 else np.int16 if len(uniques) < 32767 else np.int32
+    return codes.astype(dtype), [str(u) for u in uniques]
+
+
+def _compact_column(col: pd.Series) -> tuple:
+    """Numeric meta columns stay numeric (downcast); strings become codes + labels."""
+    if pd.api.types.is_bool_dtype(col) or pd.api.types.is_integer_dtype(col):
+        return pd.to_numeric(col, downcast="integer").to_numpy(), None
+    if pd.api.types.is_float_dtype(col):
+        return col.to_numpy(dtype=np.float32), None
+    return _compact_codes(col)
+
+
+def split_arrays_dir(split_id: str) -> Path:
+    return ARRAYS_DIR / "splits" / split_id
+
+
+def save_split_arrays(split_id: str,
+                      y_id: np.ndarray, y_ood: np.ndarray,
+                      groups_id: np.ndarray, groups_ood: np.ndarray,
+                      meta_id: Optional[pd.DataFrame] = None,
+                      meta_ood: Optional[pd.DataFrame] = None) -> str:
+    """
+    Write per-row labels, group ids and metadata for a split once.
+    Later calls for the same split_id are no-ops. Returns split_id.
+    """
+    out_dir = split_arrays_dir(split_id)
+    if out_dir.exists():
+        return split_id
+
+    tmp_dir = out_dir.with_name(out_dir.name + f".tmp{os.getpid()}")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    labels: Dict[str, Any] = {}
+
+    for part, y, groups, meta in (("id", y_id, groups_id, meta_id),
+                                  ("ood", y_ood, groups_ood, meta_ood)):
+        np.save(tmp_dir / f"y_{part}.npy", np.asarray(y, dtype=np.int8))
+        codes, group_labels = _compact_codes(groups)
+        np.save(tmp_dir / f"groups_{part}.npy", codes)
+        labels[f"groups_{part}"] = group_labels
+
+        if meta is not None:
+            for col in meta.columns:
+                arr, col_labels = _compact_column(meta[col])
+                np.save(tmp_dir / f"meta_{col}_{part}.npy", arr)
+                if col_labels is not None:
+                    labels[f"meta_{col}_{part}"] = col_labels
+
+    (tmp_dir / "labels.json").write_text(json.dumps(labels))
+    try:
+        tmp_dir.rename(out_dir)
+    except OSError:
+        # Another worker wrote the same split first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return split_id
+
+
+def load_split_arrays(split_id: str, mmap: bool = True) -> Dict[str, Any]:
+    """
+    All arrays for a split keyed by file stem (e.g. "y_ood", "groups_id"),
+    memory-mapped by default, plus "labels" for the code -> label lists.
+    """
+    in_dir = split_arrays_dir(split_id)
+    mmap_mode = "r" if mmap else None
+    arrays: Dict[str, Any] = {p.stem: np.load(p, mmap_mode=mmap_mode) for p in in_dir.glob("*.npy")}
+    arrays["labels"] = json.loads((in_dir / "labels.json").read_text())
+    return arrays
+
+
+def save_predictions(run_key: str, id_proba: np.ndarray, ood_proba: np.ndarray) -> str:
+    """Store a run's predicted probabilities as float32. Returns the ref kept in the run record."""
+    ref = f"runs/{run_key}"
+    out_dir = ARRAYS_DIR / ref
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for part, proba in (("id", id_proba), ("ood", ood_proba)):
+        tmp_path = out_dir / f"{part}_proba.tmp{os.getpid()}.npy"
+        np.save(tmp_path, np.asarray(proba, dtype=np.float32))
+        os.replace(tmp_path, out_dir / f"{part}_proba.npy")
+    return ref
+
+
+def load_predictions(run: Dict[str, Any], mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    id/ood probabilities for a run record written with save_predictions,
+    alongside the labels and groups of its split.
+    """
+    refs = run.get("arrays")
+    if not refs:
+        raise KeyError(f"Run {run.get('config', {}).get('name')!r} has no stored arrays")
+    mmap_mode = "r" if mmap else None
+    pred_dir = ARRAYS_DIR / refs["predictions"]
+    out = load_split_arrays(refs["split"], mmap=mmap)
+    out["id_proba"] = np.load(pred_dir / "id_proba.npy", mmap_mode=mmap_mode)
+    out["ood_proba"] = np.load(pred_dir / "ood_proba.npy", mmap_mode=mmap_mode)
+    return out
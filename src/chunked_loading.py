@@ -0,0 +1,332 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .data_loading import DATA_PATH
+from .preprocessing import _smallest_int
+from .split_cache import PARQUET_AVAILABLE, source_fingerprint
+
+# Chunked ingestion for raw extracts larger than memory.
+#
+# The CSV is read in fixed-size chunks. Each chunk gets compact dtypes and
+# its derived group columns, and is routed to train / ID test / OOD on the
+# spot: the domain filter picks OOD rows, and a hash of the row key assigns
+# the remaining rows to train or ID test. Each chunk is appended to
+# partitioned shards under cache/shards/<key>/<part>/. No stage ever holds
+# the full file; later stages read the shards back memory-mapped.
+SHARDS_DIR = Path(__file__).resolve().parents[1] / "cache" / "shards"
+
+# Bump when routing or dtypes change in a way the shard key can't see
+# (2: integer columns widened instead of wrapping out-of-range values)
+SHARD_VERSION = 2
+
+# Rows per chunk. Does not affect the result, so it is not part of the shard key.
+DEFAULT_CHUNK_ROWS = int(os.getenv("PROMETHEUS_CHUNK_ROWS", "200000"))
+
+SHARD_PARTS = ("train", "id_test", "ood")
+
+LABEL_COL = "readmitted"
+DOMAIN_COL = "admission_source_id"
+ER_SOURCE_ID = 1
+KEY_COL = "encounter_id"
+
+# Compact dtypes for the UCI diabetes columns. Strings are kept as strings in
+# the shards (parquet dictionary-encodes them) and come back as categoricals.
+# Integer widths are a starting point: a column whose values do not fit is
+# widened (see _overflowing), never wrapped. A chunk with missing values in
+# an integer column gets the nullable dtype of the same width (see _cast_int).
+DIABETES_DTYPES: Dict[str, str] = {
+    "encounter_id": "int64",
+    "patient_nbr": "int64",
+    "admission_type_id": "int8",
+    "discharge_disposition_id": "int8",
+    "admission_source_id": "int8",
+    "time_in_hospital": "int8",
+    "num_lab_procedures": "int16",
+    "num_procedures": "int8",
+    "num_medications": "int16",
+    "number_outpatient": "int16",
+    "number_emergency": "int16",
+    "number_inpatient": "int16",
+    "number_diagnoses": "int8",
+    **{col: "string" for col in (
+        "race", "gender", "age", "weight", "payer_code", "medical_specialty",
+        "diag_1", "diag_2", "diag_3", "max_glu_serum", "A1Cresult",
+        "change", "diabetesMed", "readmitted",
+        # Medication columns ("No" / "Steady" / "Up" / "Down")
+        "metformin", "repaglinide", "nateglinide", "chlorpropamide", "glimepiride",
+        "acetohexamide", "glipizide", "glyburide", "tolbutamide", "pioglitazone",
+        "rosiglitazone", "acarbose", "miglitol", "troglitazone", "tolazamide",
+        "examide", "citoglipton", "insulin", "glyburide-metformin", "glipizide-metformin",
+        "glimepiride-pioglitazone", "metformin-rosiglitazone", "metformin-pioglitazone",
+    )},
+}
+
+# Columns the streamed splits read: features, label and domain. Columns an
+# extract does not have are skipped; columns outside this list are never parsed.
+DIABETES_COLUMNS: List[str] = list(DIABETES_DTYPES)
+
+
+def _hash_uniform(keys: np.ndarray, seed: int) -> np.ndarray:
+    """
+    Deterministic uniform [0, 1) per key (splitmix64), so a row lands in the
+    same split whatever the chunk size or file order.
+    """
+    with np.errstate(over="ignore"):
+        x = keys.astype(np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        x ^= x >> np.uint64(30)
+        x *= np.uint64(0xBF58476D1CE4E5B9)
+        x ^= x >> np.uint64(27)
+        x *= np.uint64(0x94D049BB133111EB)
+        x ^= x >> np.uint64(31)
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def _resolve_dtypes(first_chunk: pd.DataFrame) -> Dict[str, str]:
+    """Fixed per-column dtypes, so every shard has the same schema."""
+    dtypes = {}
+    for col in first_chunk.columns:
+        if col in DIABETES_DTYPES:
+            dtypes[col] = DIABETES_DTYPES[col]
+        elif pd.api.types.is_numeric_dtype(first_chunk[col]):
+            dtypes[col] = "float32"  # NaN-safe whatever later chunks hold
+        else:
+            dtypes[col] = "string"
+    return dtypes
+
+
+def _overflowing(chunk: pd.DataFrame, dtypes: Dict[str, str]) -> Dict[str, str]:
+    """Integer columns whose chunk values do not fit their dtype -> the smallest dtype that does."""
+    widened = {}
+    for col, dtype in dtypes.items():
+        if not dtype.startswith("int") or col not in chunk:
+            continue
+        lo, hi = chunk[col].min(), chunk[col].max()
+        if pd.isna(lo):
+            continue
+        info = np.iinfo(dtype)
+        if lo < info.min or hi > info.max:
+            widened[col] = _smallest_int(min(int(lo), info.min), max(int(hi), info.max)).name
+    return widened
+
+
+def _cast_int(values: pd.Series, dtype: str) -> pd.Series:
+    """values as dtype, or as its nullable counterpart (int8 -> Int8) when values has missing entries."""
+    if values.isna().any():
+        dtype = dtype.capitalize()
+    return values.astype(dtype)
+
+
+def _compact_chunk(chunk: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    ints = {col: dtype for col, dtype in dtypes.items() if dtype.startswith("int")}
+    chunk = chunk.astype({col: dtype for col, dtype in dtypes.items() if col not in ints})
+    for col, dtype in ints.items():
+        chunk[col] = _cast_int(chunk[col], dtype)
+    # Derived grouping columns, as in load_diabetes_readmission (a missing count is no ER visit)
+    chunk["sex"] = chunk["gender"]
+    chunk["er_flag"] = chunk["number_emergency"].gt(0).fillna(False).astype(np.int8)
+    return chunk
+
+
+def _write_shard(frame: pd.DataFrame, part_dir: Path, index: int) -> None:
+    if frame.empty:
+        return
+    part_dir.mkdir(parents=True, exist_ok=True)
+    if PARQUET_AVAILABLE:
+        frame.to_parquet(part_dir / f"part-{index:05d}.parquet", index=False)
+    else:
+        frame.to_pickle(part_dir / f"part-{index:05d}.pkl")
+
+
+def _widen_shards(tmp_dir: Path, widened: Dict[str, str]) -> None:
+    """
+    Cast the widened integer columns of every shard written so far, so all
+    shards keep one schema. Only those columns change; the CSV is not read again.
+    """
+    if PARQUET_AVAILABLE:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        for path in sorted(tmp_dir.glob("*/*.parquet")):
+            table = pq.read_table(path)
+            for col, dtype in widened.items():
+                i = table.schema.get_field_index(col)
+                table = table.set_column(i, col, table[col].cast(pa.from_numpy_dtype(np.dtype(dtype))))
+            pq.write_table(table, path)
+        return
+
+    for path in sorted(tmp_dir.glob("*/*.pkl")):
+        frame = pd.read_pickle(path)
+        for col, dtype in widened.items():
+            frame[col] = _cast_int(frame[col], dtype)
+        frame.to_pickle(path)
+
+
+def shard_key(source: Path = DATA_PATH, test_size: float = 0.2, random_state: int = 42,
+              usecols: Optional[Sequence[str]] = None) -> str:
+    payload = {
+        "source": str(source),
+        "fingerprint": source_fingerprint(source),
+        "test_size": test_size,
+        "random_state": random_state,
+        "usecols": sorted(usecols) if usecols else None,
+        "version": SHARD_VERSION,
+    }
+    blob = json.dumps(payload, sort_keys=True)
+    return f"{Path(source).stem}-{hashlib.sha256(blob.encode()).hexdigest()[:16]}"
+
+
+def write_shards(source: Path = DATA_PATH, test_size: float = 0.2, random_state: int = 42,
+                 usecols: Optional[Sequence[str]] = None,
+                 chunk_rows: Optional[int] = None) -> Path:
+    """
+    Stream source into train / ID test / OOD shards. Returns the shard
+    directory; an existing complete directory for the same key is reused.
+    """
+    out_dir = SHARDS_DIR / shard_key(source, test_size, random_state, usecols)
+    if (out_dir / "manifest.json").exists():
+        return out_dir
+
+    chunk_rows = chunk_rows or DEFAULT_CHUNK_ROWS
+    if usecols is not None:
+        # Columns the routing and grouping need, whatever the caller asked for;
+        # requested columns the extract does not have are skipped
+        required = [LABEL_COL, DOMAIN_COL, "gender", "number_emergency"]
+        header = set(pd.read_csv(source, nrows=0).columns)
+        usecols = [col for col in dict.fromkeys([*usecols, *required]) if col in header or col in required]
+
+    tmp_dir = out_dir.with_name(out_dir.name + f".tmp{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    dtypes: Dict[str, str] = {}
+    counts = _route_chunks(source, usecols, chunk_rows, test_size, random_state, tmp_dir, dtypes)
+
+    manifest = {"source": str(source), "counts": counts, "dtypes": dtypes, "version": SHARD_VERSION}
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    (tmp_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    try:
+        tmp_dir.rename(out_dir)
+    except OSError:
+        # Another process finished the same shards first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return out_dir
+
+
+def _route_chunks(source: Path, usecols: Optional[List[str]], chunk_rows: int, test_size: float,
+                  random_state: int, tmp_dir: Path,
+                  dtypes: Dict[str, str]) -> Dict[str, int]:
+    """
+    Write every chunk of source to its partition under tmp_dir and return
+    the row counts. dtypes is filled from the first chunk; when a later
+    chunk overflows an integer dtype, that column is widened in dtypes and
+    in the shards already written.
+    """
+    counts = {part: 0 for part in SHARD_PARTS}
+    row_offset = 0
+    for i, chunk in enumerate(pd.read_csv(source, usecols=usecols, chunksize=chunk_rows)):
+        if not dtypes:
+            dtypes.update(_resolve_dtypes(chunk))
+        widened = _overflowing(chunk, dtypes)
+        if widened and i > 0:
+            _widen_shards(tmp_dir, widened)
+        dtypes.update(widened)
+        chunk = _compact_chunk(chunk, dtypes)
+
+        keys = (chunk[KEY_COL].to_numpy() if KEY_COL in chunk
+                else np.arange(row_offset, row_offset + len(chunk)))
+        row_offset += len(chunk)
+
+        is_ood = (chunk[DOMAIN_COL] == ER_SOURCE_ID).to_numpy()
+        is_id_test = ~is_ood & (_hash_uniform(keys, random_state) < test_size)
+        routes = {"ood": is_ood, "id_test": is_id_test, "train": ~is_ood & ~is_id_test}
+        for part, mask in routes.items():
+            _write_shard(chunk[mask], tmp_dir / part, i)
+            counts[part] += int(mask.sum())
+    return counts
+
+
+def read_shards(shard_dir: Path, part: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    One partition of a shard directory as a single frame, with string
+    columns as categoricals. Parquet shards are memory-mapped.
+    """
+    part_dir = Path(shard_dir) / part
+    if PARQUET_AVAILABLE:
+        import pyarrow.parquet as pq
+
+        files = sorted(part_dir.glob("*.parquet"))
+        if not files:
+            return pd.DataFrame(columns=columns)
+        table = pq.read_table(part_dir, columns=columns, memory_map=True)
+        return table.to_pandas(strings_to_categorical=True, self_destruct=True)
+
+    frames = [pd.read_pickle(p) for p in sorted(part_dir.glob("*.pkl"))]
+    frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+    for col in frame.select_dtypes(include=["string", "object"]).columns:
+        frame[col] = frame[col].astype("category")
+    return frame
+
+
+def iter_shard_batches(shard_dir: Path, part: str, batch_rows: int,
+                       columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """Batches of at most batch_rows rows from one partition, in shard order."""
+    part_dir = Path(shard_dir) / part
+    if PARQUET_AVAILABLE:
+        import pyarrow.parquet as pq
+
+        for path in sorted(part_dir.glob("*.parquet")):
+            shard = pq.ParquetFile(path, memory_map=True)
+            for batch in shard.iter_batches(batch_size=batch_rows, columns=columns):
+                yield batch.to_pandas(strings_to_categorical=True)
+        return
+
+    for path in sorted(part_dir.glob("*.pkl")):
+        frame = pd.read_pickle(path)
+        for start in range(0, len(frame), batch_rows):
+            yield frame.iloc[start:start + batch_rows]
+
+
+def iter_split_batches(part: str, batch_rows: int, test_size: float = 0.2,
+                       random_state: int = 42) -> Iterator[Tuple[pd.DataFrame, pd.Series]]:
+    """(X, y) batches of one split partition, in the row order of make_splits_streamed."""
+    shard_dir = write_shards(DATA_PATH, test_size=test_size, random_state=random_state,
+                             usecols=DIABETES_COLUMNS)
+    for batch in iter_shard_batches(shard_dir, part, batch_rows):
+        yield batch.drop(columns=[LABEL_COL]), batch[LABEL_COL]
+
+
+def make_splits_streamed(test_size: float = 0.2, random_state: int = 42
+                         ) -> Tuple[pd.DataFrame, pd.Series,
+                                    pd.DataFrame, pd.Series,
+                                    pd.DataFrame, pd.Series]:
+    """
+    Same contract as splits.make_splits, built from streamed shards:
+    train on non-ER admission sources, test OOD on ER only. ID rows are
+    assigned to train / ID test by key hash rather than a stratified split.
+    """
+    shard_dir = write_shards(DATA_PATH, test_size=test_size, random_state=random_state,
+                             usecols=DIABETES_COLUMNS)
+    out = []
+    for part in SHARD_PARTS:
+        df = read_shards(shard_dir, part)
+        out.append(df.drop(columns=[LABEL_COL]))
+        out.append(df[LABEL_COL])
+    return tuple(out)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stream a raw CSV into train / ID / OOD shards")
+    parser.add_argument("--source", type=Path, default=DATA_PATH)
+    parser.add_argument("--chunk-rows", type=int, default=None)
+    args = parser.parse_args()
+
+    shard_dir = write_shards(args.source, usecols=DIABETES_COLUMNS, chunk_rows=args.chunk_rows)
+    print("Shards:", shard_dir)
+    print(json.loads((shard_dir / "manifest.json").read_text())["counts"])
@@ -6,6 +6,7 @@ def compute_group_id(df: pd.DataFrame) -> pd.Series:
     COMPAS groups: Race × Sex (standard fairness groups).
     E.g. "African-American_Male", "Caucasian_Female".
     """
-    race = df["race"].fillna("Unknown").astype(str)
-    sex = df["sex"].fillna("Unknown").astype(str)
+    # astype(object) first: compacted splits hold these as categoricals
+    race = df["race"].astype(object).fillna("Unknown").astype(str)
+    sex = df["sex"].astype(object).fillna("Unknown").astype(str)
     return race + "_" + sex
@@ -1,15 +1,23 @@
+import os
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 from pathlib import Path
 
 
-DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "compas-scores-two-years.csv"
+# Repo data/ directory, or PROMETHEUS_COMPAS_CSV (e.g. synthetic benchmark data)
+DATA_PATH = Path(os.getenv("PROMETHEUS_COMPAS_CSV",
+                           Path(__file__).resolve().parents[1] / "data" / "compas-scores-two-years.csv"))
 
-def load_compas():
-    """Load and apply standard COMPAS preprocessing (ProPublica style)."""
-    df = pd.read_csv(DATA_PATH)
-    
+# Columns the filters and the returned frame need; everything else is never parsed
+FILTER_COLS = ['days_b_screening_arrest', 'is_recid', 'c_charge_degree', 'score_text']
+FEATURE_COLS = [
+    'sex', 'age', 'race', 'juv_fel_count', 'decile_score',
+    'juv_misd_count', 'juv_other_count', 'priors_count',
+    'c_days_from_compas', 'c_charge_degree', 'c_charge_desc',
+]
+
+
+def _filter_compas(df):
     # Standard filters (days_since_decision > 30, is_recid <=1, etc.)
     df = df[
         (df.days_b_screening_arrest <= 30) &
@@ -17,22 +25,35 @@ def load_compas():
         (df.is_recid != -1) &
         (df.c_charge_degree != "0") &
         (df.score_text != 'N/A')
-    ].copy()
-    
-    # Label: two_year_recid
-    df['two_year_recid'] = (df.is_recid == 1).astype(int)
-    
-    # Keep key features + metadata
-    cols = [
-        'sex', 'age', 'race', 'juv_fel_count', 'decile_score',
-        'juv_misd_count', 'juv_other_count', 'priors_count',
-        'c_days_from_compas', 'c_charge_degree', 'c_charge_desc',
-        'two_year_recid'  # label
     ]
-    return df[cols]
+
+    # Label: two_year_recid
+    out = df[FEATURE_COLS].copy()
+    out['two_year_recid'] = (df.is_recid == 1).astype(np.int8)
+    return out
+
+
+def load_compas(chunksize=None):
+    """
+    Load and apply standard COMPAS preprocessing (ProPublica style).
+    With chunksize, the CSV is filtered chunk by chunk so only kept rows
+    of the needed columns are ever held in memory.
+    """
+    usecols = list(dict.fromkeys(FILTER_COLS + FEATURE_COLS))
+    if chunksize is None:
+        return _filter_compas(pd.read_csv(DATA_PATH, usecols=usecols))
+
+    chunks = [_filter_compas(chunk)
+              for chunk in pd.read_csv(DATA_PATH, usecols=usecols, chunksize=chunksize)]
+    df = pd.concat(chunks, ignore_index=True)
+    for col in df.select_dtypes(include=["object"]).columns:
+        df[col] = df[col].astype("category")
+    return df
 
 def make_splits():
     """Time-based split: early dates = ID, late dates = OOD."""
+    from sklearn.model_selection import train_test_split  # heavy; only needed on a cache miss
+
     df = load_compas()
     
     # Sort by screening date, split 80/20 time-wise
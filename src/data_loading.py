@@ -1,7 +1,10 @@
+import os
 import pandas as pd
 from pathlib import Path
 
-DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "diabetes_readmission.csv"
+# PROMETHEUS_DIABETES_CSV points the pipeline at another extract (e.g. synthetic benchmark data)
+DATA_PATH = Path(os.getenv("PROMETHEUS_DIABETES_CSV",
+                           Path(__file__).resolve().parents[1] / "data" / "diabetes_readmission.csv"))
 
 def load_diabetes_readmission():
     """
@@ -1,9 +1,13 @@
+import os
 from dataclasses import dataclass
-from typing import Callable
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Tuple
 import pandas as pd
 
 from . import grouping  # diabetes grouping
 from . import splits    # diabetes splits
+from . import compas_grouping, compas_splits
+from .data_loading import DATA_PATH as DIABETES_DATA_PATH
 
 
 @dataclass
@@ -11,6 +15,21 @@ class DatasetSpec:
     name: str
     make_splits: Callable  # returns X_train, y_train, X_id, y_id, X_ood, y_ood
     compute_group_id: Callable[[pd.DataFrame], pd.Series]
+    source_path: Optional[Path] = None  # raw file the splits are built from (for cache keys)
+    # (part, batch_rows) -> (X, y) batches read from disk, part in "train" / "id_test" / "ood".
+    # Datasets without it are batched from their in-memory splits.
+    iter_batches: Optional[Callable[[str, int], Iterator[Tuple[pd.DataFrame, pd.Series]]]] = None
+
+
+def _streamed_splits(test_size: float = 0.2, random_state: int = 42):
+    # Imported on use: chunked_loading depends on split_cache, which imports this module
+    from .chunked_loading import make_splits_streamed
+    return make_splits_streamed(test_size=test_size, random_state=random_state)
+
+
+def _streamed_batches(part: str, batch_rows: int):
+    from .chunked_loading import iter_split_batches
+    return iter_split_batches(part, batch_rows)
 
 
 DATASETS = {
@@ -18,11 +37,27 @@ DATASETS = {
         name="diabetes",
         make_splits=splits.make_splits,
         compute_group_id=grouping.compute_group_id,
+        source_path=DIABETES_DATA_PATH,
+    ),
+    # Same source streamed in chunks into compact shards (for extracts larger than memory)
+    "diabetes_stream": DatasetSpec(
+        name="diabetes_stream",
+        make_splits=_streamed_splits,
+        compute_group_id=grouping.compute_group_id,
+        source_path=DIABETES_DATA_PATH,
+        iter_batches=_streamed_batches,
+    ),
+    # ProPublica COMPAS: time-based OOD split, Race x Sex groups
+    "compas": DatasetSpec(
+        name="compas",
+        make_splits=compas_splits.make_splits,
+        compute_group_id=compas_grouping.compute_group_id,
+        source_path=compas_splits.DATA_PATH,
     ),
     # later: add "loan_default", "mortality", etc.
 }
 
-CURRENT_DATASET = "diabetes"
+CURRENT_DATASET = os.getenv("PROMETHEUS_DATASET", "diabetes")
 
 def get_dataset() -> DatasetSpec:
     return DATASETS[CURRENT_DATASET]
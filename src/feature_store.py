@@ -0,0 +1,185 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+if TYPE_CHECKING:
+    from sklearn.preprocessing import OneHotEncoder
+
+from .datasets import DatasetSpec, get_dataset
+from .instrumentation import span
+from .preprocessing import encode_labels
+from .split_cache import get_splits, split_key
+
+
+@dataclass
+class EncodedSplits:
+    """
+    Encoded train / ID test / OOD matrices for one (dataset, split).
+    Matrices are CSR so memory grows with nonzeros, not rows x categories.
+    Strategies select training rows by position instead of re-encoding.
+    The ordinal layout (get_ordinal) holds dense arrays instead, with
+    categorical marking the columns that are category codes.
+    """
+    key: str
+    X_train: sp.csr_matrix
+    y_train: np.ndarray
+    X_id: sp.csr_matrix
+    y_id: np.ndarray
+    X_ood: sp.csr_matrix
+    y_ood: np.ndarray
+    groups_train: np.ndarray
+    groups_id: np.ndarray
+    groups_ood: np.ndarray
+    cat_cols: List[str]
+    num_cols: List[str]
+    encoder: Optional["OneHotEncoder"] = None
+    categorical: Optional[np.ndarray] = None
+
+
+# In-process memo: split key -> EncodedSplits
+_ENCODED: Dict[str, EncodedSplits] = {}
+
+
+def _encode_frame(X: pd.DataFrame, cat_cols, num_cols, encoder: Optional["OneHotEncoder"]) -> sp.csr_matrix:
+    X_num = sp.csr_matrix(X[num_cols].to_numpy(dtype=np.float64))
+    if encoder is None:
+        return X_num
+    X_cat = encoder.transform(X[cat_cols])
+    return sp.hstack([X_num, X_cat], format="csr")
+
+
+def build_encoded(ds: Optional[DatasetSpec] = None, **split_kwargs) -> EncodedSplits:
+    """Fit the encoder on the full train split and transform all three splits once."""
+    ds = ds or get_dataset()
+    X_train, y_train, X_id_test, y_id_test, X_ood, y_ood = get_splits(ds, **split_kwargs)
+
+    cat_cols = list(X_train.select_dtypes(include=["object", "category"]).columns)
+    num_cols = list(X_train.select_dtypes(include=["number"]).columns)
+
+    encoder = None
+    if len(cat_cols) > 0:
+        from sklearn.preprocessing import OneHotEncoder
+
+        # Fit encoder on TRAIN only
+        encoder = OneHotEncoder(handle_unknown="ignore", sparse_output=True)
+        encoder.fit(X_train[cat_cols])
+
+    return EncodedSplits(
+        key=split_key(ds, **split_kwargs),
+        X_train=_encode_frame(X_train, cat_cols, num_cols, encoder),
+        y_train=encode_labels(y_train).to_numpy(),
+        X_id=_encode_frame(X_id_test, cat_cols, num_cols, encoder),
+        y_id=encode_labels(y_id_test).to_numpy(),
+        X_ood=_encode_frame(X_ood, cat_cols, num_cols, encoder),
+        y_ood=encode_labels(y_ood).to_numpy(),
+        groups_train=np.asarray(ds.compute_group_id(X_train)),
+        groups_id=np.asarray(ds.compute_group_id(X_id_test)),
+        groups_ood=np.asarray(ds.compute_group_id(X_ood)),
+        cat_cols=cat_cols,
+        num_cols=num_cols,
+        encoder=encoder,
+    )
+
+
+def get_encoded(ds: Optional[DatasetSpec] = None, **split_kwargs) -> EncodedSplits:
+    """Memoized build_encoded, keyed on the same split key as the split cache."""
+    ds = ds or get_dataset()
+    key = split_key(ds, **split_kwargs)
+    if key not in _ENCODED:
+        with span("encode", layout="onehot"):
+            _ENCODED[key] = build_encoded(ds, **split_kwargs)
+    return _ENCODED[key]
+
+
+def _ordinal_frame(X: pd.DataFrame, cat_cols, num_cols) -> np.ndarray:
+    # Split frames are compacted with shared categories (see preprocessing),
+    # so a code means the same category in every split
+    cols = [X[num_cols].to_numpy(dtype=np.float64)]
+    for col in cat_cols:
+        codes = X[col].cat.codes.to_numpy(dtype=np.float64)
+        codes[codes < 0] = np.nan  # missing
+        cols.append(codes[:, None])
+    return np.hstack(cols)
+
+
+def build_ordinal(ds: Optional[DatasetSpec] = None, **split_kwargs) -> EncodedSplits:
+    """
+    Dense layout for engines without sparse support: numeric columns
+    followed by one code column per categorical. Columns with few enough
+    categories are marked categorical; the rest are used as ordered codes.
+    """
+    from .models.engines import MAX_NATIVE_CATEGORIES
+
+    ds = ds or get_dataset()
+    X_train, y_train, X_id_test, y_id_test, X_ood, y_ood = get_splits(ds, **split_kwargs)
+
+    cat_cols = list(X_train.select_dtypes(include=["category"]).columns)
+    num_cols = list(X_train.select_dtypes(include=["number"]).columns)
+    n_categories = [len(X_train[col].cat.categories) for col in cat_cols]
+
+    return EncodedSplits(
+        key=split_key(ds, **split_kwargs),
+        X_train=_ordinal_frame(X_train, cat_cols, num_cols),
+        y_train=encode_labels(y_train).to_numpy(),
+        X_id=_ordinal_frame(X_id_test, cat_cols, num_cols),
+        y_id=encode_labels(y_id_test).to_numpy(),
+        X_ood=_ordinal_frame(X_ood, cat_cols, num_cols),
+        y_ood=encode_labels(y_ood).to_numpy(),
+        groups_train=np.asarray(ds.compute_group_id(X_train)),
+        groups_id=np.asarray(ds.compute_group_id(X_id_test)),
+        groups_ood=np.asarray(ds.compute_group_id(X_ood)),
+        cat_cols=cat_cols,
+        num_cols=num_cols,
+        categorical=np.array([False] * len(num_cols) + [n <= MAX_NATIVE_CATEGORIES for n in n_categories],
+                             dtype=bool),
+    )
+
+
+def get_ordinal(ds: Optional[DatasetSpec] = None, **split_kwargs) -> EncodedSplits:
+    """Memoized build_ordinal, next to the one-hot encodings in the same memo."""
+    ds = ds or get_dataset()
+    key = split_key(ds, **split_kwargs) + ":ordinal"
+    if key not in _ENCODED:
+        with span("encode", layout="ordinal"):
+            _ENCODED[key] = build_ordinal(ds, **split_kwargs)
+    return _ENCODED[key]
+
+
+def get_features(ds: Optional[DatasetSpec] = None, sparse: bool = True, **split_kwargs) -> EncodedSplits:
+    """One-hot CSR encodings for sparse-capable engines, else the dense ordinal layout."""
+    return get_encoded(ds, **split_kwargs) if sparse else get_ordinal(ds, **split_kwargs)
+
+
+def select_train_rows(y_train: np.ndarray, config) -> np.ndarray:
+    """
+    Positions of the training rows a strategy trains on, after optional
+    subsampling (sample_frac) and majority-class undersampling.
+    """
+    rows = np.arange(len(y_train))
+    # Seeded configs draw from their own generator; unseeded ones keep the global state
+    seed = getattr(config, "seed", None)
+    rng = np.random.default_rng(seed) if seed is not None else np.random
+
+    if config.sample_frac < 1.0:
+        n = int(len(rows) * config.sample_frac)
+        rows = rng.choice(rows, size=n, replace=False)
+
+    if getattr(config, "undersample_majority", False):
+        # majority = label 0 (no readmission)
+        y = y_train[rows]
+        maj_rows = rows[y == 0]
+        min_rows = rows[y == 1]
+
+        n_min = len(min_rows)
+        if n_min > 0 and len(maj_rows) > n_min:
+            undersampled_maj = rng.choice(maj_rows, size=n_min, replace=False)
+            rows = np.concatenate([undersampled_maj, min_rows])
+
+    return rows
+
+
+def clear_encoded_cache() -> None:
+    _ENCODED.clear()
@@ -0,0 +1,195 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from .group_metrics import EXCLUDED_GROUP_MARKERS, factorize_groups
+from .strategies import REG_STRENGTH_FACTOR, StrategyConfig
+
+# Online group DRO (Sagawa et al., 2020) for logistic regression.
+#
+# Each mini-batch step computes the mean log-loss of every group in the
+# batch, raises that group's weight q_g by exp(eta_q * loss_g), and takes
+# an Adam step on sum_g q_g * loss_g + l2 * ||w||^2 / 2. The adversary only
+# moves the weights of groups that count for worst-group metrics; rows of
+# Unknown/Invalid or missing groups keep a fixed share.
+DEFAULT_EPOCHS = 10
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_LR = 0.01
+DEFAULT_ETA_Q = 0.01
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+
+def _log_loss(z: np.ndarray, y: np.ndarray) -> np.ndarray:
+    # log(1 + exp(z)) - y * z, overflow-safe
+    return np.logaddexp(0.0, z) - y * z
+
+
+class GroupDROLogistic:
+    """
+    Logistic regression trained with online group DRO on (sparse) encoded
+    features. Mirrors the sklearn estimator interface used by run_experiment
+    (fit / predict_proba / get_params / set_params, coef_ / intercept_).
+    history_ holds per-epoch train loss and adversary weight per group.
+    """
+
+    def __init__(self, C: float = 1.0, reg_factor: float = 1.0, class_weight: Optional[str] = None,
+                 epochs: int = DEFAULT_EPOCHS, batch_size: int = DEFAULT_BATCH_SIZE,
+                 lr: float = DEFAULT_LR, eta_q: float = DEFAULT_ETA_Q,
+                 warm_start: bool = False, random_state: int = 0):
+        self.C = C
+        self.reg_factor = reg_factor
+        self.class_weight = class_weight
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.lr = lr
+        self.eta_q = eta_q
+        self.warm_start = warm_start
+        self.random_state = random_state
+
+    _PARAMS = ("C", "reg_factor", "class_weight", "epochs", "batch_size", "lr", "eta_q",
+               "warm_start", "random_state")
+
+    def get_params(self, deep: bool = True) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self._PARAMS}
+
+    def set_params(self, **params) -> "GroupDROLogistic":
+        for name, value in params.items():
+            if name not in self._PARAMS:
+                raise ValueError(f"Invalid parameter {name!r} for GroupDROLogistic")
+            setattr(self, name, value)
+        return self
+
+    def fit(self, X, y, groups) -> "GroupDROLogistic":
+        X = sp.csr_matrix(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        codes, labels = factorize_groups(groups)
+        n, d = X.shape
+        G = len(labels)
+        rng = np.random.default_rng(self.random_state)
+
+        # Max-abs column scaling (keeps sparsity); folded back into coef_ at the end
+        max_abs = np.asarray(abs(X).max(axis=0).todense()).ravel()
+        max_abs[max_abs == 0] = 1.0
+        Xs = X @ sp.diags(1.0 / max_abs)
+
+        # Adversary runs over eligible groups; the rest (and missing) share a fixed weight
+        adversarial = np.array([not any(m in g for m in EXCLUDED_GROUP_MARKERS) for g in labels], dtype=bool)
+        codes = np.where(codes >= 0, codes, G)  # missing -> extra fixed group
+        sizes = np.bincount(codes, minlength=G + 1).astype(np.float64)
+        adversarial = np.r_[adversarial, False]
+        q = sizes / n
+        fixed_mass = q[~adversarial].sum()
+
+        row_w = np.ones(n)
+        if self.class_weight == "balanced":
+            pos = y.sum()
+            if 0 < pos < n:
+                row_w = np.where(y == 1, n / (2 * pos), n / (2 * (n - pos)))
+
+        l2 = self.reg_factor / (self.C * n)
+        if self.warm_start and hasattr(self, "coef_"):
+            w, b = np.asarray(self.coef_, dtype=np.float64)[0] * max_abs, float(self.intercept_[0])
+        else:
+            w, b = np.zeros(d), 0.0
+        m_w, v_w = np.zeros(d), np.zeros(d)
+        m_b = v_b = 0.0
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        t = 0
+
+        history: List[Dict[str, Any]] = []
+        for _ in range(self.epochs):
+            perm = rng.permutation(n)
+            for start in range(0, n, self.batch_size):
+                idx = perm[start:start + self.batch_size]
+                Xb, yb, cb = Xs[idx], y[idx], codes[idx]
+                z = Xb @ w + b
+                loss = _log_loss(z, yb) * row_w[idx]
+
+                cnt = np.bincount(cb, minlength=G + 1)
+                group_loss = np.bincount(cb, weights=loss, minlength=G + 1) / np.maximum(cnt, 1)
+
+                # Exponentiated-gradient step on the groups present in this batch
+                step = adversarial & (cnt > 0)
+                if step.any():
+                    q[step] *= np.exp(self.eta_q * group_loss[step])
+                    q[adversarial] *= (1.0 - fixed_mass) / q[adversarial].sum()
+
+                # d/dz of sum_g q_g * mean_{i in g} loss_i
+                r = (q / np.maximum(cnt, 1))[cb] * row_w[idx] * (_sigmoid(z) - yb)
+                g_w = Xb.T @ r + l2 * w
+                g_b = r.sum()
+
+                t += 1
+                m_w = beta1 * m_w + (1 - beta1) * g_w
+                v_w = beta2 * v_w + (1 - beta2) * g_w * g_w
+                m_b = beta1 * m_b + (1 - beta1) * g_b
+                v_b = beta2 * v_b + (1 - beta2) * g_b * g_b
+                corr = np.sqrt(1 - beta2 ** t) / (1 - beta1 ** t)
+                w -= self.lr * corr * m_w / (np.sqrt(v_w) + eps)
+                b -= self.lr * corr * m_b / (np.sqrt(v_b) + eps)
+
+            # Full-train per-group loss once per epoch (one sparse mat-vec)
+            full = np.bincount(codes, weights=_log_loss(Xs @ w + b, y), minlength=G + 1) / np.maximum(sizes, 1)
+            history.append({
+                "group_loss": {g: float(full[i]) for i, g in enumerate(labels)},
+                "group_weight": {g: float(q[i]) for i, g in enumerate(labels)},
+            })
+
+        self.coef_ = (w / max_abs)[None, :]
+        self.intercept_ = np.array([b])
+        self.classes_ = np.array([0, 1])
+        self.history_ = history
+        return self
+
+    def predict_proba(self, X) -> np.ndarray:
+        z = sp.csr_matrix(X, dtype=np.float64) @ self.coef_[0] + self.intercept_[0]
+        p = _sigmoid(z)
+        return np.column_stack([1.0 - p, p])
+
+
+class OnlineGroupWeights:
+    """
+    The group-DRO adversary on its own, for trainers that only take
+    sample_weight (streaming partial_fit). update() takes a batch's per-row
+    losses under the current model and returns per-row weights with mean 1.
+    """
+
+    def __init__(self, group_counts: Dict[str, int], eta_q: float = DEFAULT_ETA_Q):
+        self.labels = list(group_counts)
+        self.index = pd.Index(self.labels)
+        sizes = np.array([group_counts[g] for g in self.labels], dtype=np.float64)
+        self.q = sizes / sizes.sum()
+        self.adversarial = np.array([not any(m in g for m in EXCLUDED_GROUP_MARKERS)
+                                     for g in self.labels], dtype=bool)
+        self.fixed_mass = self.q[~self.adversarial].sum()
+        self.eta_q = eta_q
+
+    def update(self, groups: np.ndarray, losses: Optional[np.ndarray]) -> np.ndarray:
+        G = len(self.labels)
+        # Groups unseen in the whole-train pass get no adversary weight of their own
+        codes = self.index.get_indexer(np.asarray(groups))
+        codes[codes < 0] = G
+        cnt = np.bincount(codes, minlength=G + 1)[:G]
+
+        if losses is not None:
+            group_loss = np.bincount(codes, weights=losses, minlength=G + 1)[:G] / np.maximum(cnt, 1)
+            step = self.adversarial & (cnt > 0)
+            if step.any():
+                self.q[step] *= np.exp(self.eta_q * group_loss[step])
+                self.q[self.adversarial] *= (1.0 - self.fixed_mass) / self.q[self.adversarial].sum()
+
+        per_group = np.r_[self.q / np.maximum(cnt, 1), 1.0 / len(codes)]
+        return per_group[codes] * len(codes)
+
+
+def build_group_dro_model(config: StrategyConfig) -> GroupDROLogistic:
+    seed = getattr(config, "seed", None)
+    return GroupDROLogistic(C=config.l2_C,
+                            reg_factor=REG_STRENGTH_FACTOR.get(config.reg_strength, 1.0),
+                            class_weight=config.class_weight,
+                            random_state=seed if seed is not None else 0)
@@ -0,0 +1,110 @@
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Groups whose label contains any of these are reported but never count as "worst"
+EXCLUDED_GROUP_MARKERS = ("Unknown", "Invalid")
+
+
+def factorize_groups(groups) -> Tuple[np.ndarray, List[str]]:
+    """Integer group codes (-1 for missing) and the label of each code."""
+    codes, uniques = pd.factorize(np.asarray(groups), use_na_sentinel=True)
+    return codes, [str(u) for u in uniques]
+
+
+def _safe_div(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    out = np.full(num.shape, np.nan, dtype=float)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def _group_auc(codes: np.ndarray, y: np.ndarray, proba: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Per-group ROC AUC from one sort: Mann-Whitney U on within-group
+    average ranks (ties share the mean rank, as in roc_auc_score).
+    """
+    order = np.lexsort((proba, codes))
+    c, p, yy = codes[order], proba[order], y[order]
+    n = len(c)
+
+    group_start = np.r_[True, c[1:] != c[:-1]]
+    tie_start = group_start | np.r_[True, p[1:] != p[:-1]]
+
+    start_pos = np.flatnonzero(tie_start)
+    end_pos = np.r_[start_pos[1:], n]
+    tie_id = np.cumsum(tie_start) - 1
+    first_of_group = np.maximum.accumulate(np.where(group_start, np.arange(n), 0))
+
+    # 1-based average rank inside the row's group
+    tie_rank = (start_pos + end_pos - 1) / 2.0 + 1.0
+    rank = tie_rank[tie_id] - first_of_group
+
+    n_pos = np.bincount(c, weights=yy, minlength=n_groups)
+    n_neg = np.bincount(c, minlength=n_groups) - n_pos
+    rank_sum_pos = np.bincount(c, weights=rank * yy, minlength=n_groups)
+    return _safe_div(rank_sum_pos - n_pos * (n_pos + 1) / 2.0, n_pos * n_neg)
+
+
+def _worst(values: Dict[str, float], labels: Iterable[str], lowest: bool = True):
+    valid = [values[g] for g in labels
+             if not any(m in g for m in EXCLUDED_GROUP_MARKERS) and not np.isnan(values[g])]
+    if not valid:
+        return None
+    return float(min(valid) if lowest else max(valid))
+
+
+def group_metrics(y_true, y_pred_proba, groups,
+                  threshold=0.5, n_bins: int = 10) -> Dict[str, Any]:
+    """
+    Per-group accuracy, AUC, expected calibration error, TPR and FPR, and
+    their worst-group values, computed with factorized codes and bincount.
+    threshold is a scalar or one value per row. Rows with a missing group
+    are ignored.
+    """
+    y = np.asarray(y_true).astype(np.int64)
+    proba = np.asarray(y_pred_proba, dtype=float)
+    threshold = np.asarray(threshold, dtype=float)
+    codes, labels = factorize_groups(groups)
+
+    keep = codes >= 0
+    if not keep.all():
+        y, proba, codes = y[keep], proba[keep], codes[keep]
+        if threshold.ndim:
+            threshold = threshold[keep]
+
+    G = len(labels)
+    y_hat = (proba >= threshold).astype(np.int64)
+
+    size = np.bincount(codes, minlength=G)
+    pos = np.bincount(codes, weights=y, minlength=G)
+    correct = np.bincount(codes, weights=(y == y_hat), minlength=G)
+    tp = np.bincount(codes, weights=y * y_hat, minlength=G)
+    fp = np.bincount(codes, weights=(1 - y) * y_hat, minlength=G)
+
+    # ECE: sum over bins of |sum(y) - sum(p)| / group size
+    bins = np.minimum((proba * n_bins).astype(np.int64), n_bins - 1)
+    cell = codes * n_bins + bins
+    sum_y = np.bincount(cell, weights=y, minlength=G * n_bins).reshape(G, n_bins)
+    sum_p = np.bincount(cell, weights=proba, minlength=G * n_bins).reshape(G, n_bins)
+    ece = _safe_div(np.abs(sum_y - sum_p).sum(axis=1), size)
+
+    per_group = {
+        "group_size": size,
+        "group_accuracy": _safe_div(correct, size),
+        "group_auc": _group_auc(codes, y, proba, G),
+        "group_ece": ece,
+        "group_tpr": _safe_div(tp, pos),
+        "group_fpr": _safe_div(fp, size - pos),
+    }
+    out: Dict[str, Any] = {
+        key: {g: (int(v) if key == "group_size" else float(v)) for g, v in zip(labels, arr)}
+        for key, arr in per_group.items()
+    }
+
+    out["worst_group_accuracy"] = _worst(out["group_accuracy"], labels)
+    out["worst_group_auc"] = _worst(out["group_auc"], labels)
+    out["worst_group_tpr"] = _worst(out["group_tpr"], labels)
+    out["worst_group_fpr"] = _worst(out["group_fpr"], labels, lowest=False)
+    out["worst_group_ece"] = _worst(out["group_ece"], labels, lowest=False)
+    return out
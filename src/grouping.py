@@ -7,5 +7,6 @@ def compute_group_id(df: pd.DataFrame) -> pd.Series:
     Here: Sex × ER, using gender + number_emergency.
     """
     er_flag = (df["number_emergency"] > 0).astype(int)
-    sex = df["sex"].replace({"Male": "Male", "Female": "Female"})
+    # astype(str): sex may be categorical (streamed shards)
+    sex = df["sex"].astype(str).replace({"Male": "Male", "Female": "Female"})
     return sex + "_" + er_flag.map({0: "NON_ER", 1: "ER"})
@@ -0,0 +1,241 @@
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# resource (peak RSS) is POSIX-only
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Spans: timed sections of a graph node, an LLM call or a run_experiment stage.
+#
+# Each span records wall time, process CPU time, the process's peak RSS and
+# how much the span raised it, rows processed and LLM tokens used. Spans
+# nest (parent_id) across threads and forked workers. Finished spans are
+# buffered per process and written to the results store when the
+# outermost span of that process closes. All spans of one agent session
+# share a trace id and export to Chrome trace format (chrome://tracing,
+# Perfetto).
+#
+#   python -m src.instrumentation                      # summary of the latest trace
+#   python -m src.instrumentation --list
+#   python -m src.instrumentation --trace ID --chrome trace.json
+
+ENABLED = os.getenv("PROMETHEUS_TRACE", "1") != "0"
+
+# Inherited by worker processes, so their spans join the parent's trace
+TRACE_ENV = "PROMETHEUS_TRACE_ID"
+
+# Open spans of the current thread / task, innermost last
+_STACK: contextvars.ContextVar[Tuple[Dict[str, Any], ...]] = contextvars.ContextVar("_span_stack", default=())
+
+_LOCK = threading.Lock()
+_BUFFER: List[Dict[str, Any]] = []
+_BUFFER_PID = os.getpid()
+
+
+def add_tokens(n: int) -> None:
+    """
+    Count LLM tokens towards the spans open in the calling context (called by
+    llm_client). The stack is per thread / task, so concurrent calls in async
+    mode are each credited only to their own spans and enclosing node.
+    """
+    n = int(n or 0)
+    with _LOCK:
+        for record in _STACK.get():
+            record["tokens"] += n
+
+
+def set_trace(trace_id: str) -> None:
+    os.environ[TRACE_ENV] = trace_id
+
+
+def current_trace() -> str:
+    trace_id = os.environ.get(TRACE_ENV)
+    if not trace_id:
+        trace_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        set_trace(trace_id)
+    return trace_id
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _append(record: Dict[str, Any]) -> None:
+    global _BUFFER_PID
+    with _LOCK:
+        if _BUFFER_PID != os.getpid():
+            # Forked worker: the parent's buffered spans are the parent's to write
+            _BUFFER.clear()
+            _BUFFER_PID = os.getpid()
+        _BUFFER.append(record)
+
+
+def flush() -> None:
+    """Write this process's finished spans to the results store."""
+    with _LOCK:
+        spans = [sp for sp in _BUFFER if sp["pid"] == os.getpid()]
+        _BUFFER.clear()
+    if not spans:
+        return
+    try:
+        from .results_store import record_spans
+        record_spans(spans)
+    except Exception as e:  # never fail a run over its instrumentation
+        print(f"Warning: could not record {len(spans)} spans: {e}")
+
+
+@contextmanager
+def span(name: str, cat: str = "stage", rows: Optional[int] = None, **attrs) -> Iterator[Dict[str, Any]]:
+    """
+    Time the enclosed block. Yields the span record, so callers can fill
+    in record["rows"] or record["attrs"] once they know them.
+    """
+    if not ENABLED:
+        yield {"attrs": {}}
+        return
+
+    stack = _STACK.get()
+    parent = stack[-1] if stack else None
+    record: Dict[str, Any] = {
+        "trace_id": current_trace(),
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": parent["span_id"] if parent else None,
+        "name": name,
+        "cat": cat,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "rows": rows,
+        "tokens": 0,
+        "attrs": dict(attrs),
+    }
+    start_us = time.time_ns() // 1000
+    wall0, cpu0, rss0 = time.perf_counter(), time.process_time(), _peak_rss_mb()
+    token = _STACK.set(stack + (record,))
+    try:
+        yield record
+    except BaseException as e:
+        record["attrs"]["error"] = type(e).__name__
+        raise
+    finally:
+        _STACK.reset(token)
+        rss1 = _peak_rss_mb()
+        record.update(
+            start_us=start_us,
+            wall_ms=(time.perf_counter() - wall0) * 1000.0,
+            cpu_ms=(time.process_time() - cpu0) * 1000.0,
+            peak_rss_mb=rss1,
+            rss_growth_mb=rss1 - rss0 if rss1 is not None else None,
+        )
+        _append(record)
+        # Outermost span of this process (a forked worker's parent span lives in the parent)
+        if parent is None or parent["pid"] != os.getpid():
+            flush()
+
+
+def traced(name: str, cat: str = "stage", attrs: Optional[Callable[..., Dict[str, Any]]] = None):
+    """Decorator form of span for sync and async functions; attrs(*args) adds span attributes."""
+    def wrap(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_inner(*args, **kwargs):
+                with span(name, cat, **(attrs(*args) if attrs else {})):
+                    return await fn(*args, **kwargs)
+            return async_inner
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(name, cat, **(attrs(*args) if attrs else {})):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def chrome_trace(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Spans as Chrome trace-event JSON (complete "X" events, microseconds)."""
+    events = []
+    for sp in spans:
+        args = {k: sp.get(k) for k in ("cpu_ms", "peak_rss_mb", "rss_growth_mb", "rows", "tokens")
+                if sp.get(k) is not None}
+        events.append({
+            "name": sp["name"],
+            "cat": sp["cat"],
+            "ph": "X",
+            "ts": sp["start_us"],
+            "dur": round(sp["wall_ms"] * 1000.0, 1),
+            "pid": sp["pid"],
+            "tid": sp["tid"],
+            "args": {**args, **(sp.get("attrs") or {})},
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def export_chrome_trace(trace_id: str, path: Path) -> Path:
+    from .results_store import load_spans
+
+    path = Path(path)
+    path.write_text(json.dumps(chrome_trace(load_spans(trace_id))))
+    return path
+
+
+def summarize(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Totals per (cat, name), slowest first."""
+    groups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for sp in spans:
+        g = groups.setdefault((sp["cat"], sp["name"]), {
+            "cat": sp["cat"], "name": sp["name"], "count": 0, "wall_ms": 0.0, "cpu_ms": 0.0,
+            "peak_rss_mb": 0.0, "rows": 0, "tokens": 0,
+        })
+        g["count"] += 1
+        g["wall_ms"] += sp["wall_ms"]
+        g["cpu_ms"] += sp["cpu_ms"]
+        g["peak_rss_mb"] = max(g["peak_rss_mb"], sp.get("peak_rss_mb") or 0.0)
+        g["rows"] += sp.get("rows") or 0
+        g["tokens"] += sp.get("tokens") or 0
+    return sorted(groups.values(), key=lambda g: g["wall_ms"], reverse=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .results_store import list_traces, load_spans
+
+    parser = argparse.ArgumentParser(description="Inspect instrumentation traces")
+    parser.add_argument("--trace", default=None, help="Trace / session id (default: latest)")
+    parser.add_argument("--list", action="store_true", help="List recent traces")
+    parser.add_argument("--chrome", type=Path, default=None, help="Write a Chrome trace JSON file")
+    args = parser.parse_args()
+
+    traces = list_traces()
+    if args.list:
+        for t in traces:
+            print(f"{t['trace_id']:<28} {t['n_spans']:>6} spans  {(t['end_us'] - t['start_us']) / 1e6:9.1f} s")
+        raise SystemExit(0)
+
+    trace_id = args.trace or (traces[0]["trace_id"] if traces else None)
+    if trace_id is None:
+        raise SystemExit("No traces recorded yet")
+
+    print(f"Trace {trace_id}")
+    print(f"{'cat':<6} {'name':<22} {'n':>5} {'wall ms':>10} {'cpu ms':>10} {'peak MB':>8} {'rows':>10} {'tokens':>8}")
+    for g in summarize(load_spans(trace_id)):
+        print(f"{g['cat']:<6} {g['name']:<22} {g['count']:>5} {g['wall_ms']:>10.1f} {g['cpu_ms']:>10.1f} "
+              f"{g['peak_rss_mb']:>8.0f} {g['rows']:>10} {g['tokens']:>8}")
+
+    if args.chrome:
+        print("Wrote", export_chrome_trace(trace_id, args.chrome))
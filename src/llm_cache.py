@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+# Content-addressed cache of LLM responses, keyed on
+# (model, temperature, system prompt, rendered prompt) plus any request
+# options that change the response (JSON mode, max_tokens).
+#
+# PROMETHEUS_LLM_CACHE selects the mode:
+#   off            never read or write the cache
+#   deterministic  cache only temperature-0 calls (default)
+#   record         cache every call
+#   replay         serve every call from the cache, ignore TTL, fail on a miss
+#                  (offline / CI runs against a recorded cache)
+#
+# Settings are read from the environment at call time, so values from a
+# .env loaded lazily by llm_client still apply.
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[1] / "cache" / "llm"
+DEFAULT_CACHE_MODE = "deterministic"
+DEFAULT_TTL_S = 7 * 24 * 3600
+DEFAULT_MAX_MB = 200
+
+# Eviction trims the cache to this fraction of the limit, so a full cache is
+# not rescanned on every put
+EVICT_TO = 0.9
+
+CACHE_MODES = ("off", "deterministic", "record", "replay")
+
+# Cache dir -> bytes in it as seen by this process: measured by the first
+# put, then kept current from the entries this process writes. The
+# directory is only scanned again when the running total crosses the limit.
+_SIZES: Dict[str, int] = {}
+
+
+class LLMCacheMiss(RuntimeError):
+    """Raised in replay mode when a prompt was never recorded."""
+
+
+def cache_dir() -> Path:
+    return Path(os.getenv("PROMETHEUS_LLM_CACHE_DIR", DEFAULT_CACHE_DIR))
+
+
+def cache_mode() -> str:
+    return os.getenv("PROMETHEUS_LLM_CACHE", DEFAULT_CACHE_MODE)
+
+
+def cache_ttl_s() -> float:
+    return float(os.getenv("PROMETHEUS_LLM_CACHE_TTL", DEFAULT_TTL_S))
+
+
+def cache_max_bytes() -> int:
+    return int(float(os.getenv("PROMETHEUS_LLM_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+
+
+def cache_key(model: str, temperature: float, system: str, prompt: str,
+              options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Key of one request. options holds request settings beyond the prompt
+    (e.g. json_mode, max_tokens); unset ones (None / False) are left out,
+    so plain requests keep the keys they were recorded under.
+    """
+    payload = {"model": model, "temperature": float(temperature), "system": system or "", "prompt": prompt}
+    options = {k: v for k, v in (options or {}).items() if v is not None and v is not False}
+    if options:
+        payload["options"] = options
+    blob = json.dumps(payload, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _path(key: str) -> Path:
+    return cache_dir() / key[:2] / f"{key}.json"
+
+
+def _should_cache(temperature: float, mode: str) -> bool:
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown PROMETHEUS_LLM_CACHE mode {mode!r}; expected one of {CACHE_MODES}")
+    if mode == "off":
+        return False
+    if mode == "deterministic":
+        return float(temperature) == 0.0
+    return True
+
+
+def get(key: str, ttl_s: Optional[float] = None) -> Optional[str]:
+    """Cached response, or None on a miss or an entry older than ttl_s (None = no expiry)."""
+    path = _path(key)
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if ttl_s is not None and time.time() - entry.get("created", 0) > ttl_s:
+        return None
+    # Touch for LRU eviction
+    os.utime(path, None)
+    return entry["response"]
+
+
+def put(key: str, response: str, model: str, temperature: float) -> None:
+    path = _path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    entry = {"model": model, "temperature": temperature, "created": time.time(), "response": response}
+    tmp = path.with_suffix(f".tmp{os.getpid()}")
+    data = json.dumps(entry).encode("utf-8")
+    tmp.write_bytes(data)
+    try:
+        replaced = path.stat().st_size
+    except OSError:
+        replaced = 0
+    os.replace(tmp, path)
+
+    root = str(cache_dir())
+    if root not in _SIZES:
+        _SIZES[root] = _scan(cache_dir())[1]
+    else:
+        _SIZES[root] += len(data) - replaced
+    if _SIZES[root] > cache_max_bytes():
+        evict(int(cache_max_bytes() * EVICT_TO))
+
+
+def _scan(root: Path):
+    """(mtime, size, path) of every entry under root, and their total size."""
+    entries = []
+    for p in root.glob("*/*.json"):
+        try:
+            st = p.stat()
+        except OSError:  # evicted by another process meanwhile
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+    return entries, sum(size for _, size, _ in entries)
+
+
+def evict(max_bytes: Optional[int] = None) -> int:
+    """Drop least-recently-used entries until the cache fits in max_bytes."""
+    max_bytes = cache_max_bytes() if max_bytes is None else max_bytes
+    root = cache_dir()
+    if not root.exists():
+        return 0
+    entries, total = _scan(root)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    _SIZES[str(root)] = total
+    return removed
+
+
+def cached_call(model: str, temperature: float, system: str, prompt: str,
+                call: Callable[[], str], mode: Optional[str] = None,
+                options: Optional[Dict[str, Any]] = None) -> str:
+    """Return a cached response for this exact request, or run call() and record it."""
+    mode = mode or cache_mode()
+    if not _should_cache(temperature, mode):
+        return call()
+
+    key = cache_key(model, temperature, system, prompt, options)
+    hit = get(key, ttl_s=None if mode == "replay" else cache_ttl_s())
+    if hit is not None:
+        return hit
+    if mode == "replay":
+        raise LLMCacheMiss(f"No recorded LLM response for {model} (key {key[:12]})")
+
+    response = call()
+    put(key, response, model, temperature)
+    return response
+
@@ -2,33 +2,234 @@
 
 import os
 import json
-from typing import List, Tuple
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, asdict
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 
-from dotenv import load_dotenv
-load_dotenv()
+from .strategies import StrategyConfig
+from .results_text import results_to_text
+from .llm_cache import cached_call
+from .instrumentation import add_tokens, span
+
+PROMPT_PATH = Path(__file__).resolve().parents[1] / "prompts" / "strategy_prompt.md"
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+# Sampling temperature of the strategy agent, on every back end
+STRATEGY_TEMPERATURE = 0.2
+
+STRATEGY_SYSTEM_PROMPT = (
+    "You are an expert ML researcher. "
+    "Respond with a single valid JSON object only. "
+    "Never use markdown. Never add explanations outside the JSON."
+)
+
+
+# =====================================================================
+# Provider registry
+# =====================================================================
+# Back ends (and .env) are loaded on first use, not at import, so
+# importing this module stays cheap for entry points that never call an LLM.
+_ENV_LOADED = False
+
+
+def _load_env() -> None:
+    global _ENV_LOADED
+    if _ENV_LOADED:
+        return
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    _ENV_LOADED = True
+
+
+def _import_groq():
+    from groq import Groq
+    return SimpleNamespace(Groq=Groq)
 
-# Optional imports with fallbacks
-OUMI_AVAILABLE = False
-try:
-    from oumi.core.configs import ModelParams, RemoteParams, InferenceConfig
+
+def _import_oumi():
+    from oumi.core.configs import GenerationParams, ModelParams, RemoteParams, InferenceConfig
     from oumi.core.types.conversation import Conversation, Message, Role
     from oumi.inference import OpenAIInferenceEngine
-    OUMI_AVAILABLE = True
-except ImportError:
-    pass
+    return SimpleNamespace(
+        GenerationParams=GenerationParams, ModelParams=ModelParams, RemoteParams=RemoteParams,
+        InferenceConfig=InferenceConfig,
+        Conversation=Conversation, Message=Message, Role=Role,
+        OpenAIInferenceEngine=OpenAIInferenceEngine,
+    )
 
-GROQ_DIRECT_AVAILABLE = False
-try:
-    from groq import Groq
-    GROQ_DIRECT_AVAILABLE = True
-except ImportError:
-    pass
 
-from .strategies import StrategyConfig
-from .results_text import results_to_text
+PROVIDERS: Dict[str, Callable[[], SimpleNamespace]] = {
+    "groq": _import_groq,
+    "oumi": _import_oumi,
+}
+_PROVIDER_MODULES: Dict[str, SimpleNamespace] = {}
 
-PROMPT_PATH = Path(__file__).resolve().parents[1] / "prompts" / "strategy_prompt.md"
+
+def load_provider(name: str) -> SimpleNamespace:
+    """Import a back end on first use. Raises ImportError if it isn't installed."""
+    if name not in _PROVIDER_MODULES:
+        _PROVIDER_MODULES[name] = PROVIDERS[name]()
+    return _PROVIDER_MODULES[name]
+
+
+def provider_available(name: str) -> bool:
+    try:
+        load_provider(name)
+        return True
+    except ImportError:
+        return False
+
+
+# =====================================================================
+# Shared client registry
+# =====================================================================
+# One pooled client per provider for the whole process. The underlying
+# httpx client keeps connections alive, so only the first call pays for
+# connection setup and the TLS handshake.
+_CLIENTS: Dict[str, Any] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+@dataclass
+class AgentLLMStats:
+    calls: int = 0
+    cache_hits: int = 0
+    errors: int = 0
+    latency_s: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+_STATS: Dict[str, AgentLLMStats] = {}
+_STATS_LOCK = threading.Lock()
+
+
+def get_groq_client():
+    """Process-wide Groq client with a pooled keep-alive HTTP connection."""
+    with _CLIENTS_LOCK:
+        if "groq" not in _CLIENTS:
+            _load_env()
+            try:
+                groq = load_provider("groq")
+            except ImportError:
+                raise RuntimeError("Please install Groq SDK: pip install groq")
+            api_key = os.getenv("GROQ_API_KEY")
+            if not api_key:
+                raise RuntimeError("Missing GROQ_API_KEY in .env file")
+
+            # PROMETHEUS_LLM_BASE_URL points every agent at another
+            # OpenAI-compatible endpoint, e.g. src/llm_stub_server.py offline.
+            max_connections = int(os.getenv("PROMETHEUS_LLM_MAX_CONNECTIONS", "16"))
+            import httpx
+            http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_connections,
+                                    keepalive_expiry=60.0),
+                timeout=float(os.getenv("PROMETHEUS_LLM_HTTP_TIMEOUT", "120")),
+            )
+            _CLIENTS["groq"] = groq.Groq(api_key=api_key,
+                                         base_url=os.getenv("PROMETHEUS_LLM_BASE_URL"),
+                                         http_client=http_client)
+        return _CLIENTS["groq"]
+
+
+def get_oumi_engine(model_name: str = "gpt-4o-mini"):
+    """Process-wide Oumi OpenAI engine (only when Oumi and OPENAI_API_KEY are available)."""
+    key = f"oumi:{model_name}"
+    with _CLIENTS_LOCK:
+        if key not in _CLIENTS:
+            oumi = load_provider("oumi")
+            model_params = oumi.ModelParams(model_name=model_name)
+            remote_params = oumi.RemoteParams(
+                api_url="https://api.openai.com/v1",
+                api_key=os.getenv("OPENAI_API_KEY"),
+            )
+            _CLIENTS[key] = oumi.OpenAIInferenceEngine(model_params=model_params, remote_params=remote_params)
+        return _CLIENTS[key]
+
+
+def _record(agent: str, latency_s: float = 0.0, usage=None, cache_hit: bool = False, error: bool = False) -> None:
+    with _STATS_LOCK:
+        stats = _STATS.setdefault(agent, AgentLLMStats())
+        stats.calls += 1
+        stats.latency_s += latency_s
+        stats.cache_hits += int(cache_hit)
+        stats.errors += int(error)
+        if usage is not None:
+            stats.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            stats.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+    if usage is not None:
+        add_tokens((getattr(usage, "prompt_tokens", 0) or 0) + (getattr(usage, "completion_tokens", 0) or 0))
+
+
+def llm_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-agent call counts, cache hits, latency and token totals for this process."""
+    with _STATS_LOCK:
+        return {agent: asdict(stats) for agent, stats in _STATS.items()}
+
+
+def reset_llm_stats() -> None:
+    with _STATS_LOCK:
+        _STATS.clear()
+
+
+def chat(agent: str, prompt: str, temperature: float, system: str = "",
+         model: str = DEFAULT_MODEL, json_mode: bool = False,
+         max_tokens: Optional[int] = None) -> str:
+    """
+    The one LLM entry point for every agent: cached (see llm_cache), sent
+    over the shared Groq client, and counted under `agent` in llm_stats().
+    """
+    _load_env()
+    called = False
+
+    def _complete() -> str:
+        nonlocal called
+        called = True
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        kwargs: Dict[str, Any] = {}
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        if json_mode:
+            kwargs["response_format"] = {"type": "json_object"}  # Enforced JSON
+
+        start = time.perf_counter()
+        try:
+            completion = get_groq_client().chat.completions.create(
+                model=model, messages=messages, temperature=temperature, **kwargs,
+            )
+        except Exception:
+            _record(agent, time.perf_counter() - start, error=True)
+            raise
+        _record(agent, time.perf_counter() - start, usage=getattr(completion, "usage", None))
+
+        message = completion.choices[0].message
+        if not message.content:
+            raise ValueError("Empty response from Groq")
+        return message.content
+
+    with span(agent, cat="llm", model=model) as sp:
+        response = cached_call(model, temperature, system, prompt, _complete,
+                               options={"json_mode": json_mode, "max_tokens": max_tokens})
+        sp["attrs"]["cache_hit"] = not called
+    if not called:
+        _record(agent, cache_hit=True)
+    return response
+
+
+async def achat(agent: str, prompt: str, temperature: float, **kwargs) -> str:
+    """Async chat(): runs on a worker thread, sharing the same pooled client."""
+    return await asyncio.to_thread(chat, agent, prompt, temperature, **kwargs)
 
 
 def _load_prompt() -> str:
@@ -61,6 +262,8 @@ def parse_llm_strategies(raw_text: str) -> List[StrategyConfig]:
     if not text:
         raise ValueError("LLM returned empty response after cleaning")
 
+    from .models.engines import DEFAULT_ENGINE, get_engine  # validates proposed "model" names
+
     try:
         data = json.loads(text)
     except json.JSONDecodeError as e:
@@ -86,14 +289,20 @@ def parse_llm_strategies(raw_text: str) -> List[StrategyConfig]:
                     "l2_C": cfg.get("params", {}).get("l2_C", 1.0),
                     "sample_frac": cfg.get("params", {}).get("sample_frac", 1.0),
                     "undersample_majority": cfg.get("params", {}).get("undersample_majority", False),
-                    "reg_strength": cfg.get("params", {}).get("reg_strength", "normal")
+                    "reg_strength": cfg.get("params", {}).get("reg_strength", "normal"),
+                    "model": cfg.get("params", {}).get("model") or cfg.get("model"),
                 }
                 # Remove None values to use defaults
                 strategy_config = {k: v for k, v in strategy_config.items() if v is not None}
-                strategies.append(StrategyConfig(**strategy_config))
+                strategy = StrategyConfig(**strategy_config)
             else:
                 # Fallback to direct mapping for backward compatibility
-                strategies.append(StrategyConfig(**hypothesis))
+                strategy = StrategyConfig(**hypothesis)
+            get_engine(strategy.model)
+            if strategy.use_group_dro and strategy.model != DEFAULT_ENGINE:
+                # Group DRO has its own logistic trainer; another engine name would only duplicate it
+                strategy.model = DEFAULT_ENGINE
+            strategies.append(strategy)
         except Exception as e:
             print(f"Warning: Skipping invalid strategy #{i}: {hypothesis} | Error: {e}")
 
@@ -112,61 +321,35 @@ def call_llm_and_get_strategies() -> Tuple[List[StrategyConfig], str]:
     rationale = "No rationale extracted."
 
     # === Try Oumi + OpenAI first (if available) ===
-    if OUMI_AVAILABLE and os.getenv("OPENAI_API_KEY"):
+    _load_env()
+    if os.getenv("OPENAI_API_KEY") and provider_available("oumi"):
         try:
-            model_params = ModelParams(model_name="gpt-4o-mini")
-            remote_params = RemoteParams(
-                api_url="https://api.openai.com/v1",
-                api_key=os.getenv("OPENAI_API_KEY"),
-            )
-            engine = OpenAIInferenceEngine(model_params=model_params, remote_params=remote_params)
+            oumi = load_provider("oumi")
+            engine = get_oumi_engine("gpt-4o-mini")
 
-            conversation = Conversation(messages=[Message(role=Role.USER, content=prompt)])
-            output = engine.infer(input=[conversation], inference_config=InferenceConfig())
-            raw = output[0].messages[-1].content
+            def _infer():
+                conversation = oumi.Conversation(messages=[oumi.Message(role=oumi.Role.USER, content=prompt)])
+                start = time.perf_counter()
+                config = oumi.InferenceConfig(generation=oumi.GenerationParams(temperature=STRATEGY_TEMPERATURE))
+                output = engine.infer(input=[conversation], inference_config=config)
+                _record("strategy", time.perf_counter() - start)
+                return output[0].messages[-1].content
+
+            raw = cached_call("gpt-4o-mini", STRATEGY_TEMPERATURE, "", prompt, _infer)
 
             strategies = parse_llm_strategies(raw)
-            if isinstance(output[0].messages[-1].content, dict) and "rationale" in output[0].messages[-1].content:
-                rationale = output[0].messages[-1].content.get("rationale", rationale)
+            if isinstance(raw, dict) and "rationale" in raw:
+                rationale = raw.get("rationale", rationale)
 
             return strategies, rationale
         except Exception as e:
             print(f"Warning: Oumi/OpenAI fallback failed: {e}")
 
     # === Main path: Groq with native JSON mode ===
-    if not GROQ_DIRECT_AVAILABLE:
-        raise RuntimeError("Please install Groq SDK: pip install groq")
-
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        raise RuntimeError("Missing GROQ_API_KEY in .env file")
-
-    client = Groq(api_key=api_key)
-
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an expert ML researcher. "
-                        "Respond with a single valid JSON object only. "
-                        "Never use markdown. Never add explanations outside the JSON."
-                    )
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.2,
-            max_tokens=2048,
-            response_format={"type": "json_object"},  # Enforced JSON
-        )
-
-        message = completion.choices[0].message
-        if not message.content:
-            raise ValueError("Empty response from Groq")
-
-        raw_text = message.content
+        # Cached per PROMETHEUS_LLM_CACHE (record/replay for offline reruns)
+        raw_text = chat("strategy", prompt, temperature=STRATEGY_TEMPERATURE, system=STRATEGY_SYSTEM_PROMPT,
+                        json_mode=True, max_tokens=2048)
         print("\nRaw LLM Output (first 600 chars):")
         print(raw_text[:600])
         if len(raw_text) > 600:
@@ -185,8 +368,10 @@ def call_llm_and_get_strategies() -> Tuple[List[StrategyConfig], str]:
 
     except Exception as e:
         error_str = str(e).lower()
+        if "install groq" in error_str or "missing groq_api_key" in error_str:
+            raise
         if "authentication" in error_str or "401" in error_str:
             raise RuntimeError("Invalid GROQ_API_KEY - check https://console.groq.com/keys")
         if "quota" in error_str or "402" in error_str:
             raise RuntimeError("Groq quota exceeded - check https://console.groq.com/usage")
-        raise RuntimeError(f"Groq LLM call failed: {e}")
\ No newline at end of file
+        raise RuntimeError(f"Groq LLM call failed: {e}")
@@ -0,0 +1,90 @@
+# src/llm_stub_server.py
+"""
+Minimal OpenAI-compatible chat completions server for offline runs.
+
+    python -m src.llm_stub_server --port 8765
+    PROMETHEUS_LLM_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=stub python -m src.agent_graph
+
+Responses are canned: JSON-mode requests get a fixed strategy list, judge
+prompts get a score, anything else gets a short note.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+
+STUB_STRATEGIES = {
+    "rationale": "Stub response: class reweighting and group reweighting baselines.",
+    "strategies": [
+        {"name": "stub_class_balanced", "class_weight": "balanced"},
+        {"name": "stub_group_dro", "use_group_dro": True},
+    ],
+}
+STUB_JUDGE_SCORE = "0.5"
+STUB_NOTE = "Stub response."
+
+
+def stub_reply(request: Dict[str, Any]) -> str:
+    prompt = request.get("messages", [{}])[-1].get("content", "")
+    if (request.get("response_format") or {}).get("type") == "json_object":
+        return json.dumps(STUB_STRATEGIES)
+    if "ONLY a single float" in prompt:
+        return STUB_JUDGE_SCORE
+    return STUB_NOTE
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        content = stub_reply(request)
+        prompt_chars = sum(len(m.get("content", "")) for m in request.get("messages", []))
+        body = json.dumps({
+            "id": "stub-1",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_chars // 4 + len(content) // 4,
+            },
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve in a daemon thread. Returns (server, base_url); port=0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), _Handler)
+    print(f"LLM stub server on http://{args.host}:{args.port}")
+    server.serve_forever()
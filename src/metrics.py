@@ -1,12 +1,20 @@
-from typing import Dict
-from sklearn.metrics import accuracy_score, roc_auc_score
+from typing import Any, Dict
 
-def compute_metrics(y_true, y_pred_proba) -> Dict[str, float]:
+from .group_metrics import group_metrics
+
+def compute_metrics(y_true, y_pred_proba, groups=None, threshold=0.5) -> Dict[str, Any]:
     """
     y_pred_proba: predicted probability of positive class.
+    groups: optional per-row group ids; adds per-group and worst-group
+    accuracy / AUC / calibration error / TPR / FPR (see group_metrics).
+    threshold: decision threshold, scalar or one per row (per-group
+    post-hoc policies, see threshold_sweep).
     """
-    # assume positive class is ">30" or "YES" etc. We’ll threshold at 0.5
-    y_pred = (y_pred_proba >= 0.5).astype(int)
+    # sklearn is imported on first use to keep module import cheap
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    # assume positive class is ">30" or "YES" etc. Thresholded at 0.5 unless given
+    y_pred = (y_pred_proba >= threshold).astype(int)
 
     # If labels are strings in the raw data, we’ll handle that in training script.
     metrics = {}
@@ -15,4 +23,7 @@ def compute_metrics(y_true, y_pred_proba) -> Dict[str, float]:
     except ValueError:
         metrics["auc"] = float("nan")
     metrics["accuracy"] = accuracy_score(y_true, y_pred)
+
+    if groups is not None:
+        metrics.update(group_metrics(y_true, y_pred_proba, groups, threshold=threshold))
     return metrics
@@ -0,0 +1,3 @@
+from .engines import DEFAULT_ENGINE, ENGINES, LINEAR_ENGINES, ModelEngine, build_model, get_engine
+
+__all__ = ["DEFAULT_ENGINE", "ENGINES", "LINEAR_ENGINES", "ModelEngine", "build_model", "get_engine"]
@@ -0,0 +1,30 @@
+from typing import Callable, Optional
+
+import pandas as pd
+
+from ..strategies import StrategyConfig
+from .engines import build_model
+
+
+def build_baseline_model(config: Optional[StrategyConfig] = None) -> Callable[[pd.DataFrame], object]:
+    """
+    Factory for the raw-frame baseline used by train_baseline: returns
+    make_model(X) -> Pipeline that one-hot encodes X's categorical columns
+    and fits the config's engine (default: logistic regression).
+    """
+    config = config or StrategyConfig(name="baseline")
+
+    def make_model(X: pd.DataFrame):
+        from sklearn.compose import ColumnTransformer
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import OneHotEncoder
+
+        cat_cols = list(X.select_dtypes(include=["object", "category", "string"]).columns)
+        num_cols = list(X.select_dtypes(include=["number"]).columns)
+        encode = ColumnTransformer([
+            ("num", "passthrough", num_cols),
+            ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=True), cat_cols),
+        ])
+        return Pipeline([("encode", encode), ("model", build_model(config, n_rows=len(X)))])
+
+    return make_model
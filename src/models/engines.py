@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from ..strategies import REG_STRENGTH_FACTOR, StrategyConfig
+
+# Model engines selectable per strategy with StrategyConfig.model.
+#
+# Each engine builds an unfitted estimator from a config and declares what
+# it can consume, so run_experiment can hand it the cheapest input:
+#
+#   sparse         takes the shared one-hot CSR matrices (feature_store.get_encoded);
+#                  engines without it get the dense ordinal layout instead
+#                  (numerics + category codes, feature_store.get_ordinal)
+#   threads        parallelises its own fit (OpenMP), so it is given a share
+#                  of the cores instead of the single thread other workers get
+#
+# sklearn is imported inside the builders, so listing engines stays cheap.
+
+# Engines that train a logistic loss; streaming only exists for these (group DRO
+# has its own logistic trainer and takes model="logreg")
+LINEAR_ENGINES = ("logreg", "sgd")
+
+# Histogram GB bins categoricals natively up to this many categories
+MAX_NATIVE_CATEGORIES = 255
+
+
+def _reg_factor(config: StrategyConfig) -> float:
+    return REG_STRENGTH_FACTOR.get(config.reg_strength, 1.0)
+
+
+def _seed(config: StrategyConfig) -> int:
+    seed = getattr(config, "seed", None)
+    return seed if seed is not None else 0
+
+
+def sgd_classifier(config: StrategyConfig, n_rows: int):
+    """Logistic regression by SGD; l2_C maps to alpha = 1 / (C * n) as in LogisticRegression."""
+    from sklearn.linear_model import SGDClassifier
+
+    return SGDClassifier(loss="log_loss", alpha=_reg_factor(config) / (config.l2_C * max(n_rows, 1)),
+                         class_weight=config.class_weight, random_state=_seed(config))
+
+
+def build_logreg(config: StrategyConfig, n_rows: int, categorical: Optional[np.ndarray] = None):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import MaxAbsScaler
+
+    # Max-abs scaling keeps the matrix sparse and lets lbfgs converge in few iterations
+    return Pipeline([
+        ("scale", MaxAbsScaler()),
+        ("clf", LogisticRegression(C=config.l2_C / _reg_factor(config),
+                                   class_weight=config.class_weight, max_iter=1000)),
+    ])
+
+
+def build_sgd(config: StrategyConfig, n_rows: int, categorical: Optional[np.ndarray] = None):
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import MaxAbsScaler
+
+    return Pipeline([("scale", MaxAbsScaler()), ("clf", sgd_classifier(config, n_rows))])
+
+
+def build_hist_gb(config: StrategyConfig, n_rows: int, categorical: Optional[np.ndarray] = None):
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    # l2_C / reg_strength map onto the leaf-value L2 penalty (larger C = weaker)
+    return HistGradientBoostingClassifier(
+        l2_regularization=_reg_factor(config) / config.l2_C,
+        class_weight=config.class_weight,
+        categorical_features=categorical if categorical is not None and categorical.any() else None,
+        random_state=_seed(config),
+    )
+
+
+@dataclass(frozen=True)
+class ModelEngine:
+    name: str
+    build: Callable[..., Any]  # (config, n_rows, categorical=None) -> unfitted estimator
+    sparse: bool
+    threads: bool
+    description: str = ""
+
+
+ENGINES: Dict[str, ModelEngine] = {
+    "logreg": ModelEngine("logreg", build_logreg, sparse=True, threads=False,
+                          description="L2 logistic regression (lbfgs)"),
+    "hist_gb": ModelEngine("hist_gb", build_hist_gb, sparse=False, threads=True,
+                           description="histogram gradient boosting with native categoricals"),
+    "sgd": ModelEngine("sgd", build_sgd, sparse=True, threads=False,
+                       description="linear logistic model trained by SGD"),
+}
+
+DEFAULT_ENGINE = "logreg"
+
+
+def get_engine(name: Optional[str]) -> ModelEngine:
+    try:
+        return ENGINES[name or DEFAULT_ENGINE]
+    except KeyError:
+        raise ValueError(f"Unknown model engine {name!r}; expected one of {sorted(ENGINES)}") from None
+
+
+def build_model(config: StrategyConfig, n_rows: int, categorical: Optional[np.ndarray] = None):
+    """Unfitted estimator for config.model."""
+    return get_engine(getattr(config, "model", None)).build(config, n_rows, categorical=categorical)
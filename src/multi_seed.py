@@ -0,0 +1,259 @@
+import hashlib
+import json
+from dataclasses import asdict, replace
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .array_store import load_predictions
+from .group_metrics import EXCLUDED_GROUP_MARKERS
+from .models import get_engine
+from .parallel import run_experiments_parallel
+from .results_store import EXPERIMENTS_DIR, find_run, save_run
+from .datasets import get_dataset
+from .selection import run_score
+from .split_cache import split_key
+from .strategies import StrategyConfig, config_fingerprint, split_kwargs
+from .threshold_sweep import row_thresholds
+
+# Repeated evaluation of a strategy to put error bars on its metrics.
+#
+#   seeds      N replicas with different training seeds (and optionally
+#              split seeds), run in parallel over shared encodings; replica 0
+#              is the config's own run, and configs the seed cannot change
+#              fall back to bootstrap
+#   bootstrap  resamples of the ID/OOD rows of one stored run,
+#              computed from its saved probabilities without refitting
+#
+# Either way the strategy is saved as one aggregate run: mean metrics in
+# "id"/"ood" and mean/std/CI per headline metric in "uncertainty", which
+# selection.is_better uses to ignore differences within the noise.
+DEFAULT_SEEDS = 5
+DEFAULT_BOOTSTRAP = 1000
+CI_LEVEL = 0.95
+
+# Resampled rows drawn at once by bootstrap_run (bounds its memory, ~8 bytes each)
+BOOTSTRAP_BLOCK_ROWS = 2_000_000
+
+# (section, key) of the metrics that get uncertainty estimates
+UNCERTAINTY_METRICS = {
+    "id_accuracy": ("id", "accuracy"),
+    "ood_accuracy": ("ood", "accuracy"),
+    "worst_group_accuracy": ("ood", "worst_group_accuracy"),
+}
+
+
+def _summary(values: Sequence[float], method: str) -> Dict[str, float]:
+    v = np.asarray([x for x in values if x is not None and x == x], dtype=float)
+    if len(v) == 0:
+        return {"n": 0}
+    mean = float(v.mean())
+    std = float(v.std(ddof=1)) if len(v) > 1 else 0.0
+    tail = (1.0 - CI_LEVEL) / 2.0
+    if method == "bootstrap":
+        lo, hi = np.quantile(v, [tail, 1.0 - tail])
+    else:
+        # Student t interval on the mean of the replicas
+        from scipy.stats import t
+
+        half = float(t.ppf(1.0 - tail, len(v) - 1)) * std / np.sqrt(len(v)) if len(v) > 1 else 0.0
+        lo, hi = mean - half, mean + half
+    return {"n": int(len(v)), "mean": mean, "std": std, "ci_low": float(lo), "ci_high": float(hi),
+            # spread of the point estimate itself: std of the mean for seeds, std for bootstrap
+            "se": std / np.sqrt(len(v)) if method == "seeds" else std}
+
+
+def _mean_metrics(runs: List[Dict[str, Any]], section: str) -> Dict[str, Any]:
+    """Mean of every scalar metric (and of every per-group value) across replicas."""
+    out: Dict[str, Any] = {}
+    first = runs[0][section]
+    for key, value in first.items():
+        if isinstance(value, dict):
+            per_group = {g: np.array([r[section][key].get(g, np.nan) for r in runs], dtype=float)
+                         for g in value}
+            # NaN where no replica defines the value (e.g. a single-class group's AUC)
+            out[key] = {g: float(np.nanmean(v)) if not np.isnan(v).all() else float("nan")
+                        for g, v in per_group.items()}
+        elif isinstance(value, (int, float)) or value is None:
+            vals = [r[section].get(key) for r in runs]
+            vals = [v for v in vals if v is not None]
+            out[key] = float(np.mean(vals)) if vals else None
+    return out
+
+
+def _aggregate_fingerprint(config: StrategyConfig, spec: Dict[str, Any]) -> str:
+    base = config_fingerprint(config, split_key(get_dataset(), **split_kwargs(config)))
+    blob = json.dumps({"base": base, **spec}, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+def _save_aggregate(result: Dict[str, Any]) -> Dict[str, Any]:
+    name = result["config"]["name"]
+    out_path = EXPERIMENTS_DIR / f"run_{name}-{result['fingerprint'][:8]}.json"
+    EXPERIMENTS_DIR.mkdir(exist_ok=True)
+    with out_path.open("w") as f:
+        json.dump(result, f, indent=2)
+    save_run(result, path=out_path)
+    print("Saved", out_path)
+    return result
+
+
+def uses_training_seed(config: StrategyConfig) -> bool:
+    """
+    Whether the training seed changes the fit: row subsampling, SGD and
+    group DRO batch order, gradient boosting's early-stopping split.
+    Full-data lbfgs logistic regression is deterministic.
+    """
+    return (config.sample_frac < 1.0 or config.undersample_majority or config.streaming
+            or config.use_group_dro or get_engine(config.model).name != "logreg")
+
+
+def _replica(config: StrategyConfig, k: int, vary_split: bool) -> StrategyConfig:
+    # Replica 0 is the config itself, so its regular (saved, reusable) run counts
+    if k == 0:
+        return config
+    seed = (config.seed or 0) + k
+    split_seed = (config.split_seed if config.split_seed is not None else 42) + k
+    return replace(config, name=f"{config.name}#s{k}", seed=seed,
+                   split_seed=split_seed if vary_split else config.split_seed)
+
+
+def evaluate_with_seeds(configs: Sequence[StrategyConfig], n_seeds: int = DEFAULT_SEEDS,
+                        vary_split: bool = False, n_workers: Optional[int] = None,
+                        save: bool = True, reuse: bool = True) -> List[Dict[str, Any]]:
+    """
+    Run every config with n_seeds training seeds (and, with vary_split, a
+    different split per seed) and return one aggregate run per config in
+    input order.
+
+    Replica 0 is the config's own run, saved and reused by fingerprint like
+    any other, so a candidate that was already fit costs n_seeds - 1 extra
+    fits. Configs whose fit does not depend on the seed get bootstrap error
+    bars from that one run instead of identical refits, which needs its
+    stored predictions: with save=False such configs are rejected.
+    Aggregates are named <name>+seeds / <name>+boot, apart from the base run.
+    """
+    configs = list(configs)
+    if not save:
+        fixed = [cfg.name for cfg in configs if not (vary_split or uses_training_seed(cfg))]
+        if fixed:
+            raise ValueError(f"{fixed} do not depend on the training seed and are bootstrapped from "
+                             "their stored predictions; evaluate them with save=True")
+    spec = {"method": "seeds", "n_seeds": n_seeds, "vary_split": vary_split}
+    fingerprints = [_aggregate_fingerprint(cfg, spec) for cfg in configs]
+
+    results: Dict[int, Dict[str, Any]] = {}
+    pending = []
+    for i, (cfg, fp) in enumerate(zip(configs, fingerprints)):
+        previous = find_run(fp) if reuse else None
+        if previous is not None:
+            results[i] = previous
+        else:
+            pending.append(i)
+
+    # Base runs are regular runs (stored unless save=False); extra replicas of
+    # all seeded configs share one pool (and one encoding per split)
+    base_runs = dict(zip(pending, run_experiments_parallel([configs[i] for i in pending],
+                                                           n_workers=n_workers, save=save)))
+    seeded = [i for i in pending if vary_split or uses_training_seed(configs[i])]
+    replicas = [_replica(configs[i], k, vary_split) for i in seeded for k in range(1, n_seeds)]
+    replica_runs = run_experiments_parallel(replicas, n_workers=n_workers, save=False)
+
+    for i in pending:
+        if i not in seeded and "arrays" in base_runs[i]:
+            boot = bootstrap_run(base_runs[i], save=False)
+            result = {**boot, "config": {**asdict(configs[i]), "name": f"{configs[i].name}+boot"},
+                      "fingerprint": fingerprints[i],
+                      "uncertainty": {**boot["uncertainty"], **spec, "method": "bootstrap"}}
+            results[i] = _save_aggregate(result) if save else result
+            continue
+
+        j = seeded.index(i) if i in seeded else None
+        runs = [base_runs[i]]
+        if j is not None:
+            runs += replica_runs[j * (n_seeds - 1):(j + 1) * (n_seeds - 1)]
+        uncertainty = {m: _summary([r[s].get(k) for r in runs], "seeds")
+                       for m, (s, k) in UNCERTAINTY_METRICS.items()}
+        uncertainty["run_score"] = _summary([run_score(r) for r in runs], "seeds")
+        result = {
+            "config": {**asdict(configs[i]), "name": f"{configs[i].name}+seeds"},
+            "id": _mean_metrics(runs, "id"),
+            "ood": _mean_metrics(runs, "ood"),
+            "fingerprint": fingerprints[i],
+            "uncertainty": {**uncertainty, **spec},
+        }
+        results[i] = _save_aggregate(result) if save else result
+    return [results[i] for i in range(len(configs))]
+
+
+def _bootstrap_split(y, proba, codes, labels: List[str], n_boot: int, rng: np.random.Generator,
+                     threshold=0.5):
+    """
+    Accuracy and worst-group accuracy of n_boot resamples of the rows. Row
+    indices are drawn in blocks of BOOTSTRAP_BLOCK_ROWS, and the per-group
+    counts of a whole block come from one bincount over (resample, group)
+    cells. A group missing from a resample does not count towards its minimum.
+    """
+    correct = ((np.asarray(proba, dtype=float) >= threshold) == np.asarray(y)).astype(float)
+    n, n_groups = len(correct), len(labels) + 1
+    # Rows without a group (code -1) go to the extra last cell
+    codes = np.where(np.asarray(codes) < 0, n_groups - 1, codes).astype(np.int64)
+    scored = np.array([not any(m in label for m in EXCLUDED_GROUP_MARKERS) for label in labels] + [False])
+    scored &= np.bincount(codes, minlength=n_groups) > 0
+
+    acc, wga = np.empty(n_boot), np.empty(n_boot)
+    block = max(1, BOOTSTRAP_BLOCK_ROWS // max(n, 1))
+    for start in range(0, n_boot, block):
+        b = min(block, n_boot - start)
+        idx = rng.integers(0, n, size=(b, n))
+        hits = correct[idx]
+        acc[start:start + b] = hits.mean(axis=1)
+        if not scored.any():
+            wga[start:start + b] = acc[start:start + b]
+            continue
+        cells = (codes[idx] + n_groups * np.arange(b)[:, None]).ravel()
+        size = np.bincount(cells, minlength=b * n_groups).reshape(b, n_groups)[:, scored]
+        right = np.bincount(cells, weights=hits.ravel(), minlength=b * n_groups).reshape(b, n_groups)[:, scored]
+        group_acc = np.where(size > 0, right / np.maximum(size, 1), np.inf)
+        wga[start:start + b] = group_acc.min(axis=1)
+    return acc, wga
+
+
+def bootstrap_run(run: Dict[str, Any], n_boot: int = DEFAULT_BOOTSTRAP, seed: int = 0,
+                  save: bool = True) -> Dict[str, Any]:
+    """
+    Bootstrap error bars for a stored run from its saved probabilities
+    (no refit), returned as a copy of the run with "uncertainty" added.
+    Runs derived by threshold_sweep are scored under their threshold policy.
+    """
+    rng = np.random.default_rng(seed)
+    data = load_predictions(run)
+    labels = data["labels"]
+    policy = run.get("threshold_policy")
+    stats = {}
+    for part in ("id", "ood"):
+        codes, part_labels = data[f"groups_{part}"], labels[f"groups_{part}"]
+        threshold = row_thresholds(policy, codes, part_labels) if policy else 0.5
+        stats[part] = _bootstrap_split(data[f"y_{part}"], data[f"{part}_proba"],
+                                       codes, part_labels, n_boot, rng, threshold=threshold)
+
+    per_sample = {
+        "id_accuracy": stats["id"][0],
+        "ood_accuracy": stats["ood"][0],
+        "worst_group_accuracy": stats["ood"][1],
+    }
+    scores = [run_score({"id": {"accuracy": a}, "ood": {"accuracy": o, "worst_group_accuracy": w}})
+              for a, o, w in zip(per_sample["id_accuracy"], per_sample["ood_accuracy"],
+                                 per_sample["worst_group_accuracy"])]
+
+    spec = {"method": "bootstrap", "n_boot": n_boot}
+    uncertainty = {m: _summary(v, "bootstrap") for m, v in per_sample.items()}
+    uncertainty["run_score"] = _summary(scores, "bootstrap")
+
+    result = {k: v for k, v in run.items() if not k.startswith("_")}
+    result["uncertainty"] = {**uncertainty, **spec}
+    parent = run.get("fingerprint") or run["config"]["name"]
+    result["fingerprint"] = hashlib.sha256(
+        json.dumps({"parent": parent, **spec}, sort_keys=True).encode()).hexdigest()[:16]
+    result["config"] = {**run["config"], "name": f"{run['config']['name']}+boot"}
+    return _save_aggregate(result) if save else result
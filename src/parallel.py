@@ -0,0 +1,104 @@
+import contextlib
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .datasets import get_dataset
+from .feature_store import get_encoded, get_features
+from .models.engines import get_engine
+from .run_experiment import run_experiment
+from .split_cache import split_key
+from .strategies import StrategyConfig, config_fingerprint, split_kwargs
+
+# Default worker count; overridable per call or with PROMETHEUS_WORKERS
+DEFAULT_WORKERS = int(os.getenv("PROMETHEUS_WORKERS", "1"))
+
+
+def resolve_workers(n_workers: Optional[int] = None) -> int:
+    """None -> PROMETHEUS_WORKERS, 0 or negative -> all cores."""
+    if n_workers is None:
+        n_workers = DEFAULT_WORKERS
+    if n_workers <= 0:
+        n_workers = os.cpu_count() or 1
+    return n_workers
+
+
+def _mp_context():
+    # fork lets workers inherit the warmed split/encoding memo copy-on-write;
+    # elsewhere workers reload it from the on-disk split cache instead.
+    if "fork" in mp.get_all_start_methods():
+        return mp.get_context("fork")
+    return mp.get_context()
+
+
+def _init_worker() -> None:
+    # Forked workers inherit the parent's global RNG state; without a reseed
+    # every unseeded config would draw the same sample_frac/undersample rows
+    np.random.seed()
+    # One BLAS thread per worker so N workers don't oversubscribe N cores
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+    # No-op under fork (memo already populated), disk-cache load under spawn
+    get_encoded(get_dataset())
+
+
+def _run_config(cfg_dict: Dict[str, Any], save: bool = True, threads: int = 1) -> Dict[str, Any]:
+    config = StrategyConfig(**cfg_dict)
+    limits = contextlib.nullcontext()
+    if threads > 1 and get_engine(config.model).threads:
+        # Multi-threaded engines get their share of the cores back
+        try:
+            from threadpoolctl import threadpool_limits
+            limits = threadpool_limits(threads)
+        except ImportError:
+            pass
+    with limits:
+        return run_experiment(config, save=save)
+
+
+def run_experiments_parallel(configs: Sequence[StrategyConfig],
+                             n_workers: Optional[int] = None,
+                             save: bool = True) -> List[Dict[str, Any]]:
+    """
+    Run configs across a process pool. Results come back in the same order
+    as configs, whatever order the workers finish in. Configs with the same
+    fingerprint are trained once and share the result.
+    """
+    configs = list(configs)
+    ds = get_dataset()
+    first: Dict[str, int] = {}
+    slots = [first.setdefault(config_fingerprint(cfg, split_key(ds, **split_kwargs(cfg))), i)
+             for i, cfg in enumerate(configs)]
+    unique = [cfg for i, cfg in enumerate(configs) if slots[i] == i]
+
+    results = dict(zip(sorted(set(slots)), _run_unique(unique, n_workers, save)))
+    return [results[slot] for slot in slots]
+
+
+def _run_unique(configs: List[StrategyConfig], n_workers: Optional[int],
+                save: bool) -> List[Dict[str, Any]]:
+    n_workers = min(resolve_workers(n_workers), max(len(configs), 1))
+
+    if n_workers <= 1:
+        return [run_experiment(cfg, save=save) for cfg in configs]
+
+    # Build splits + encodings (in each layout the engines need) once in the
+    # parent before forking, so tasks only ship a small config dict instead of DataFrames.
+    for kwargs, sparse in {(tuple(split_kwargs(cfg).items()), get_engine(cfg.model).sparse)
+                           for cfg in configs}:
+        get_features(get_dataset(), sparse=sparse, **dict(kwargs))
+
+    threads = max(1, (os.cpu_count() or 1) // n_workers)
+    with ProcessPoolExecutor(max_workers=n_workers,
+                             mp_context=_mp_context(),
+                             initializer=_init_worker) as pool:
+        return list(pool.map(partial(_run_config, save=save, threads=threads),
+                             [asdict(cfg) for cfg in configs]))
@@ -0,0 +1,93 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Load-time preprocessing shared by every dataset in DATASETS.
+#
+# split_cache.get_splits passes each dataset's raw make_splits output
+# through compact_splits once: string columns become categoricals with one
+# category set across train / ID / OOD, integer columns are downcast, and
+# labels become int8 0/1. Downstream code (select_dtypes, encoders, group
+# ids, metrics) then works on integer codes instead of Python strings.
+# Every step is lossless and idempotent, so frames read back from an older
+# object-dtype cache are compacted the same way.
+
+# UCI readmitted labels: "NO", "<30", ">30" – "NO" is the negative class
+NEGATIVE_LABEL = "NO"
+
+STRING_DTYPES = ["object", "string"]
+
+
+def encode_labels(y: pd.Series, negative: str = NEGATIVE_LABEL) -> pd.Series:
+    """
+    Binary int8 labels: the negative label maps to 0, anything else to 1.
+    Labels that are already numeric (encoded or 0/1 datasets) map to y != 0.
+    """
+    if isinstance(y.dtype, pd.CategoricalDtype):
+        # One comparison per category, then a lookup by code (code -1 = missing -> 1)
+        out = np.append(y.cat.categories != negative, True)[y.cat.codes.to_numpy()]
+    elif pd.api.types.is_bool_dtype(y) or pd.api.types.is_numeric_dtype(y):
+        out = y.to_numpy() != 0
+    else:
+        out = y.to_numpy(dtype=object) != negative
+    return pd.Series(out.astype(np.int8), index=y.index, name=y.name)
+
+
+def _shared_categories(frames: Sequence[pd.DataFrame], col: str) -> pd.Index:
+    values = []
+    for frame in frames:
+        s = frame[col]
+        values.append(s.cat.categories if isinstance(s.dtype, pd.CategoricalDtype) else s.dropna().unique())
+    categories = pd.Index(pd.unique(np.concatenate([np.asarray(v, dtype=object) for v in values])))
+    try:
+        return categories.sort_values()
+    except TypeError:
+        # Mixed-type column: keep first-seen order
+        return categories
+
+
+def _smallest_int(lo: int, hi: int) -> np.dtype:
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def compact_frames(frames: Sequence[pd.DataFrame]) -> List[pd.DataFrame]:
+    """
+    Compact dtypes for frames that share a schema (the X parts of one split):
+    string columns -> categoricals over the union of their values, integer
+    columns -> the smallest integer dtype that holds every frame's values.
+    """
+    frames = list(frames)
+    first = frames[0]
+    dtypes: Dict[str, object] = {}
+
+    for col in first.select_dtypes(include=STRING_DTYPES + ["category"]).columns:
+        dtypes[col] = pd.CategoricalDtype(_shared_categories(frames, col))
+
+    non_empty = [f for f in frames if len(f)]
+    for col in first.select_dtypes(include=["integer"]).columns:
+        # Nullable extension integers are left alone
+        if not non_empty or not isinstance(first[col].dtype, np.dtype):
+            continue
+        dtypes[col] = _smallest_int(min(int(f[col].min()) for f in non_empty),
+                                    max(int(f[col].max()) for f in non_empty))
+
+    out = []
+    for f in frames:
+        changed = {col: dt for col, dt in dtypes.items() if f[col].dtype != dt}
+        out.append(f.astype(changed) if changed else f)
+    return out
+
+
+def compact_splits(splits: Sequence, negative: Optional[str] = NEGATIVE_LABEL) -> tuple:
+    """
+    (X_train, y_train, X_id, y_id, X_ood, y_ood) with compact features and
+    int8 labels. Safe to call on splits that are already compact.
+    """
+    X_parts = compact_frames(splits[0::2])
+    y_parts = [y if y.dtype == np.int8 else encode_labels(y, negative) for y in splits[1::2]]
+    return tuple(part for pair in zip(X_parts, y_parts) for part in pair)
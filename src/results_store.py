@@ -1,14 +1,513 @@
 from pathlib import Path
 import json
-from typing import List, Dict, Any
+import sqlite3
+import time
+from dataclasses import MISSING, fields
+from typing import List, Dict, Any, Optional
+
+from .strategies import StrategyConfig
+from .selection import run_score
 
 EXPERIMENTS_DIR = Path(__file__).resolve().parents[1] / "experiments"
+RESULTS_DB = EXPERIMENTS_DIR / "results.sqlite"
+
+# Per-row fields of legacy run records; left out of the indexed summary (the
+# run file keeps them). Newer runs keep per-row data in array_store and only reference it.
+PAYLOAD_KEYS = ("meta_id", "meta_ood")
+
+# Headline metrics promoted to indexed columns: column -> (section, key)
+METRIC_COLUMNS = {
+    "id_auc": ("id", "auc"),
+    "id_accuracy": ("id", "accuracy"),
+    "ood_auc": ("ood", "auc"),
+    "ood_accuracy": ("ood", "accuracy"),
+    "worst_group_accuracy": ("ood", "worst_group_accuracy"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    path TEXT UNIQUE,
+    source_mtime INTEGER,
+    created_at REAL NOT NULL,
+    summary TEXT NOT NULL,
+    id_auc REAL,
+    id_accuracy REAL,
+    ood_auc REAL,
+    ood_accuracy REAL,
+    worst_group_accuracy REAL,
+    gap REAL,
+    run_score REAL,
+    pareto INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_runs_name ON runs(name);
+CREATE INDEX IF NOT EXISTS idx_runs_ood_accuracy ON runs(ood_accuracy);
+CREATE INDEX IF NOT EXISTS idx_runs_wga ON runs(worst_group_accuracy);
+
+-- Running sums per metric, updated on every insert (mean/std without a scan)
+CREATE TABLE IF NOT EXISTS run_stats (
+    metric TEXT PRIMARY KEY,
+    n INTEGER NOT NULL,
+    total REAL NOT NULL,
+    total_sq REAL NOT NULL
+);
+
+-- Multi-fidelity scheduler decisions: one row per (config, rung)
+CREATE TABLE IF NOT EXISTS schedule_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    schedule_id TEXT NOT NULL,
+    rung INTEGER NOT NULL,
+    budget REAL NOT NULL,
+    config_name TEXT NOT NULL,
+    sample_frac REAL,
+    run_score REAL,
+    worst_group_accuracy REAL,
+    ood_accuracy REAL,
+    eliminated INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_schedule_events_schedule ON schedule_events(schedule_id);
+
+-- Instrumentation spans (see instrumentation.py): one row per timed node/stage
+CREATE TABLE IF NOT EXISTS spans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    trace_id TEXT NOT NULL,
+    span_id TEXT NOT NULL,
+    parent_id TEXT,
+    name TEXT NOT NULL,
+    cat TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    tid INTEGER NOT NULL,
+    start_us INTEGER NOT NULL,
+    wall_ms REAL NOT NULL,
+    cpu_ms REAL NOT NULL,
+    peak_rss_mb REAL,
+    rss_growth_mb REAL,
+    rows INTEGER,
+    tokens INTEGER,
+    attrs TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_spans_trace ON spans(trace_id);
+"""
+
+# Leaderboard columns, added to databases created before they existed
+_LEADERBOARD_COLUMNS = {
+    "gap": "REAL",
+    "run_score": "REAL",
+    "pareto": "INTEGER NOT NULL DEFAULT 0",
+    "fingerprint": "TEXT",
+}
+_LEADERBOARD_INDEXES = {
+    "run_score": "CREATE INDEX IF NOT EXISTS idx_runs_run_score ON runs(run_score)",
+    "pareto": "CREATE INDEX IF NOT EXISTS idx_runs_pareto ON runs(pareto)",
+    "gap": "CREATE INDEX IF NOT EXISTS idx_runs_gap ON runs(gap)",
+    "id_accuracy": "CREATE INDEX IF NOT EXISTS idx_runs_id_accuracy ON runs(id_accuracy)",
+    "fingerprint": "CREATE INDEX IF NOT EXISTS idx_runs_fingerprint ON runs(fingerprint)",
+}
+
+# Metrics with running aggregates in run_stats
+STATS_COLUMNS = ("id_accuracy", "ood_accuracy", "worst_group_accuracy", "gap", "run_score")
+
+# (database, experiments dir) pairs whose run files this process has synced
+_SYNCED = set()
+
+
+def _config_columns() -> Dict[str, str]:
+    """StrategyConfig field -> column name/type. New fields get a column on next connect."""
+    cols = {}
+    for f in fields(StrategyConfig):
+        if f.name == "name":
+            continue
+        default = f.default if f.default is not MISSING else None
+        if isinstance(default, (bool, int)):
+            sql_type = "INTEGER"
+        elif isinstance(default, float):
+            sql_type = "REAL"
+        else:
+            sql_type = "TEXT"
+        cols[f"cfg_{f.name}"] = sql_type
+    return cols
+
+
+def connect(db_path: Optional[Path] = None) -> sqlite3.Connection:
+    db_path = Path(db_path or RESULTS_DB)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    # Generous timeout: parallel workers write runs concurrently
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_SCHEMA)
+
+    existing = {row["name"] for row in conn.execute("PRAGMA table_info(runs)")}
+    for col, sql_type in _config_columns().items():
+        if col not in existing:
+            try:
+                conn.execute(f"ALTER TABLE runs ADD COLUMN {col} {sql_type}")
+            except sqlite3.OperationalError:
+                pass  # added by a concurrent writer
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_runs_{col} ON runs({col})")
+
+    migrated = False
+    for col, sql_type in _LEADERBOARD_COLUMNS.items():
+        if col not in existing:
+            try:
+                conn.execute(f"ALTER TABLE runs ADD COLUMN {col} {sql_type}")
+                migrated = True
+            except sqlite3.OperationalError:
+                pass  # added by a concurrent writer
+    for sql in _LEADERBOARD_INDEXES.values():
+        conn.execute(sql)
+    if migrated:
+        _backfill_leaderboard(conn)
+    conn.commit()
+    return conn
+
+
+def _row_values(result: Dict[str, Any]) -> Dict[str, Any]:
+    cfg = result.get("config", {})
+    values = {
+        "name": cfg.get("name", "unknown"),
+        # See strategies.config_fingerprint; None for runs written before it existed
+        "fingerprint": result.get("fingerprint"),
+        "summary": json.dumps({k: v for k, v in result.items()
+                               if k not in PAYLOAD_KEYS and not k.startswith("_")}),
+    }
+    for col, (section, key) in METRIC_COLUMNS.items():
+        values[col] = result.get(section, {}).get(key)
+    if values["id_accuracy"] is not None and values["ood_accuracy"] is not None:
+        values["gap"] = abs(values["id_accuracy"] - values["ood_accuracy"])
+        values["run_score"] = run_score(result)
+    for col in _config_columns():
+        value = cfg.get(col[len("cfg_"):])
+        values[col] = int(value) if isinstance(value, bool) else value
+    return values
+
+
+def _insert_run(conn: sqlite3.Connection, result: Dict[str, Any],
+                path: Optional[Path] = None) -> int:
+    values = _row_values(result)
+    values["created_at"] = time.time()
+    replaced = None
+    if path is not None:
+        values["path"] = str(path)
+        values["source_mtime"] = Path(path).stat().st_mtime_ns if Path(path).exists() else None
+        # A rewritten run file replaces its old row
+        replaced = conn.execute("SELECT * FROM runs WHERE path = ?", (str(path),)).fetchone()
+        if replaced is not None:
+            conn.execute("DELETE FROM runs WHERE id = ?", (replaced["id"],))
+            _update_stats(conn, replaced, sign=-1)
+
+    cols = ", ".join(values)
+    marks = ", ".join("?" for _ in values)
+    cur = conn.execute(f"INSERT INTO runs ({cols}) VALUES ({marks})", list(values.values()))
+    run_id = cur.lastrowid
+
+    _update_stats(conn, values)
+    if path is not None and replaced is not None and replaced["pareto"]:
+        # The old row may have been shielding others from domination
+        _rebuild_pareto(conn)
+    else:
+        _update_pareto(conn, run_id, values)
+    return run_id
+
+
+# ---------------------------------------------------------------------
+# Incremental leaderboard: aggregates and Pareto front kept current on insert
+# ---------------------------------------------------------------------
+def _update_stats(conn: sqlite3.Connection, values, sign: int = 1) -> None:
+    for metric in STATS_COLUMNS:
+        value = values[metric]
+        if value is None or value != value:  # skip missing / NaN
+            continue
+        conn.execute(
+            """INSERT INTO run_stats (metric, n, total, total_sq) VALUES (?, ?, ?, ?)
+               ON CONFLICT(metric) DO UPDATE SET
+                   n = n + excluded.n,
+                   total = total + excluded.total,
+                   total_sq = total_sq + excluded.total_sq""",
+            (metric, sign, sign * value, sign * value * value),
+        )
+
+
+def _dominates(a_wga: float, a_ood: float, b_wga: float, b_ood: float) -> bool:
+    return a_wga >= b_wga and a_ood >= b_ood and (a_wga > b_wga or a_ood > b_ood)
+
+
+def _update_pareto(conn: sqlite3.Connection, run_id: int, values: Dict[str, Any]) -> None:
+    """Compare the new run against the current front only (WGA vs OOD accuracy, both maximized)."""
+    wga, ood = values.get("worst_group_accuracy"), values.get("ood_accuracy")
+    if wga is None or ood is None:
+        return
+    front = conn.execute(
+        "SELECT id, worst_group_accuracy, ood_accuracy FROM runs WHERE pareto = 1 AND id != ?",
+        (run_id,),
+    ).fetchall()
+    if any(_dominates(r["worst_group_accuracy"], r["ood_accuracy"], wga, ood) for r in front):
+        return
+    dominated = [r["id"] for r in front
+                 if _dominates(wga, ood, r["worst_group_accuracy"], r["ood_accuracy"])]
+    conn.executemany("UPDATE runs SET pareto = 0 WHERE id = ?", [(i,) for i in dominated])
+    conn.execute("UPDATE runs SET pareto = 1 WHERE id = ?", (run_id,))
+
+
+def _rebuild_pareto(conn: sqlite3.Connection) -> None:
+    conn.execute("UPDATE runs SET pareto = 0")
+    rows = conn.execute(
+        """SELECT id, worst_group_accuracy, ood_accuracy FROM runs
+           WHERE worst_group_accuracy IS NOT NULL AND ood_accuracy IS NOT NULL
+           ORDER BY worst_group_accuracy DESC, ood_accuracy DESC"""
+    ).fetchall()
+    # Sweep by descending WGA: a run is on the front if it beats every OOD seen so far
+    # (exact duplicates of a front point stay on the front, as in _update_pareto)
+    best_ood = float("-inf")
+    last = None
+    front = []
+    for r in rows:
+        point = (r["worst_group_accuracy"], r["ood_accuracy"])
+        if r["ood_accuracy"] > best_ood or point == last:
+            front.append((r["id"],))
+            best_ood = r["ood_accuracy"]
+            last = point
+    conn.executemany("UPDATE runs SET pareto = 1 WHERE id = ?", front)
+
+
+def _backfill_leaderboard(conn: sqlite3.Connection) -> None:
+    """Fill leaderboard columns and aggregates for rows written before they existed."""
+    for row in conn.execute("SELECT id, summary FROM runs").fetchall():
+        values = _row_values(json.loads(row["summary"]))
+        conn.execute("UPDATE runs SET gap = ?, run_score = ?, fingerprint = ? WHERE id = ?",
+                     (values.get("gap"), values.get("run_score"), values["fingerprint"], row["id"]))
+    conn.execute("DELETE FROM run_stats")
+    for row in conn.execute(f"SELECT {', '.join(STATS_COLUMNS)} FROM runs").fetchall():
+        _update_stats(conn, row)
+    _rebuild_pareto(conn)
+
+
+def save_run(result: Dict[str, Any], path: Optional[Path] = None,
+             db_path: Optional[Path] = None) -> int:
+    """Append a run record to the store. Returns its run id."""
+    conn = connect(db_path)
+    try:
+        with conn:
+            return _insert_run(conn, result, path)
+    finally:
+        conn.close()
+
+
+def sync_run_files(conn: sqlite3.Connection) -> int:
+    """
+    Index run_*.json files written outside save_run (older runs, copied
+    files) and drop rows whose file is gone. Only files that are new or
+    changed since last sync are parsed. Returns the number of rows changed.
+    """
+    known = {row["path"]: row["source_mtime"]
+             for row in conn.execute("SELECT path, source_mtime FROM runs WHERE path IS NOT NULL")}
+    n_synced = 0
+    with conn:
+        for path in EXPERIMENTS_DIR.glob("run_*.json"):
+            if known.pop(str(path), None) == path.stat().st_mtime_ns:
+                continue
+            with path.open() as f:
+                data = json.load(f)
+            _insert_run(conn, data, path)
+            n_synced += 1
+
+        # Whatever is left was not found on disk
+        missing = [path for path in known if not Path(path).exists()]
+        for path in missing:
+            row = conn.execute("SELECT * FROM runs WHERE path = ?", (path,)).fetchone()
+            conn.execute("DELETE FROM runs WHERE id = ?", (row["id"],))
+            _update_stats(conn, row, sign=-1)
+        if missing:
+            _rebuild_pareto(conn)
+    return n_synced + len(missing)
+
+
+def _sync_once(conn: sqlite3.Connection, db_path: Optional[Path]) -> None:
+    """
+    Sync run files on a process's first query of a store. Runs written
+    through save_run are indexed as they are saved, so later queries skip
+    the directory scan; call sync_run_files to pick up files copied in since.
+    """
+    key = (str(Path(db_path or RESULTS_DB)), str(EXPERIMENTS_DIR))
+    if key not in _SYNCED:
+        sync_run_files(conn)
+        _SYNCED.add(key)
+
+
+def _row_to_run(row: sqlite3.Row) -> Dict[str, Any]:
+    data = json.loads(row["summary"])
+    data["_id"] = row["id"]
+    data["_path"] = row["path"]
+    return data
+
+
+def load_all_runs(db_path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """
+    Summary records for every run (config + ID/OOD metrics), without
+    per-row data. Prefer top_runs / leaderboard when only the best are needed.
+    """
+    conn = connect(db_path)
+    try:
+        _sync_once(conn, db_path)
+        rows = conn.execute("SELECT id, path, summary FROM runs ORDER BY id").fetchall()
+        return [_row_to_run(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def find_run(fingerprint: str, db_path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """Latest run with this config fingerprint, or None if it was never evaluated."""
+    conn = connect(db_path)
+    try:
+        _sync_once(conn, db_path)
+        row = conn.execute(
+            "SELECT id, path, summary FROM runs WHERE fingerprint = ? ORDER BY id DESC LIMIT 1",
+            (fingerprint,),
+        ).fetchone()
+        return _row_to_run(row) if row else None
+    finally:
+        conn.close()
+
+
+def top_runs(order_by: str = "ood_accuracy", limit: Optional[int] = None,
+             db_path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Runs ranked by one of the indexed metric columns, best first."""
+    if order_by not in METRIC_COLUMNS:
+        raise ValueError(f"Cannot rank by {order_by!r}; expected one of {sorted(METRIC_COLUMNS)}")
+    conn = connect(db_path)
+    try:
+        _sync_once(conn, db_path)
+        # NULLs sort last; ties keep insertion order
+        sql = f"SELECT id, path, summary FROM runs ORDER BY {order_by} DESC, id"
+        params: tuple = ()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (limit,)
+        return [_row_to_run(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def leaderboard(k: int = 10, db_path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Top-k runs by run_score (index scan, no per-row data)."""
+    conn = connect(db_path)
+    try:
+        _sync_once(conn, db_path)
+        rows = conn.execute(
+            "SELECT id, path, summary, run_score FROM runs WHERE run_score IS NOT NULL "
+            "ORDER BY run_score DESC, worst_group_accuracy DESC LIMIT ?", (k,)
+        ).fetchall()
+        return [{**_row_to_run(row), "_score": row["run_score"]} for row in rows]
+    finally:
+        conn.close()
+
+
+def pareto_front(limit: Optional[int] = None, db_path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Runs not dominated on (worst-group accuracy, OOD accuracy), highest WGA first."""
+    conn = connect(db_path)
+    try:
+        _sync_once(conn, db_path)
+        sql = "SELECT id, path, summary FROM runs WHERE pareto = 1 ORDER BY worst_group_accuracy DESC"
+        params: tuple = ()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (limit,)
+        return [_row_to_run(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def run_stats(db_path: Optional[Path] = None) -> Dict[str, Dict[str, float]]:
+    """Count, mean, std, min and max for each metric in STATS_COLUMNS."""
+    conn = connect(db_path)
+    try:
+        _sync_once(conn, db_path)
+        stats = {}
+        for row in conn.execute("SELECT metric, n, total, total_sq FROM run_stats WHERE n > 0"):
+            n, mean = row["n"], row["total"] / row["n"]
+            var = max(row["total_sq"] / n - mean * mean, 0.0)
+            # Indexed columns make MIN/MAX a lookup rather than a scan
+            lo, hi = conn.execute(
+                f"SELECT MIN({row['metric']}), MAX({row['metric']}) FROM runs"
+            ).fetchone()
+            stats[row["metric"]] = {"n": n, "mean": mean, "std": var ** 0.5, "min": lo, "max": hi}
+        return stats
+    finally:
+        conn.close()
+
+
+def record_schedule_events(events: List[Dict[str, Any]], db_path: Optional[Path] = None) -> None:
+    """Append scheduler rung results (keys match schedule_events columns)."""
+    cols = ("schedule_id", "rung", "budget", "config_name", "sample_frac",
+            "run_score", "worst_group_accuracy", "ood_accuracy", "eliminated")
+    now = time.time()
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.executemany(
+                f"INSERT INTO schedule_events ({', '.join(cols)}, created_at) "
+                f"VALUES ({', '.join('?' for _ in cols)}, ?)",
+                [tuple(int(e[c]) if isinstance(e.get(c), bool) else e.get(c) for c in cols) + (now,)
+                 for e in events],
+            )
+    finally:
+        conn.close()
+
+
+def load_schedule(schedule_id: str, db_path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Scheduler decisions of one schedule, by rung then proposal order."""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT * FROM schedule_events WHERE schedule_id = ? ORDER BY rung, id", (schedule_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+SPAN_COLUMNS = ("trace_id", "span_id", "parent_id", "name", "cat", "pid", "tid", "start_us",
+                "wall_ms", "cpu_ms", "peak_rss_mb", "rss_growth_mb", "rows", "tokens", "attrs")
+
+
+def record_spans(spans: List[Dict[str, Any]], db_path: Optional[Path] = None) -> None:
+    """Append finished instrumentation spans (keys match spans columns; attrs is a dict)."""
+    if not spans:
+        return
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.executemany(
+                f"INSERT INTO spans ({', '.join(SPAN_COLUMNS)}) VALUES ({', '.join('?' for _ in SPAN_COLUMNS)})",
+                [tuple(json.dumps(sp.get(c) or {}, default=str) if c == "attrs" else sp.get(c)
+                       for c in SPAN_COLUMNS) for sp in spans],
+            )
+    finally:
+        conn.close()
+
+
+def load_spans(trace_id: str, db_path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    conn = connect(db_path)
+    try:
+        rows = conn.execute("SELECT * FROM spans WHERE trace_id = ? ORDER BY start_us, id",
+                            (trace_id,)).fetchall()
+        return [{**dict(row), "attrs": json.loads(row["attrs"] or "{}")} for row in rows]
+    finally:
+        conn.close()
+
 
-def load_all_runs() -> List[Dict[str, Any]]:
-    runs = []
-    for path in EXPERIMENTS_DIR.glob("run_*.json"):
-        with path.open() as f:
-            data = json.load(f)
-        data["_path"] = str(path)
-        runs.append(data)
-    return runs
+def list_traces(limit: int = 20, db_path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Most recent traces with their span count and time range."""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT trace_id, COUNT(*) AS n_spans, MIN(start_us) AS start_us, "
+            "MAX(start_us + wall_ms * 1000) AS end_us FROM spans "
+            "GROUP BY trace_id ORDER BY start_us DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
@@ -1,33 +1,72 @@
 from typing import List, Dict, Any
 
-from .results_store import load_all_runs
+from .results_store import leaderboard, pareto_front, run_stats
 
-def results_to_text() -> str:
+# Bounds on the prompt block, independent of how many runs exist
+TOP_K = 8
+PARETO_LIMIT = 5
+
+
+def _run_row(r: Dict[str, Any], score: Any = None) -> str:
+    cfg = r.get("config", {})
+    name = cfg.get("name", "unknown")
+
+    id_acc = r.get("id", {}).get("accuracy", 0.0) * 100
+    ood_acc = r.get("ood", {}).get("accuracy", 0.0) * 100
+    gap = abs(id_acc - ood_acc)
+
+    wga = r["ood"].get("worst_group_accuracy")
+    wga_str = f"{wga:.3f}" if wga is not None else "n/a"
+
+    row = f"| {name} | {id_acc:.1f}% | {ood_acc:.1f}% | {gap:.1f}% | {wga_str} |"
+    if score is not None:
+        row += f" {score:.4f} |"
+    return row
+
+
+def results_to_text(top_k: int = TOP_K, pareto_limit: int = PARETO_LIMIT) -> str:
     """
     Convert experiment results to formatted text for insertion into prompt.
-    Returns a markdown-style table with key metrics.
+    Returns a size-bounded markdown summary: top-k runs by run_score, the
+    WGA/OOD Pareto front and aggregate statistics over all runs. The
+    leaderboard is maintained by the results store as runs are written,
+    so this does not reload every run.
     """
-    results: List[Dict[str, Any]] = load_all_runs()
+    stats = run_stats()
+    n_runs = stats.get("ood_accuracy", {}).get("n", 0)
 
-    if not results:
+    if not n_runs:
         return "No experiment results available yet."
 
-    lines = []
-    lines.append("| Strategy | ID Accuracy | OOD Accuracy | Robustness Gap | Worst Group Acc |")
-    lines.append("|----------|-------------|--------------|----------------|-----------------|")
-
-    for r in results:
-        cfg = r.get("config", {})
-        name = cfg.get("name", "unknown")
-
-        id_acc = r.get("id", {}).get("accuracy", 0.0) * 100
-        ood_acc = r.get("ood", {}).get("accuracy", 0.0) * 100
-        gap = abs(id_acc - ood_acc)
+    lines: List[str] = []
+    top = leaderboard(top_k)
+    lines.append(f"### Top {len(top)} of {n_runs} runs by score")
+    lines.append("| Strategy | ID Accuracy | OOD Accuracy | Robustness Gap | Worst Group Acc | Score |")
+    lines.append("|----------|-------------|--------------|----------------|-----------------|-------|")
+    for r in top:
+        lines.append(_run_row(r, r.get("_score")))
 
-        wga = r["ood"].get("worst_group_accuracy")
-        wga_str = f"{wga:.3f}" if wga is not None else "n/a"
+    front = pareto_front(pareto_limit)
+    if front:
+        lines.append("")
+        lines.append("### Pareto front (worst-group vs OOD accuracy)")
+        lines.append("| Strategy | ID Accuracy | OOD Accuracy | Robustness Gap | Worst Group Acc |")
+        lines.append("|----------|-------------|--------------|----------------|-----------------|")
+        for r in front:
+            lines.append(_run_row(r))
 
-        lines.append(f"| {name} | {id_acc:.1f}% | {ood_acc:.1f}% | {gap:.1f}% | {wga_str} |")
+    lines.append("")
+    lines.append("### Aggregate statistics")
+    labels = {
+        "ood_accuracy": "OOD accuracy",
+        "worst_group_accuracy": "Worst group acc",
+        "gap": "Robustness gap",
+    }
+    for metric, label in labels.items():
+        s = stats.get(metric)
+        if s:
+            lines.append(f"- {label}: mean {s['mean']:.3f} ± {s['std']:.3f} "
+                         f"(min {s['min']:.3f}, max {s['max']:.3f}, n={s['n']})")
 
     return "\n".join(lines)
 
@@ -1,169 +1,246 @@
 import json
 from pathlib import Path
-from collections import defaultdict
-from dataclasses import asdict
+from dataclasses import asdict, replace
+from typing import Any, Dict, List, Optional, Sequence
 
 import numpy as np
 import pandas as pd
 
-from .models.baseline import build_model_from_df
 from .metrics import compute_metrics
-from .strategies import StrategyConfig
-from sklearn.preprocessing import OneHotEncoder
+from .strategies import StrategyConfig, config_fingerprint, split_kwargs
 from .datasets import get_dataset
+from .split_cache import get_splits, split_key
+from .group_dro import GroupDROLogistic, build_group_dro_model
+from .feature_store import EncodedSplits, get_features, select_train_rows
+from .models.engines import DEFAULT_ENGINE, build_model, get_engine
+from .results_store import find_run, save_run
+from .array_store import save_predictions, save_split_arrays
+from .instrumentation import span
 
 
 EXPERIMENTS_DIR = Path(__file__).resolve().parents[1] / "experiments"
 
 
-def encode_labels(y: pd.Series):
-    return y.apply(lambda v: 0 if v == "NO" else 1)
+def _find_previous(config: StrategyConfig, fingerprint: str) -> Optional[Dict[str, Any]]:
+    previous = find_run(fingerprint)
+    if previous is not None:
+        print(f"Skipping {config.name}: same config already evaluated as "
+              f"{previous['config'].get('name')} ({previous['_path']})")
+    return previous
 
 
-def run_experiment(config: StrategyConfig):
-    # --------------------
-    # 1. Load data & labels
-    # --------------------
-    ds = get_dataset()
-    X_train, y_train, X_id_test, y_id_test, X_ood, y_ood = ds.make_splits()
+def _train_data(config: StrategyConfig, enc: EncodedSplits):
+    """Training rows for a strategy, with their groups (used by group DRO)."""
+    with span("select_rows") as sp:
+        train_rows = select_train_rows(enc.y_train, config)
+        sp["rows"] = len(train_rows)
+    return enc.X_train[train_rows], enc.y_train[train_rows], enc.groups_train[train_rows]
 
-    # Keep metadata columns for grouping before any feature dropping
-    meta_id_test = X_id_test[["sex", "er_flag"]]
-    meta_ood_test = X_ood[["sex", "er_flag"]]
 
-    y_train_enc = encode_labels(y_train)
-    y_id_enc = encode_labels(y_id_test)
-    y_ood_enc = encode_labels(y_ood)
+def _features(config: StrategyConfig) -> EncodedSplits:
+    """Shared encodings in the layout the config's engine trains fastest on."""
+    engine = get_engine(getattr(config, "model", None))
+    with span("features", layout="onehot" if engine.sparse else "ordinal") as sp:
+        enc = get_features(get_dataset(), sparse=engine.sparse, **split_kwargs(config))
+        sp["rows"] = enc.X_train.shape[0] + enc.X_id.shape[0] + enc.X_ood.shape[0]
+    return enc
 
-    # --------------------
-    # 2. Optional subsampling of train
-    # --------------------
-    if config.sample_frac < 1.0:
-        n = int(len(X_train) * config.sample_frac)
-        idx = np.random.choice(len(X_train), size=n, replace=False)
-        X_train = X_train.iloc[idx]
-        y_train_enc = y_train_enc.iloc[idx]
 
-    # --------------------
-    # 3. Optional undersampling of majority class
-    # --------------------
-    if getattr(config, "undersample_majority", False):
-        # majority = label 0 (no readmission)
-        maj_idx = y_train_enc[y_train_enc == 0].index
-        min_idx = y_train_enc[y_train_enc == 1].index
+def _build_model(config: StrategyConfig, enc: EncodedSplits, n_rows: int):
+    model = getattr(config, "model", None) or DEFAULT_ENGINE
+    if getattr(config, "use_group_dro", False):
+        # Group DRO trains its own logistic model; any other engine name would
+        # only give the same fit a second fingerprint
+        if model != DEFAULT_ENGINE:
+            raise ValueError(f"use_group_dro trains its own logistic model; set model={DEFAULT_ENGINE!r}, "
+                             f"got {model!r}")
+        # Online group DRO engine on the shared encoded matrix
+        return build_group_dro_model(config)
+
+    # sklearn is only imported by the engine builders, on first run
+    return build_model(config, n_rows, categorical=enc.categorical)
+
+
+def _fit(model, X, y, groups=None):
+    with span("fit", rows=X.shape[0], estimator=type(model).__name__):
+        if isinstance(model, GroupDROLogistic):
+            model.fit(X, y, groups=groups)
+        else:
+            model.fit(X, y)
+    return model
+
+
+def _extra(model) -> Optional[Dict[str, Any]]:
+    """Training diagnostics kept in the run record (group DRO trajectories)."""
+    history = getattr(model, "history_", None)
+    return {"group_dro": {"epochs": history}} if history is not None else None
+
+
+def _evaluate(config: StrategyConfig, model, enc: EncodedSplits, fingerprint: str,
+              save: bool = True) -> Dict[str, Any]:
+    """Predict on ID/OOD, compute metrics and (optionally) write the run."""
+    with span("predict", rows=enc.X_id.shape[0] + enc.X_ood.shape[0]):
+        id_proba = model.predict_proba(enc.X_id)[:, 1]
+        ood_proba = model.predict_proba(enc.X_ood)[:, 1]
+
+    meta_id_test = meta_ood_test = None
+    if save:
+        # Keep metadata columns for grouping before any feature dropping
+        _, _, X_id_test, _, X_ood, _ = get_splits(get_dataset(), **split_kwargs(config))
+        meta_cols = [col for col in ("sex", "er_flag") if col in X_id_test.columns]  # COMPAS has no er_flag
+        meta_id_test = X_id_test[meta_cols]
+        meta_ood_test = X_ood[meta_cols]
+
+    return _record_run(config, fingerprint, enc.key,
+                       enc.y_id, enc.y_ood, enc.groups_id, enc.groups_ood, id_proba, ood_proba,
+                       meta_id=meta_id_test, meta_ood=meta_ood_test, save=save, extra=_extra(model))
+
+
+def _record_run(config: StrategyConfig, fingerprint: str, split_key_: str,
+                y_id: np.ndarray, y_ood: np.ndarray,
+                groups_id: np.ndarray, groups_ood: np.ndarray,
+                id_proba: np.ndarray, ood_proba: np.ndarray,
+                meta_id: Optional[pd.DataFrame] = None, meta_ood: Optional[pd.DataFrame] = None,
+                save: bool = True, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Metrics from ID/OOD probabilities, plus the run file and arrays when saving."""
+    # Overall + per-group metrics (Sex × ER groups) for ID and OOD.
+    # Unknown/Invalid groups are reported but excluded from worst-group values.
+    with span("metrics", rows=len(y_id) + len(y_ood)):
+        id_metrics = compute_metrics(y_id, id_proba, groups=groups_id)
+        ood_metrics = compute_metrics(y_ood, ood_proba, groups=groups_ood)
 
-        n_min = len(min_idx)
-        if n_min > 0 and len(maj_idx) > n_min:
-            undersampled_maj = np.random.choice(maj_idx, size=n_min, replace=False)
-            keep_idx = np.concatenate([undersampled_maj, min_idx])
+    result = {
+        "config": asdict(config),
+        "id": id_metrics,
+        "ood": ood_metrics,
+        "fingerprint": fingerprint,
+        **(extra or {}),
+    }
 
-            X_train = X_train.loc[keep_idx]
-            y_train_enc = y_train_enc.loc[keep_idx]
+    if not save:
+        return result
+
+    with span("write", rows=len(y_id) + len(y_ood)):
+        # Per-row data lives in typed arrays: labels/groups/meta once per split,
+        # probabilities once per run. The run record only references them.
+        split_id = save_split_arrays(split_key_, y_id, y_ood, groups_id, groups_ood,
+                                     meta_id=meta_id, meta_ood=meta_ood)
+        # The fingerprint in the key keeps a reused name from overwriting another run
+        run_key = f"{config.name}-{fingerprint[:8]}"
+        result["arrays"] = {
+            "split": split_id,
+            "predictions": save_predictions(run_key, id_proba, ood_proba),
+        }
+
+        EXPERIMENTS_DIR.mkdir(exist_ok=True)
+        out_path = EXPERIMENTS_DIR / f"run_{run_key}.json"
+        with out_path.open("w") as f:
+            json.dump(result, f, indent=2)
+        save_run(result, path=out_path)
 
-    # --------------------
-    # 4. Encode categorical columns
-    # --------------------
-    cat_cols = X_train.select_dtypes(include=["object", "category"]).columns
-    num_cols = X_train.select_dtypes(include=["number"]).columns
-
-    if len(cat_cols) > 0:
-        encoder = OneHotEncoder(handle_unknown="ignore", sparse_output=False)
-
-        # Fit encoder on TRAIN only
-        X_cat_train = encoder.fit_transform(X_train[cat_cols])
-        X_num_train = X_train[num_cols].to_numpy()
-        X_train_encoded = np.hstack([X_num_train, X_cat_train])
-
-        # Transform ID test and OOD with same encoder & same columns
-        X_cat_id = encoder.transform(X_id_test[cat_cols])
-        X_num_id = X_id_test[num_cols].to_numpy()
-        X_id_encoded = np.hstack([X_num_id, X_cat_id])
-
-        X_cat_ood = encoder.transform(X_ood[cat_cols])
-        X_num_ood = X_ood[num_cols].to_numpy()
-        X_ood_encoded = np.hstack([X_num_ood, X_cat_ood])
-    else:
-        # No categoricals, just use numeric columns
-        X_train_encoded = X_train[num_cols].to_numpy()
-        X_id_encoded = X_id_test[num_cols].to_numpy()
-        X_ood_encoded = X_ood[num_cols].to_numpy()
-
-        # --------------------
-    # 5. Build & train model on encoded data
-    # --------------------
-    model = build_model_from_df(pd.DataFrame(X_train_encoded), config)
+    print("Saved", out_path)
+    print(result)
+    return result
 
-    # Group-aware sample_weight for group_dro strategies
-    sample_weight = None
-    if getattr(config, "use_group_dro", False):
-        # Use raw X_train columns to compute group ids
-        group_ids = ds.compute_group_id(X_train)
-        group_ids = np.array(group_ids)
-        unique_groups, counts = np.unique(group_ids, return_counts=True)
-        freq = dict(zip(unique_groups, counts))
-        sample_weight = np.array([1.0 / freq[g] for g in group_ids], dtype=float)
 
-    if sample_weight is not None:
-        model.fit(X_train_encoded, y_train_enc, sample_weight=sample_weight)
-    else:
-        model.fit(X_train_encoded, y_train_enc)
+def run_experiment(config: StrategyConfig, save: bool = True, reuse: bool = True):
+    """
+    Train and evaluate one strategy. With save=False nothing is written
+    (used for low-fidelity scheduler rungs); the result dict is still returned.
 
+    With reuse=True a config whose fingerprint (training parameters + split)
+    was already evaluated is not retrained: the stored run is returned,
+    whatever name it was saved under.
+    """
+    with span("run_experiment", cat="run", config=config.name,
+              model=getattr(config, "model", None)) as sp:
+        result = _run_experiment(config, save=save, reuse=reuse)
+        # Stored runs (reuse hits) carry the path they were loaded from
+        sp["attrs"]["reused"] = "_path" in result
+        return result
 
-    # --------------------
-    # 6. Predict & compute metrics
-    # --------------------
-    id_proba = model.predict_proba(X_id_encoded)[:, 1]
-    ood_proba = model.predict_proba(X_ood_encoded)[:, 1]
 
-    id_metrics = compute_metrics(y_id_enc, id_proba)
-    ood_metrics = compute_metrics(y_ood_enc, ood_proba)
-
-    # Compute Sex × ER group accuracies for OOD
-    # Compute group accuracies for OOD using the same group function
-    y_pred_ood = (ood_proba > 0.5).astype(int)
-
-    groups_ood = ds.compute_group_id(X_ood)
-    groups_ood = list(groups_ood)
+def _run_experiment(config: StrategyConfig, save: bool, reuse: bool):
+    ds = get_dataset()
+    fingerprint = config_fingerprint(config, split_key(ds, **split_kwargs(config)))
+    if reuse:
+        previous = _find_previous(config, fingerprint)
+        if previous is not None:
+            return previous
 
-    correct = defaultdict(int)
-    total = defaultdict(int)
+    if getattr(config, "streaming", False):
+        from .streaming_train import run_streaming_experiment
+        return run_streaming_experiment(config, fingerprint, save=save)
 
-    for g, y_true, y_hat in zip(groups_ood, y_ood_enc, y_pred_ood):
-        total[g] += 1
-        if y_true == y_hat:
-            correct[g] += 1
+    # --------------------
+    # 1. Encoded matrices, built once per (dataset, split, layout) and shared across strategies.
+    #    Splits are memoized per process and cached on disk (see split_cache).
+    #    The encoder is fit on the full train split; subsampling and
+    #    undersampling only pick rows out of it.
+    # --------------------
+    enc = _features(config)
 
-    group_acc = {g: correct[g] / total[g] for g in total}
-    # Filter out Unknown/Invalid groups for WGA calculation
-    valid_groups = {g: acc for g, acc in group_acc.items()
-                    if "Unknown" not in g and "Invalid" not in g}
-    worst_group_acc = min(valid_groups.values()) if valid_groups else None
+    # --------------------
+    # 2. Optional subsampling / undersampling of train
+    # --------------------
+    X_train_encoded, y_train_enc, groups_train = _train_data(config, enc)
 
+    # --------------------
+    # 3. Build & train model on encoded data
+    # --------------------
+    model = _build_model(config, enc, X_train_encoded.shape[0])
+    _fit(model, X_train_encoded, y_train_enc, groups_train)
 
     # --------------------
-    # 7. Save results
+    # 4. Predict, compute metrics & save results
     # --------------------
-    result = {
-        "config": asdict(config),
-        "id": {
-            "auc": id_metrics["auc"],
-            "accuracy": id_metrics["accuracy"],
-        },
-        "ood": {
-            "auc": ood_metrics["auc"],
-            "accuracy": ood_metrics["accuracy"],
-            "group_accuracy": group_acc,
-            "worst_group_accuracy": worst_group_acc,
-        },
-        "meta_id": meta_id_test.to_dict("records"),
-        "meta_ood": meta_ood_test.to_dict("records"),
-    }
+    return _evaluate(config, model, enc, fingerprint, save=save)
 
-    EXPERIMENTS_DIR.mkdir(exist_ok=True)
-    out_path = EXPERIMENTS_DIR / f"run_{config.name}.json"
-    with out_path.open("w") as f:
-        json.dump(result, f, indent=2)
 
-    print("Saved", out_path)
-    print(result)
-    return result
+def _final_estimator(model):
+    """The estimator that owns C (last Pipeline step, or the model itself)."""
+    est = model.steps[-1][1] if hasattr(model, "steps") else model
+    if "C" not in est.get_params() or "warm_start" not in est.get_params():
+        raise ValueError(f"{type(est).__name__} has no warm-startable C; cannot sweep l2_C")
+    return est
+
+
+def run_c_path(config: StrategyConfig, c_values: Sequence[float], save: bool = True,
+               reuse: bool = True) -> List[Dict[str, Any]]:
+    """
+    Regularization path over l2_C for an otherwise identical config.
+
+    All points share one encoded matrix and one training sample. C values
+    are fit from strongest to weakest regularization, each fit starting
+    from the previous solution, so a whole grid costs little more than a
+    single cold fit. Emits one run per C (named <name>_C<value>), in path order.
+    """
+    ds = get_dataset()
+    split_id = split_key(ds, **split_kwargs(config))
+    points = [replace(config, name=f"{config.name}_C{c:g}", l2_C=float(c))
+              for c in sorted(set(c_values))]
+    fingerprints = [config_fingerprint(cfg, split_id) for cfg in points]
+    previous = [_find_previous(cfg, fp) if reuse else None for cfg, fp in zip(points, fingerprints)]
+    if all(p is not None for p in previous):
+        return previous
+
+    enc = _features(config)
+    X_train_encoded, y_train_enc, groups_train = _train_data(config, enc)
+
+    results: List[Dict[str, Any]] = []
+    prev_est = None
+    for cfg, fp, prev in zip(points, fingerprints, previous):
+        # Built per point so C is mapped exactly as for a single run
+        # (reg_strength etc.); only the starting coefficients are carried over.
+        model = _build_model(cfg, enc, X_train_encoded.shape[0])
+        est = _final_estimator(model)
+        if prev_est is not None:
+            est.set_params(warm_start=True)
+            est.coef_ = np.array(prev_est.coef_, copy=True)
+            est.intercept_ = np.array(prev_est.intercept_, copy=True)
+        _fit(model, X_train_encoded, y_train_enc, groups_train)
+        prev_est = est
+
+        # Already-evaluated points still advance the path, but are not rewritten
+        results.append(prev if prev is not None else _evaluate(cfg, model, enc, fp, save=save))
+    return results
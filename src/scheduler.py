@@ -0,0 +1,104 @@
+import math
+import time
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .parallel import run_experiments_parallel
+from .results_store import load_schedule, record_schedule_events
+from .selection import run_score
+from .strategies import StrategyConfig
+
+# Fractions of each config's own sample_frac; the last rung is the full fit
+DEFAULT_BUDGETS = (0.1, 0.3, 1.0)
+# Keep the best 1/eta of the configs at every rung
+DEFAULT_ETA = 3
+
+
+def _rank_key(run: Dict[str, Any]) -> Tuple[float, float]:
+    # run_score is -1.0 for every run under the baseline floor, so break
+    # ties on WGA (then OOD accuracy) to still rank weak partial fits.
+    ood = run["ood"]["accuracy"]
+    wga = run["ood"].get("worst_group_accuracy")
+    return run_score(run), wga if wga is not None else ood
+
+
+def successive_halving(configs: Sequence[StrategyConfig],
+                       budgets: Sequence[float] = DEFAULT_BUDGETS,
+                       eta: int = DEFAULT_ETA,
+                       n_workers: Optional[int] = None,
+                       schedule_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Successive halving over proposed strategies.
+
+    Every config is first fit on a small slice of its training data; only
+    the top 1/eta by run_score move on to the next, larger budget. Partial
+    fits are not saved as runs; each rung's budgets, scores and
+    eliminations go to the results store under schedule_id. Returns the
+    full-fidelity runs of the survivors, in proposal order.
+    """
+    survivors = list(configs)
+    if not survivors:
+        return []
+    if budgets[-1] != 1.0:
+        raise ValueError("The last budget must be 1.0 (full-fidelity fit)")
+    schedule_id = schedule_id or f"sh-{int(time.time() * 1000)}"
+
+    for rung, budget in enumerate(budgets):
+        final = rung == len(budgets) - 1
+        # Nothing left to eliminate: jump straight to the full fit
+        if not final and len(survivors) <= 1:
+            continue
+
+        if final:
+            rung_cfgs = survivors
+        else:
+            rung_cfgs = [replace(cfg, name=f"{cfg.name}@{budget:g}",
+                                 sample_frac=cfg.sample_frac * budget)
+                         for cfg in survivors]
+        runs = run_experiments_parallel(rung_cfgs, n_workers=n_workers, save=final)
+
+        n_keep = len(survivors) if final else max(1, math.ceil(len(survivors) / eta))
+        ranked = sorted(range(len(runs)), key=lambda i: _rank_key(runs[i]), reverse=True)
+        keep = set(ranked[:n_keep])
+
+        record_schedule_events([
+            {
+                "schedule_id": schedule_id,
+                "rung": rung,
+                "budget": budget,
+                "config_name": cfg.name,
+                "sample_frac": rung_cfg.sample_frac,
+                "run_score": run_score(run),
+                "worst_group_accuracy": run["ood"].get("worst_group_accuracy"),
+                "ood_accuracy": run["ood"]["accuracy"],
+                "eliminated": i not in keep,
+            }
+            for i, (cfg, rung_cfg, run) in enumerate(zip(survivors, rung_cfgs, runs))
+        ])
+
+        if final:
+            return runs
+
+        dropped = [survivors[i].name for i in range(len(survivors)) if i not in keep]
+        print(f"[halving {schedule_id}] rung {rung} (budget {budget:g}): "
+              f"kept {n_keep}/{len(survivors)}, eliminated {dropped}")
+        survivors = [cfg for i, cfg in enumerate(survivors) if i in keep]
+
+    return []
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show the rung decisions of a successive-halving schedule")
+    parser.add_argument("schedule_id", help="Schedule id, as printed by [halving <id>] (agent: step<N>-<pid>)")
+    args = parser.parse_args()
+
+    events = load_schedule(args.schedule_id)
+    if not events:
+        raise SystemExit(f"No schedule {args.schedule_id!r} in the results store")
+    for e in events:
+        wga = e["worst_group_accuracy"]
+        print(f"rung {e['rung']} budget {e['budget']:<4g} {e['config_name']:<30} "
+              f"score {e['run_score']:.4f} wga {'-' if wga is None else f'{wga:.4f}'} "
+              f"ood {e['ood_accuracy']:.4f}{'  eliminated' if e['eliminated'] else ''}")
@@ -1,7 +1,11 @@
+import argparse
+
 from src.strategies import StrategyConfig
-from src.run_experiment import run_experiment
+from src.parallel import run_experiments_parallel
+from src.run_experiment import run_c_path
+from src.multi_seed import evaluate_with_seeds
 
-def main():
+def main(n_workers=None, c_grid=None, n_seeds=1):
     configs = [
         StrategyConfig(name="baseline"),
         StrategyConfig(name="class_balanced", class_weight="balanced"),
@@ -10,8 +14,24 @@ def main():
                        undersample_majority=True, class_weight="balanced"),
     ]
 
-    for cfg in configs:
-        run_experiment(cfg)
+    if c_grid:
+        # One warm-started regularization path per strategy
+        for cfg in configs:
+            run_c_path(cfg, c_grid)
+        return
+
+    if n_seeds > 1:
+        evaluate_with_seeds(configs, n_seeds=n_seeds, n_workers=n_workers)
+        return
+
+    run_experiments_parallel(configs, n_workers=n_workers)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--c-grid", type=lambda s: [float(c) for c in s.split(",")], default=None,
+                        help="Comma-separated l2_C values, e.g. 0.01,0.1,1,10")
+    parser.add_argument("--seeds", type=int, default=1,
+                        help="Evaluate each strategy over N training seeds with error bars")
+    args = parser.parse_args()
+    main(n_workers=args.workers, c_grid=args.c_grid, n_seeds=args.seeds)
@@ -1,4 +1,4 @@
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 
 # Hard baselines from run_baseline_test.json
 BASELINE_WGA = 0.526
@@ -14,7 +14,9 @@ def run_score(run: Dict[str, Any]) -> float:
     """
     id_acc = run["id"]["accuracy"]
     ood_acc = run["ood"]["accuracy"]
-    wga = run["ood"].get("worst_group_accuracy", ood_acc)
+    wga = run["ood"].get("worst_group_accuracy")
+    if wga is None:
+        wga = ood_acc
     
     # Gap is less important if WGA is high, but still good to track
     gap = abs(id_acc - ood_acc)
@@ -35,12 +37,40 @@ def run_score(run: Dict[str, Any]) -> float:
     score = alpha * (wga ** 2) + beta * ood_acc - gamma * gap
     return score
 
+# How many standard errors an improvement must clear when runs carry
+# uncertainty estimates (one-sided 95%)
+NOISE_Z = 1.645
+
+
+def score_se(run: Dict[str, Any]) -> Optional[float]:
+    """Standard error of run_score from multi-seed / bootstrap evaluation, if any."""
+    u = run.get("uncertainty", {}).get("run_score")
+    return u.get("se") if u else None
+
+
 def is_better(new_run: Dict[str, Any], best_run: Optional[Dict[str, Any]], min_imp: float = 0.001) -> bool:
     """
     Returns True if new_run has a higher score than best_run.
+    When either run has an uncertainty estimate, the improvement must also
+    exceed NOISE_Z standard errors of the difference.
     """
     if best_run is None:
         # Only accept if it meets the baseline floor
         return run_score(new_run) > 0.0
-    
+
+    se_new, se_best = score_se(new_run), score_se(best_run)
+    if se_new is not None or se_best is not None:
+        noise = NOISE_Z * ((se_new or 0.0) ** 2 + (se_best or 0.0) ** 2) ** 0.5
+        min_imp = max(min_imp, noise)
+
     return run_score(new_run) > run_score(best_run) + min_imp
+
+def select_best(runs: List[Dict[str, Any]], best_run: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fold runs into best_run through is_better, in list order, so the
+    outcome does not depend on which worker finished first.
+    """
+    for run in runs:
+        if is_better(run, best_run):
+            best_run = run
+    return best_run
@@ -4,12 +4,13 @@ from src.results_store import load_all_runs
 from src.analyze_results import rank_by_ood_accuracy
 from src.selection import is_better
 from src.strategies import StrategyConfig
-from src.run_experiment import run_experiment
-from src.llm_client import call_llm_and_get_strategies
 
-def main(use_llm: bool = False, max_steps: int = 5):
+def main(use_llm: bool = False, max_steps: int = 5, n_workers=None):
     runs = load_all_runs()
     if not runs:
+        # pandas/sklearn and the LLM back ends load only on the paths that use them
+        from src.run_experiment import run_experiment
+
         # ensure at least one baseline run exists
         base = run_experiment(StrategyConfig(name="baseline"))
         runs = [base]
@@ -22,13 +23,15 @@ def main(use_llm: bool = False, max_steps: int = 5):
     if use_llm:
         # LLM-driven proposals with fallback
         try:
-            cfgs = call_llm_and_get_strategies()
+            from src.llm_client import call_llm_and_get_strategies
+            cfgs, _rationale = call_llm_and_get_strategies()
         except (ImportError, ValueError, RuntimeError) as e:
             print(f"LLM not available or failed ({e}). Falling back to no new strategies.")
             cfgs = []
 
-        for cfg in cfgs:
-            cand_run = run_experiment(cfg)
+        from src.parallel import run_experiments_parallel
+        cand_runs = run_experiments_parallel(cfgs, n_workers=n_workers)
+        for cfg, cand_run in zip(cfgs, cand_runs):
             if is_better(cand_run, best_run):
                 print("Found better strategy via LLM:", cfg)
                 best_run = cand_run
@@ -41,5 +44,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--use-llm", action="store_true")
     parser.add_argument("--max-steps", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parallel experiment workers (0 = all cores)")
     args = parser.parse_args()
-    main(use_llm=args.use_llm, max_steps=args.max_steps)
+    main(use_llm=args.use_llm, max_steps=args.max_steps, n_workers=args.workers)
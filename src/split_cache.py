@@ -0,0 +1,179 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+from .datasets import DatasetSpec, get_dataset
+from .instrumentation import span
+from .preprocessing import compact_splits
+
+# Parquet needs pyarrow; fall back to pickle so the cache still works without it
+PARQUET_AVAILABLE = False
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    pass
+
+CACHE_DIR = Path(__file__).resolve().parents[1] / "cache" / "splits"
+
+# Bump when the split logic changes in a way the source fingerprint can't see
+SPLIT_VERSION = 1
+
+SPLIT_PARTS = ("X_train", "y_train", "X_id_test", "y_id_test", "X_ood", "y_ood")
+
+Splits = Tuple[pd.DataFrame, pd.Series, pd.DataFrame, pd.Series, pd.DataFrame, pd.Series]
+
+# In-process memo: split key -> splits tuple
+_MEMORY: Dict[str, Splits] = {}
+
+
+def source_fingerprint(path: Optional[Path]) -> str:
+    """
+    Cheap fingerprint of the raw data file (size + mtime), so an edited CSV
+    never serves stale splits.
+    """
+    if path is None:
+        return "none"
+    path = Path(path)
+    if not path.exists():
+        return "missing"
+    st = path.stat()
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def _split_params(ds: DatasetSpec, split_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Bind kwargs against make_splits so defaults and explicit values hash the same."""
+    try:
+        bound = inspect.signature(ds.make_splits).bind_partial(**split_kwargs)
+        bound.apply_defaults()
+        return dict(bound.arguments)
+    except (TypeError, ValueError):
+        return dict(split_kwargs)
+
+
+def split_key(ds: Optional[DatasetSpec] = None, **split_kwargs) -> str:
+    """
+    Cache key for a dataset's splits: dataset name, split parameters,
+    split version and source-file fingerprint.
+    """
+    ds = ds or get_dataset()
+    payload = {
+        "dataset": ds.name,
+        "params": _split_params(ds, split_kwargs),
+        "version": SPLIT_VERSION,
+        "source": source_fingerprint(ds.source_path),
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str)
+    return f"{ds.name}-{hashlib.sha256(blob.encode()).hexdigest()[:16]}"
+
+
+def _part_path(cache_dir: Path, part: str) -> Path:
+    suffix = ".parquet" if PARQUET_AVAILABLE else ".pkl"
+    return cache_dir / f"{part}{suffix}"
+
+
+def _write_split_dir(cache_dir: Path, splits: Splits) -> None:
+    tmp_dir = cache_dir.with_name(cache_dir.name + f".tmp{os.getpid()}")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    for part, obj in zip(SPLIT_PARTS, splits):
+        frame = obj.to_frame() if isinstance(obj, pd.Series) else obj
+        path = _part_path(tmp_dir, part)
+        if PARQUET_AVAILABLE:
+            frame.to_parquet(path)
+        else:
+            frame.to_pickle(path)
+    # Rename into place so a concurrent reader never sees a half-written cache
+    try:
+        tmp_dir.rename(cache_dir)
+    except OSError:
+        # Another process won the race; its copy is equivalent
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _read_split_dir(cache_dir: Path) -> Optional[Splits]:
+    """The cached splits, or None if a part is missing or unreadable."""
+    parts = []
+    for part in SPLIT_PARTS:
+        path = _part_path(cache_dir, part)
+        if not path.exists():
+            return None
+        try:
+            frame = pd.read_parquet(path) if PARQUET_AVAILABLE else pd.read_pickle(path)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            return None  # truncated / corrupt file (ArrowInvalid is a ValueError)
+        if part.startswith("y_"):
+            frame = frame.iloc[:, 0]
+        parts.append(frame)
+    return tuple(parts)
+
+
+def _discard_split_dir(cache_dir: Path) -> None:
+    """
+    Move a stale cache dir (parts missing or corrupt, e.g. written by the other
+    storage backend) out of the way, so the rebuilt one can be renamed in.
+    """
+    stale = cache_dir.with_name(cache_dir.name + f".stale{os.getpid()}")
+    try:
+        cache_dir.rename(stale)
+    except OSError:
+        return  # already discarded or replaced by another process
+    shutil.rmtree(stale, ignore_errors=True)
+
+
+def get_splits(ds: Optional[DatasetSpec] = None, use_disk: bool = True, **split_kwargs) -> Splits:
+    """
+    Drop-in replacement for ds.make_splits(**split_kwargs).
+
+    Lookup order: in-process memo, on-disk cache, then the dataset's own
+    make_splits (whose result is written back to both). Splits come back
+    compacted (categoricals, downcast integers, int8 labels).
+    Callers must treat the returned frames as read-only since they are shared.
+    """
+    ds = ds or get_dataset()
+    key = split_key(ds, **split_kwargs)
+
+    if key in _MEMORY:
+        return _MEMORY[key]
+
+    with span("load_splits", dataset=ds.name) as sp:
+        cache_dir = CACHE_DIR / key
+        splits = _read_split_dir(cache_dir) if use_disk and cache_dir.exists() else None
+        sp["attrs"]["source"] = "disk" if splits is not None else "make_splits"
+
+        if splits is None:
+            splits = compact_splits(ds.make_splits(**split_kwargs))
+            if use_disk:
+                CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                if cache_dir.exists():
+                    _discard_split_dir(cache_dir)
+                _write_split_dir(cache_dir, splits)
+        else:
+            # No-op for compact caches; upgrades caches written before compaction
+            splits = compact_splits(splits)
+        sp["rows"] = sum(len(part) for part in splits[0::2])
+
+    _MEMORY[key] = splits
+    return splits
+
+
+def clear_split_cache(disk: bool = False) -> None:
+    """Drop the in-process memo, and optionally the on-disk cache."""
+    _MEMORY.clear()
+    if disk and CACHE_DIR.exists():
+        shutil.rmtree(CACHE_DIR)
+
+
+if __name__ == "__main__":
+    ds = get_dataset()
+    X_train, y_train, X_id_test, y_id_test, X_ood, y_ood = get_splits(ds)
+    print("Split key:", split_key(ds))
+    print("Train shape:", X_train.shape)
+    print("ID test shape:", X_id_test.shape)
+    print("OOD test shape:", X_ood.shape)
@@ -1,6 +1,5 @@
 import pandas as pd
 from typing import Tuple
-from sklearn.model_selection import train_test_split
 
 from .data_loading import load_diabetes_readmission
 
@@ -15,6 +14,8 @@ def make_splits(test_size: float = 0.2, random_state: int = 42
       X_id_test, y_id_test,
       X_ood_test, y_ood_test
     """
+    from sklearn.model_selection import train_test_split  # heavy; only needed on a cache miss
+
     df, label_col, domain_col = load_diabetes_readmission()
 
     # ER source id from UCI docs is 1 (adjust if needed)
@@ -1,5 +1,24 @@
-from dataclasses import dataclass
-from typing import Optional
+import hashlib
+import json
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional
+
+# Bump when the fingerprint payload itself changes, so old runs stop matching
+FINGERPRINT_VERSION = 1
+
+# Per-field semantics version, bumped when the meaning of one field changes.
+# Only configs that set the field to a non-default value get a new fingerprint.
+FIELD_VERSIONS = {
+    "use_group_dro": 2,  # 1: static inverse-frequency weights, 2: online group DRO
+}
+
+# Streaming trains one SGD logistic model whichever of these engines is named
+# (see streaming_train), so they fingerprint as that one model
+STREAMING_MODEL = "sgd"
+STREAMING_ENGINES = ("logreg", "sgd")
+
+# reg_strength -> multiplier on the L2 penalty implied by l2_C
+REG_STRENGTH_FACTOR = {"weak": 0.1, "normal": 1.0, "strong": 10.0}
 
 @dataclass
 class StrategyConfig:
@@ -10,3 +29,50 @@ class StrategyConfig:
     undersample_majority: bool = False
     reg_strength: str = "normal"  # "normal", "strong"
     use_group_dro: bool = False 
+    streaming: bool = False  # out-of-core partial_fit over mini-batches (see streaming_train)
+    seed: Optional[int] = None  # training randomness (subsampling, SGD order); None = unseeded
+    split_seed: Optional[int] = None  # random_state for make_splits; None = the dataset default
+    model: str = "logreg"  # engine in models.ENGINES: "logreg", "hist_gb", "sgd"
+
+
+def split_kwargs(config: StrategyConfig) -> Dict[str, Any]:
+    """Keyword arguments for get_splits / get_encoded / split_key implied by the config."""
+    split_seed = getattr(config, "split_seed", None)
+    return {"random_state": split_seed} if split_seed is not None else {}
+
+
+def config_params(config: StrategyConfig) -> Dict[str, Any]:
+    """
+    Fields that affect training, without the name. Fields left at their
+    default are dropped, so adding a new field with a default does not
+    change the fingerprint of existing configs. Streaming configs name the
+    model they actually train.
+    """
+    params = {
+        f.name: getattr(config, f.name)
+        for f in fields(config)
+        if f.name != "name" and getattr(config, f.name) != f.default
+    }
+    if getattr(config, "streaming", False) and getattr(config, "model", "logreg") in STREAMING_ENGINES:
+        params["model"] = STREAMING_MODEL
+    return params
+
+
+def config_fingerprint(config: StrategyConfig, split_id: str) -> str:
+    """
+    Canonical identity of a run: training parameters plus the split it is
+    trained and evaluated on. split_id (see split_cache.split_key) already
+    covers the dataset, split parameters and seed, split version and
+    source file. Two configs that differ only by name share a fingerprint.
+    """
+    params = config_params(config)
+    payload = {
+        "params": params,
+        "split": split_id,
+        "version": FINGERPRINT_VERSION,
+    }
+    versions = {k: v for k, v in FIELD_VERSIONS.items() if k in params}
+    if versions:
+        payload["field_versions"] = versions
+    blob = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
@@ -0,0 +1,228 @@
+import os
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+if TYPE_CHECKING:
+    from sklearn.preprocessing import MaxAbsScaler, OneHotEncoder
+
+from .datasets import DatasetSpec, get_dataset
+from .feature_store import encode_labels
+from .run_experiment import _record_run
+from .split_cache import get_splits, split_key
+from .group_dro import OnlineGroupWeights, _log_loss
+from .instrumentation import span
+from .models.engines import LINEAR_ENGINES, sgd_classifier
+from .strategies import StrategyConfig, split_kwargs
+
+# Out-of-core training for configs with streaming=True: the encoder is fit
+# in one pass over train batches, the model with partial_fit over several
+# more, and ID/OOD are scored batch by batch. Only a batch of features is
+# ever encoded at once; the per-row outputs kept for metrics are
+# labels, groups and probabilities. Memory is bounded by the batch size
+# only for datasets that read batches from disk (DatasetSpec.iter_batches,
+# e.g. diabetes_stream); others are batched from their in-memory splits.
+DEFAULT_BATCH_ROWS = int(os.getenv("PROMETHEUS_BATCH_ROWS", "50000"))
+DEFAULT_EPOCHS = 5
+
+# Kept for grouping when present (COMPAS has no er_flag)
+META_COLS = ["sex", "er_flag"]
+
+Batch = Tuple[pd.DataFrame, pd.Series]
+
+
+def iter_batches(ds: DatasetSpec, part: str, batch_rows: int) -> Iterator[Batch]:
+    """
+    (X, y) batches of a split part ("train" / "id_test" / "ood"), in the
+    same order on every call. Read from disk when the dataset supports it,
+    else sliced from its in-memory splits (which then are fully loaded).
+    """
+    if ds.iter_batches is not None:
+        yield from ds.iter_batches(part, batch_rows)
+        return
+
+    X_train, y_train, X_id_test, y_id_test, X_ood, y_ood = get_splits(ds)
+    X, y = {"train": (X_train, y_train), "id_test": (X_id_test, y_id_test), "ood": (X_ood, y_ood)}[part]
+    for start in range(0, len(X), batch_rows):
+        yield X.iloc[start:start + batch_rows], y.iloc[start:start + batch_rows]
+
+
+@dataclass
+class BatchEncoder:
+    """
+    Scaler + one-hot encoder fit from streamed batches; transforms one batch
+    at a time. Numerics are max-abs scaled and one-hot columns left as is,
+    matching the MaxAbsScaler the in-memory linear engines apply.
+    """
+    cat_cols: List[str]
+    num_cols: List[str]
+    scaler: "MaxAbsScaler"
+    onehot: Optional["OneHotEncoder"]
+
+    def transform(self, X: pd.DataFrame) -> sp.csr_matrix:
+        X_num = self.scaler.transform(X[self.num_cols].to_numpy(dtype=np.float64))
+        X_num = sp.csr_matrix(np.nan_to_num(X_num))  # missing numerics -> 0
+        if self.onehot is None:
+            return X_num
+        return sp.hstack([X_num, self.onehot.transform(X[self.cat_cols].astype(str))], format="csr")
+
+
+@dataclass
+class TrainStats:
+    n_rows: int
+    class_counts: Dict[int, int]
+    group_counts: Dict[str, int]
+
+
+def fit_batch_encoder(ds: DatasetSpec, batch_rows: int) -> Tuple[BatchEncoder, TrainStats]:
+    """One pass over train: category vocabularies, numeric ranges, class and group counts."""
+    from sklearn.preprocessing import MaxAbsScaler, OneHotEncoder
+
+    scaler = MaxAbsScaler()
+    categories: Dict[str, set] = {}
+    cat_cols: List[str] = []
+    num_cols: List[str] = []
+    first: Optional[pd.DataFrame] = None
+    class_counts: Counter = Counter()
+    group_counts: Counter = Counter()
+    n_rows = 0
+
+    for X, y in iter_batches(ds, "train", batch_rows):
+        if first is None:
+            first = X.head(1)
+            cat_cols = list(X.select_dtypes(include=["object", "category", "string"]).columns)
+            num_cols = list(X.select_dtypes(include=["number"]).columns)
+            categories = {col: set() for col in cat_cols}
+        for col in cat_cols:
+            categories[col].update(X[col].dropna().astype(str).unique())
+        scaler.partial_fit(X[num_cols].to_numpy(dtype=np.float64))
+        class_counts.update(encode_labels(y).to_numpy().tolist())
+        group_counts.update(np.asarray(ds.compute_group_id(X)).tolist())
+        n_rows += len(X)
+
+    if first is None:
+        raise ValueError(f"Dataset {ds.name!r} has no training rows")
+
+    onehot = None
+    if cat_cols:
+        onehot = OneHotEncoder(categories=[sorted(categories[c]) for c in cat_cols],
+                               handle_unknown="ignore", sparse_output=True)
+        onehot.fit(first[cat_cols].astype(str))
+    encoder = BatchEncoder(cat_cols, num_cols, scaler, onehot)
+    return encoder, TrainStats(n_rows, dict(class_counts), dict(group_counts))
+
+
+def _batch_weights(config: StrategyConfig, y: np.ndarray, groups: np.ndarray,
+                   stats: TrainStats, dro: Optional[OnlineGroupWeights] = None,
+                   losses: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+    """
+    Per-row sample_weight, scaled to mean 1 so the SGD step size is
+    unchanged: balanced class weights from whole-train counts and, for
+    group DRO, the online adversary's group weights for this batch.
+    """
+    weights = None
+    if config.class_weight == "balanced":
+        n_classes = len(stats.class_counts)
+        table = {c: stats.n_rows / (n_classes * n) for c, n in stats.class_counts.items()}
+        weights = np.where(y == 1, table.get(1, 1.0), table.get(0, 1.0))
+    if dro is not None:
+        group_w = dro.update(groups, losses)
+        weights = group_w if weights is None else weights * group_w
+    return weights
+
+
+def _keep_rows(config: StrategyConfig, y: np.ndarray, stats: TrainStats,
+               rng: np.random.Generator) -> np.ndarray:
+    """
+    Streaming counterpart of select_train_rows: Bernoulli sampling with
+    probability sample_frac, and majority rows kept with probability
+    n_minority / n_majority when undersampling. rng must be seeded per
+    batch (see run_streaming_experiment) so every epoch keeps the same rows.
+    """
+    keep = np.ones(len(y), dtype=bool)
+    if config.sample_frac < 1.0:
+        keep &= rng.random(len(y)) < config.sample_frac
+    if getattr(config, "undersample_majority", False):
+        n_maj, n_min = stats.class_counts.get(0, 0), stats.class_counts.get(1, 0)
+        if n_min > 0 and n_maj > n_min:
+            keep &= (y != 0) | (rng.random(len(y)) < n_min / n_maj)
+    return keep
+
+
+def build_sgd_model(config: StrategyConfig, n_rows: int):
+    """
+    The sgd engine's classifier, trained with partial_fit. Class weights are
+    applied per batch as sample_weight (from whole-train counts) instead.
+    """
+    return sgd_classifier(config, n_rows).set_params(class_weight=None)
+
+
+def _score_part(ds: DatasetSpec, part: str, model, encoder: BatchEncoder, batch_rows: int):
+    ys, probas, groups, metas = [], [], [], []
+    for X, y in iter_batches(ds, part, batch_rows):
+        probas.append(model.predict_proba(encoder.transform(X))[:, 1])
+        ys.append(encode_labels(y).to_numpy())
+        groups.append(np.asarray(ds.compute_group_id(X)))
+        metas.append(X[[col for col in META_COLS if col in X.columns]].reset_index(drop=True))
+    meta = pd.concat(metas, ignore_index=True) if metas else None
+    return np.concatenate(ys), np.concatenate(probas), np.concatenate(groups), meta
+
+
+def run_streaming_experiment(config: StrategyConfig, fingerprint: str, save: bool = True,
+                             batch_rows: Optional[int] = None,
+                             epochs: int = DEFAULT_EPOCHS) -> Dict[str, Any]:
+    """
+    Train with partial_fit over mini-batches of the current dataset and
+    evaluate ID/OOD in batches. For datasets with disk batches, peak memory
+    follows batch_rows, not the dataset size. Returns the same result dict
+    as run_experiment.
+    """
+    ds = get_dataset()
+    if split_kwargs(config):
+        raise ValueError("split_seed is not supported with streaming=True (shards use one fixed split)")
+    if getattr(config, "model", "logreg") not in LINEAR_ENGINES:
+        # Both linear engines stream as the same SGD logistic model
+        raise ValueError(f"streaming=True needs a linear engine {LINEAR_ENGINES}, got {config.model!r}")
+    batch_rows = batch_rows or DEFAULT_BATCH_ROWS
+    # Row masks are drawn from (seed, batch index), so every epoch trains on the
+    # same subsample, as select_train_rows does; unseeded configs draw a seed once
+    seed = getattr(config, "seed", None)
+    if seed is None:
+        seed = int(np.random.randint(2 ** 31))
+    with span("fit_encoder") as sp:
+        encoder, stats = fit_batch_encoder(ds, batch_rows)
+        sp["rows"] = stats.n_rows
+    model = build_sgd_model(config, stats.n_rows)
+    classes = np.array([0, 1])
+    dro = OnlineGroupWeights(stats.group_counts) if getattr(config, "use_group_dro", False) else None
+
+    with span("fit", estimator=type(model).__name__, epochs=epochs) as sp:
+        sp["rows"] = 0
+        for _ in range(epochs):
+            for b, (X, y) in enumerate(iter_batches(ds, "train", batch_rows)):
+                y_enc = encode_labels(y).to_numpy()
+                keep = _keep_rows(config, y_enc, stats, np.random.default_rng([seed, b]))
+                if not keep.any():
+                    continue
+                X, y_enc = X[keep], y_enc[keep]
+                X_enc = encoder.transform(X)
+
+                # Group DRO: the adversary scores this batch under the current model first
+                losses = None
+                if dro is not None and hasattr(model, "coef_"):
+                    losses = _log_loss(model.decision_function(X_enc), y_enc)
+                weights = _batch_weights(config, y_enc, np.asarray(ds.compute_group_id(X)), stats,
+                                         dro=dro, losses=losses)
+                model.partial_fit(X_enc, y_enc, classes=classes, sample_weight=weights)
+                sp["rows"] += len(y_enc)
+
+    with span("predict") as sp:
+        y_id, id_proba, groups_id, meta_id = _score_part(ds, "id_test", model, encoder, batch_rows)
+        y_ood, ood_proba, groups_ood, meta_ood = _score_part(ds, "ood", model, encoder, batch_rows)
+        sp["rows"] = len(y_id) + len(y_ood)
+    return _record_run(config, fingerprint, split_key(ds), y_id, y_ood, groups_id, groups_ood,
+                       id_proba, ood_proba, meta_id=meta_id, meta_ood=meta_ood, save=save)
@@ -0,0 +1,226 @@
+import argparse
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .array_store import load_predictions
+from .group_metrics import EXCLUDED_GROUP_MARKERS
+from .metrics import compute_metrics
+from .results_store import EXPERIMENTS_DIR, find_run, leaderboard, save_run
+
+# Post-hoc decision thresholds evaluated from a run's stored probabilities.
+# Every threshold in the grid is scored in one pass per split: rows are
+# binned by how many grid thresholds they clear, and cumulative counts per
+# (group, bin) give TP/TN at every threshold at once. No model is refit.
+DEFAULT_GRID = np.linspace(0.0, 1.0, 201)
+
+OBJECTIVES = ("wga", "accuracy")
+
+
+def _as_grid(grid: Optional[np.ndarray]) -> np.ndarray:
+    """Thresholds in ascending order, as the binning in _group_correct needs."""
+    return np.sort(DEFAULT_GRID if grid is None else np.asarray(grid, dtype=float))
+
+
+def _group_correct(y: np.ndarray, proba: np.ndarray, codes: np.ndarray,
+                   n_groups: int, grid: np.ndarray):
+    """
+    correct[g, k]: rows of group g classified correctly at threshold grid[k]
+    (predict positive when proba >= grid[k]), and the size of each group.
+    """
+    keep = codes >= 0
+    y, proba, codes = y[keep], proba[keep], codes[keep].astype(np.int64)
+    K = len(grid)
+
+    # Number of grid thresholds each row clears: positive for k < bins
+    bins = np.searchsorted(grid, proba, side="right")
+    cell = codes * (K + 1) + bins
+    total = np.bincount(cell, minlength=n_groups * (K + 1)).reshape(n_groups, K + 1)
+    pos = np.bincount(cell, weights=y, minlength=n_groups * (K + 1)).reshape(n_groups, K + 1)
+    neg = total - pos
+
+    # Rows with bins <= k are predicted negative at threshold k
+    pos_below = np.cumsum(pos, axis=1)[:, :K]
+    neg_below = np.cumsum(neg, axis=1)[:, :K]
+    correct = (pos.sum(axis=1, keepdims=True) - pos_below) + neg_below
+    return correct, total.sum(axis=1)
+
+
+def _eligible(labels: List[str], size: np.ndarray) -> np.ndarray:
+    return np.array([size[i] > 0 and not any(m in g for m in EXCLUDED_GROUP_MARKERS)
+                     for i, g in enumerate(labels)], dtype=bool)
+
+
+def _sweep_split(y, proba, codes, labels: List[str], grid: np.ndarray) -> Dict[str, Any]:
+    y = np.asarray(y, dtype=np.int64)
+    proba = np.asarray(proba, dtype=float)
+    codes = np.asarray(codes)
+    correct, size = _group_correct(y, proba, codes, len(labels), grid)
+
+    group_acc = correct / np.maximum(size, 1)[:, None]
+    eligible = _eligible(labels, size)
+    accuracy = correct.sum(axis=0) / max(size.sum(), 1)
+    wga = group_acc[eligible].min(axis=0) if eligible.any() else accuracy
+    return {
+        "labels": labels,
+        "size": size,
+        "eligible": eligible,
+        "correct": correct,
+        "group_accuracy": group_acc,
+        "accuracy": accuracy,
+        "worst_group_accuracy": wga,
+    }
+
+
+def threshold_sweep(run: Dict[str, Any], grid: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    Accuracy, per-group accuracy and worst-group accuracy on ID and OOD at
+    every global threshold in grid (sorted ascending in the result), plus
+    the ID-OOD accuracy gap.
+    """
+    return _sweep_arrays(load_predictions(run), grid)
+
+
+def _sweep_arrays(data: Dict[str, Any], grid: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    grid = _as_grid(grid)
+    labels = data["labels"]
+    out: Dict[str, Any] = {"grid": grid}
+    for part in ("id", "ood"):
+        out[part] = _sweep_split(data[f"y_{part}"], data[f"{part}_proba"],
+                                 data[f"groups_{part}"], labels[f"groups_{part}"], grid)
+    out["gap"] = np.abs(out["id"]["accuracy"] - out["ood"]["accuracy"])
+    return out
+
+
+def _best_index(primary: np.ndarray, secondary: np.ndarray) -> int:
+    """First index maximizing primary, ties broken on secondary."""
+    best = np.flatnonzero(primary == primary.max())
+    return int(best[np.argmax(secondary[best])])
+
+
+def _score(objective: str, accuracy: float, wga: float):
+    return (wga, accuracy) if objective == "wga" else (accuracy, wga)
+
+
+def best_threshold_policy(sweep: Dict[str, Any], select_on: str = "id",
+                          objective: str = "wga") -> Dict[str, Any]:
+    """
+    Best global threshold and best per-group thresholds on the selection
+    split, whichever scores higher on objective. Selecting on "ood" peeks
+    at the evaluation split and is only meant for analysis.
+
+    Accuracy and worst-group accuracy are both maximized by picking each
+    group's most accurate threshold independently, so the per-group policy
+    needs no search over threshold combinations.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective {objective!r}; expected one of {OBJECTIVES}")
+    grid, s = sweep["grid"], sweep[select_on]
+
+    primary, secondary = ((s["worst_group_accuracy"], s["accuracy"]) if objective == "wga"
+                          else (s["accuracy"], s["worst_group_accuracy"]))
+    k_global = _best_index(primary, secondary)
+    global_score = _score(objective, s["accuracy"][k_global], s["worst_group_accuracy"][k_global])
+
+    k_group = s["group_accuracy"].argmax(axis=1)
+    rows = np.arange(len(k_group))
+    correct = s["correct"][rows, k_group]
+    acc = correct.sum() / max(s["size"].sum(), 1)
+    group_acc = s["group_accuracy"][rows, k_group]
+    wga = group_acc[s["eligible"]].min() if s["eligible"].any() else acc
+    group_score = _score(objective, acc, wga)
+
+    policy: Dict[str, Any] = {"selected_on": select_on, "objective": objective,
+                              "global_threshold": float(grid[k_global])}
+    if group_score > global_score:
+        policy["kind"] = "per_group"
+        policy["thresholds"] = {g: float(grid[k]) for g, k, n in zip(s["labels"], k_group, s["size"]) if n}
+    else:
+        policy["kind"] = "global"
+    return policy
+
+
+def row_thresholds(policy: Dict[str, Any], codes: np.ndarray, labels: List[str]) -> np.ndarray:
+    """Per-row threshold; groups without their own threshold use the global one."""
+    default = policy["global_threshold"]
+    if policy["kind"] == "global":
+        return np.full(len(codes), default)
+    per_code = np.array([policy["thresholds"].get(g, default) for g in labels] + [default])
+    return per_code[np.asarray(codes, dtype=np.int64)]  # code -1 -> default
+
+
+def _group_values(codes: np.ndarray, labels: List[str]) -> np.ndarray:
+    """Split group codes back to their labels (missing -> None)."""
+    lookup = np.array(list(labels) + [None], dtype=object)
+    return lookup[np.asarray(codes, dtype=np.int64)]
+
+
+def derive_threshold_run(run: Dict[str, Any], select_on: str = "id", objective: str = "wga",
+                         grid: Optional[np.ndarray] = None, save: bool = True,
+                         reuse: bool = True) -> Dict[str, Any]:
+    """
+    Pick the best post-hoc threshold policy for a stored run and return it
+    as a derived run: same config and predictions, metrics recomputed under
+    the policy. The policy is kept in "threshold_policy", outside the config.
+    """
+    grid = _as_grid(grid)
+    parent_fp = run.get("fingerprint") or run.get("_path") or run["config"]["name"]
+    spec = {"parent": parent_fp, "select_on": select_on, "objective": objective,
+            "grid": [float(grid[0]), float(grid[-1]), len(grid)]}
+    fingerprint = hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+    if reuse:
+        previous = find_run(fingerprint)
+        if previous is not None:
+            return previous
+
+    data = load_predictions(run)
+    labels = data["labels"]
+    sweep = _sweep_arrays(data, grid)
+    policy = best_threshold_policy(sweep, select_on=select_on, objective=objective)
+
+    metrics = {}
+    for part in ("id", "ood"):
+        codes, part_labels = data[f"groups_{part}"], labels[f"groups_{part}"]
+        metrics[part] = compute_metrics(np.asarray(data[f"y_{part}"]),
+                                        np.asarray(data[f"{part}_proba"], dtype=float),
+                                        groups=_group_values(codes, part_labels),
+                                        threshold=row_thresholds(policy, codes, part_labels))
+
+    name = f"{run['config']['name']}+thr_{policy['kind']}"
+    result = {
+        "config": {**run["config"], "name": name},
+        "id": metrics["id"],
+        "ood": metrics["ood"],
+        "fingerprint": fingerprint,
+        "derived_from": {"name": run["config"]["name"], "fingerprint": run.get("fingerprint"),
+                         "path": run.get("_path")},
+        "threshold_policy": policy,
+        "arrays": run["arrays"],
+    }
+    if not save:
+        return result
+
+    out_path = EXPERIMENTS_DIR / f"run_{name}-{fingerprint[:8]}.json"
+    with out_path.open("w") as f:
+        json.dump(result, f, indent=2)
+    save_run(result, path=out_path)
+    print("Saved", out_path)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Post-hoc threshold policies for the top runs")
+    parser.add_argument("--top", type=int, default=3)
+    parser.add_argument("--select-on", choices=("id", "ood"), default="id")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="wga")
+    args = parser.parse_args()
+
+    for r in leaderboard(args.top):
+        if "arrays" not in r or "threshold_policy" in r:
+            continue
+        d = derive_threshold_run(r, select_on=args.select_on, objective=args.objective)
+        print(f"{r['config']['name']}: {d['threshold_policy']['kind']} policy, "
+              f"OOD acc {r['ood']['accuracy']:.3f} -> {d['ood']['accuracy']:.3f}, "
+              f"WGA {r['ood'].get('worst_group_accuracy')} -> {d['ood'].get('worst_group_accuracy')}")
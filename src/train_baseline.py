@@ -1,18 +1,13 @@
 import json
 from pathlib import Path
 
-import pandas as pd
-
 from .splits import make_splits
+from .preprocessing import encode_labels
 from .models.baseline import build_baseline_model
 from .metrics import compute_metrics
 
 EXPERIMENTS_DIR = Path(__file__).resolve().parents[1] / "experiments"
 
-def encode_labels(y: pd.Series):
-    # UCI readmitted labels: "NO", "<30", ">30" – treat "NO" as 0, rest as 1
-    return y.apply(lambda v: 0 if v == "NO" else 1)
-
 def main():
     X_train, y_train, X_id_test, y_id_test, X_ood, y_ood = make_splits()
 
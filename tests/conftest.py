@@ -0,0 +1,54 @@
+import pytest
+
+from benchmarks.synthetic import write_csv
+from src import (array_store, chunked_loading, compas_splits, data_loading, datasets, feature_store,
+                 multi_seed, results_store, run_experiment, split_cache, threshold_sweep)
+
+# Rows per synthetic extract: enough for every Sex x ER / Race x Sex group
+SYNTHETIC_ROWS = 3000
+
+
+@pytest.fixture(scope="session")
+def synthetic_csvs(tmp_path_factory):
+    """Small synthetic diabetes / COMPAS extracts (benchmarks/synthetic.py), written once."""
+    root = tmp_path_factory.mktemp("data")
+    return {name: write_csv(name, SYNTHETIC_ROWS, root / f"{name}.csv") for name in ("diabetes", "compas")}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Point every cache and store at tmp_path, with empty in-process memos."""
+    monkeypatch.setattr(split_cache, "CACHE_DIR", tmp_path / "splits")
+    monkeypatch.setattr(split_cache, "_MEMORY", {})
+    monkeypatch.setattr(feature_store, "_ENCODED", {})
+    monkeypatch.setattr(chunked_loading, "SHARDS_DIR", tmp_path / "shards")
+    monkeypatch.setattr(results_store, "EXPERIMENTS_DIR", tmp_path)
+    monkeypatch.setattr(results_store, "RESULTS_DB", tmp_path / "results.sqlite")
+    monkeypatch.setattr(results_store, "_SYNCED", set())
+    monkeypatch.setattr(array_store, "EXPERIMENTS_DIR", tmp_path)
+    monkeypatch.setattr(array_store, "ARRAYS_DIR", tmp_path / "arrays")
+    monkeypatch.setattr(run_experiment, "EXPERIMENTS_DIR", tmp_path)
+    monkeypatch.setattr(multi_seed, "EXPERIMENTS_DIR", tmp_path)
+    monkeypatch.setattr(threshold_sweep, "EXPERIMENTS_DIR", tmp_path)
+    monkeypatch.setenv("PROMETHEUS_LLM_CACHE_DIR", str(tmp_path / "llm"))
+    for var in ("PROMETHEUS_LLM_CACHE", "PROMETHEUS_LLM_CACHE_TTL", "PROMETHEUS_LLM_CACHE_MAX_MB"):
+        monkeypatch.delenv(var, raising=False)
+    return tmp_path
+
+
+def use_dataset(monkeypatch, name: str, csv) -> datasets.DatasetSpec:
+    """Select dataset name, reading csv (diabetes_stream reads the diabetes extract)."""
+    if name == "compas":
+        monkeypatch.setattr(compas_splits, "DATA_PATH", csv)
+    else:
+        monkeypatch.setattr(data_loading, "DATA_PATH", csv)
+        monkeypatch.setattr(chunked_loading, "DATA_PATH", csv)
+    monkeypatch.setattr(datasets.DATASETS[name], "source_path", csv)
+    monkeypatch.setattr(datasets, "CURRENT_DATASET", name)
+    return datasets.DATASETS[name]
+
+
+@pytest.fixture(params=["diabetes", "compas"])
+def dataset(request, synthetic_csvs, workdir, monkeypatch) -> datasets.DatasetSpec:
+    """Each synthetic dataset in turn, as the current dataset."""
+    return use_dataset(monkeypatch, request.param, synthetic_csvs[request.param])
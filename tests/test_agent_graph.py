@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src import agent_graph
+from src.strategies import StrategyConfig
+from tests.conftest import use_dataset
+
+pytest.importorskip("langgraph.checkpoint.sqlite.aio")
+
+
+class FakeAgents:
+    """Stand-ins for the agents' LLM calls: counted, and able to fail on demand."""
+
+    def __init__(self):
+        self.calls = {"strategy": 0, "research": 0, "critic": 0, "judge": 0}
+        self.fail = set()
+        self.barrier = None  # set to make strategy and research wait for each other
+        self.delay = 0.0
+        self.in_flight = self.peak = 0
+        self.strategy_done = threading.Event()
+        self._lock = threading.Lock()
+
+    def _call(self, agent: str) -> str:
+        with self._lock:
+            self.calls[agent] += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            if agent in self.fail:
+                # Fail after strategy's result is back in the graph, or it is cancelled too
+                self.strategy_done.wait(10)
+                time.sleep(0.05)
+                raise RuntimeError(f"{agent} is down")
+            if self.barrier is not None and agent in ("strategy", "research"):
+                self.barrier.wait()
+            if self.delay:
+                time.sleep(self.delay)
+            return "0.1" if agent == "judge" else f"{agent} notes"
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def strategies(self):
+        self._call("strategy")
+        self.strategy_done.set()
+        return [StrategyConfig(name="half", sample_frac=0.5)], "try a subsample"
+
+    def chat(self, agent, prompt, temperature, **kwargs):
+        return self._call(agent)
+
+    async def achat(self, agent, prompt, temperature, **kwargs):
+        return await asyncio.to_thread(self._call, agent)
+
+
+@pytest.fixture
+def agents(synthetic_csvs, workdir, monkeypatch):
+    use_dataset(monkeypatch, "diabetes", synthetic_csvs["diabetes"])
+    monkeypatch.setattr(agent_graph, "CHECKPOINT_DB", str(workdir / "sessions.sqlite"))
+    fake = FakeAgents()
+    monkeypatch.setattr(agent_graph, "call_llm_and_get_strategies", fake.strategies)
+    monkeypatch.setattr(agent_graph, "chat", fake.chat)
+    monkeypatch.setattr(agent_graph, "achat", fake.achat)
+    return fake
+
+
+def _inputs(async_mode: bool) -> dict:
+    return {"best_run": None, "all_runs": [], "proposed_configs": [], "step": 0, "max_steps": 1,
+            "n_workers": 1, "use_halving": False, "n_seeds": 1, "async_mode": async_mode,
+            "strategy_rationale": "", "research_notes": "", "critic_notes": "", "judge_score": 0.0}
+
+
+@pytest.mark.parametrize("async_mode, failing", [(False, "critic"), (True, "critic"), (True, "research")])
+def test_resume_reruns_only_the_failed_call(agents, async_mode, failing):
+    agents.fail = {failing}
+    with pytest.raises(RuntimeError, match=f"{failing} is down"):
+        agent_graph._run_graph(_inputs(async_mode), "s1", async_mode)
+    assert agent_graph.saved_state("s1")["step"] == 0
+
+    agents.fail = set()
+    final = agent_graph._run_graph(None, "s1", async_mode)
+    # The proposals came from the checkpoint (for a failed research branch, from
+    # the writes saved for its finished sibling); the strategy call was not repeated
+    assert agents.calls["strategy"] == 1
+    assert agents.calls[failing] == 2
+    assert agents.calls["judge"] == 1
+    assert final["critic_notes"] == "critic notes" and final["research_notes"] == "research notes"
+    assert final["best_run"]["config"]["name"] == "half"
+
+    # A finished session is not run again
+    agent_graph._run_graph(None, "s1", async_mode)
+    assert agents.calls["judge"] == 1
+
+
+def test_async_mode_overlaps_strategy_and_research(agents):
+    # Each call waits for the other; run one after the other, the barrier times out
+    agents.barrier = threading.Barrier(2, timeout=10)
+    final = agent_graph._run_graph(_inputs(True), "s2", True)
+    assert final["research_notes"] == "research notes"
+    assert agents.calls == {"strategy": 1, "research": 1, "critic": 1, "judge": 1}
+
+
+@pytest.mark.parametrize("limit, peak", [(1, 1), (4, 2)])
+def test_async_mode_bounds_concurrent_calls(agents, monkeypatch, limit, peak):
+    monkeypatch.setattr(agent_graph, "LLM_CONCURRENCY", limit)
+    agents.delay = 0.2
+    final = agent_graph._run_graph(_inputs(True), "s4", True)
+    assert final["critic_notes"] == "critic notes"
+    assert agents.peak == peak
+
+
+def test_async_call_timeout_fails_the_node(agents, monkeypatch):
+    monkeypatch.setattr(agent_graph, "LLM_TIMEOUT_S", 0.2)
+    release = threading.Event()
+
+    async def hanging_achat(agent, *args, **kwargs):
+        if agent == "research":
+            await asyncio.to_thread(release.wait, 10)
+        return await agents.achat(agent, *args, **kwargs)
+
+    monkeypatch.setattr(agent_graph, "achat", hanging_achat)
+    # The timed-out worker thread is not stopped, and asyncio.run waits for it
+    # on exit: the "request" returns a little after the timeout
+    threading.Timer(0.5, release.set).start()
+    with pytest.raises(asyncio.TimeoutError):
+        agent_graph._run_graph(_inputs(True), "s3", True)
+    assert release.is_set()
+
+    # Strategy finished in the same step, so resuming reruns research only
+    monkeypatch.setattr(agent_graph, "achat", agents.achat)
+    final = agent_graph._run_graph(None, "s3", True)
+    assert final["research_notes"] == "research notes"
+    assert agents.calls["strategy"] == 1
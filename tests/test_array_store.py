@@ -0,0 +1,79 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.array_store import load_predictions, load_split_arrays, save_predictions, save_split_arrays
+from src.run_experiment import run_experiment
+from src.strategies import StrategyConfig
+
+
+@pytest.fixture
+def split(workdir):
+    rng = np.random.default_rng(0)
+    n_id, n_ood = 50, 30
+    meta_id = pd.DataFrame({"sex": rng.choice(["Male", "Female"], n_id), "er_flag": rng.integers(0, 2, n_id),
+                            "score": rng.random(n_id)})
+    meta_ood = pd.DataFrame({"sex": rng.choice(["Female", "Male"], n_ood), "er_flag": rng.integers(0, 2, n_ood),
+                             "score": rng.random(n_ood)})
+    return {
+        "y_id": rng.integers(0, 2, n_id), "y_ood": rng.integers(0, 2, n_ood),
+        "groups_id": rng.choice(["A", "B", "C"], n_id), "groups_ood": rng.choice(["C", "A"], n_ood),
+        "meta_id": meta_id, "meta_ood": meta_ood,
+    }
+
+
+def _decode(arrays, name):
+    return np.asarray(arrays["labels"][name])[arrays[name]]
+
+
+def test_split_arrays_round_trip_compactly(split):
+    save_split_arrays("s", **split)
+    arrays = load_split_arrays("s")
+
+    for part in ("id", "ood"):
+        assert arrays[f"y_{part}"].dtype == np.int8
+        np.testing.assert_array_equal(arrays[f"y_{part}"], split[f"y_{part}"])
+        # Strings come back as small codes plus their labels, coded per part
+        assert arrays[f"groups_{part}"].dtype == np.int8
+        np.testing.assert_array_equal(_decode(arrays, f"groups_{part}"), split[f"groups_{part}"])
+        np.testing.assert_array_equal(_decode(arrays, f"meta_sex_{part}"), split[f"meta_{part}"]["sex"])
+        # Numeric metadata stays numeric, downcast
+        assert arrays[f"meta_er_flag_{part}"].dtype == np.int8
+        assert arrays[f"meta_score_{part}"].dtype == np.float32
+        assert isinstance(arrays[f"y_{part}"], np.memmap)
+
+
+def test_split_arrays_are_written_once(split):
+    save_split_arrays("s", **split)
+    first = load_split_arrays("s", mmap=False)
+    save_split_arrays("s", **{**split, "y_id": 1 - split["y_id"]})
+    np.testing.assert_array_equal(load_split_arrays("s", mmap=False)["y_id"], first["y_id"])
+
+
+def test_predictions_overwrite_and_load_with_their_split(split):
+    save_split_arrays("s", **split)
+    proba = np.linspace(0, 1, 50)
+    ref = save_predictions("run-a", proba, proba[:30])
+    save_predictions("run-a", proba[::-1], proba[:30])
+
+    data = load_predictions({"arrays": {"split": "s", "predictions": ref}})
+    assert data["id_proba"].dtype == np.float32
+    np.testing.assert_allclose(data["id_proba"], proba[::-1], atol=1e-7)
+    assert "y_ood" in data and "groups_id" in data
+
+    with pytest.raises(KeyError, match="no stored arrays"):
+        load_predictions({"config": {"name": "legacy"}})
+
+
+def test_run_record_references_arrays_instead_of_rows(dataset, workdir):
+    result = run_experiment(StrategyConfig(name="plain"))
+    path = workdir / f"run_plain-{result['fingerprint'][:8]}.json"
+    record = json.loads(path.read_text())
+    assert set(record["arrays"]) == {"split", "predictions"}
+    assert "meta_id" not in record and "meta_ood" not in record
+
+    data = load_predictions(record)
+    assert len(data["id_proba"]) == len(data["y_id"]) == len(data["groups_id"])
+    assert len(data["ood_proba"]) == len(data["y_ood"])
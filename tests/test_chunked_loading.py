@@ -0,0 +1,102 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import chunked_loading
+from src.chunked_loading import DIABETES_COLUMNS, SHARD_PARTS, read_shards, write_shards
+
+CHUNK_ROWS = 500
+
+
+@pytest.fixture
+def extract(synthetic_csvs, workdir):
+    """The synthetic diabetes extract as a frame, and a writer for edited copies of it."""
+    df = pd.read_csv(synthetic_csvs["diabetes"])
+
+    def write(frame: pd.DataFrame, name: str = "extract.csv"):
+        path = workdir / name
+        frame.to_csv(path, index=False)
+        return path
+
+    return df, write
+
+
+def _all_parts(shard_dir) -> pd.DataFrame:
+    frame = pd.concat([read_shards(shard_dir, part) for part in SHARD_PARTS], ignore_index=True)
+    return frame.sort_values("encounter_id", ignore_index=True)
+
+
+def _manifest(shard_dir) -> dict:
+    return json.loads((shard_dir / "manifest.json").read_text())
+
+
+def test_usecols_skips_unlisted_and_absent_columns(extract):
+    df, write = extract
+    df["free_text_note"] = "not a feature"
+    source = write(df)
+
+    frame = _all_parts(write_shards(source, usecols=DIABETES_COLUMNS, chunk_rows=CHUNK_ROWS))
+    assert "free_text_note" not in frame
+    # DIABETES_COLUMNS lists medications this extract does not have
+    assert "examide" not in frame and "metformin" in frame
+    assert {"readmitted", "admission_source_id", "sex", "er_flag"} <= set(frame.columns)
+    assert len(frame) == len(df)
+
+
+def test_missing_integers_keep_their_width(extract):
+    df, write = extract
+    # Missing counts only after the first chunk, so the dtypes come from a complete one
+    missing = np.zeros(len(df), dtype=bool)
+    missing[CHUNK_ROWS + 3::7] = True
+    df["num_procedures"] = df["num_procedures"].mask(missing)
+    df["number_emergency"] = df["number_emergency"].mask(missing)
+    shard_dir = write_shards(write(df), usecols=DIABETES_COLUMNS, chunk_rows=CHUNK_ROWS)
+
+    assert _manifest(shard_dir)["dtypes"]["num_procedures"] == "int8"
+    if chunked_loading.PARQUET_AVAILABLE:
+        import pyarrow.parquet as pq
+
+        # Chunks with and without missing values share one shard schema
+        for path in shard_dir.glob("*/*.parquet"):
+            assert str(pq.read_schema(path).field("num_procedures").type) == "int8"
+
+    frame = _all_parts(shard_dir)
+    expected = df.sort_values("encounter_id", ignore_index=True)
+    np.testing.assert_array_equal(frame["num_procedures"].isna(), expected["num_procedures"].isna())
+    np.testing.assert_array_equal(frame["num_procedures"].dropna(), expected["num_procedures"].dropna())
+    # A missing emergency count is no ER visit, as in the in-memory loader
+    np.testing.assert_array_equal(frame["er_flag"], (expected["number_emergency"] > 0).astype(int))
+
+
+def test_overflow_widens_written_shards_without_rereading(extract, monkeypatch):
+    df, write = extract
+    df.loc[len(df) - 10:, "num_procedures"] = 1000  # int8 holds the first chunks, not the last
+    source = write(df)
+
+    passes = []
+    read_csv = pd.read_csv
+
+    def counting_read_csv(*args, **kwargs):
+        if kwargs.get("chunksize"):
+            passes.append(args[0])
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(chunked_loading.pd, "read_csv", counting_read_csv)
+    shard_dir = write_shards(source, usecols=DIABETES_COLUMNS, chunk_rows=CHUNK_ROWS)
+    assert len(passes) == 1
+    assert _manifest(shard_dir)["dtypes"]["num_procedures"] == "int16"
+
+    frame = _all_parts(shard_dir)
+    assert frame["num_procedures"].dtype == np.int16
+    expected = df.sort_values("encounter_id", ignore_index=True)
+    np.testing.assert_array_equal(frame["num_procedures"], expected["num_procedures"])
+
+
+def test_chunk_size_does_not_change_shards(extract):
+    df, write = extract
+    df.loc[len(df) - 10:, "num_procedures"] = 1000
+    small = _all_parts(write_shards(write(df, "a.csv"), usecols=DIABETES_COLUMNS, chunk_rows=CHUNK_ROWS))
+    whole = _all_parts(write_shards(write(df, "b.csv"), usecols=DIABETES_COLUMNS, chunk_rows=len(df)))
+    pd.testing.assert_frame_equal(small, whole)
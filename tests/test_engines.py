@@ -0,0 +1,55 @@
+import contextlib
+from dataclasses import asdict
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from src import parallel
+from src.models import DEFAULT_ENGINE, ENGINES, get_engine
+from src.run_experiment import _features, run_experiment
+from src.strategies import StrategyConfig
+
+
+def test_get_engine_defaults_and_rejects_unknown_names():
+    assert get_engine(None).name == get_engine("").name == DEFAULT_ENGINE
+    with pytest.raises(ValueError, match="Unknown model engine 'xgboost'"):
+        get_engine("xgboost")
+
+
+@pytest.mark.parametrize("name", sorted(ENGINES))
+def test_engine_gets_the_layout_it_declares(dataset, name):
+    config = StrategyConfig(name=name, model=name)
+    enc = _features(config)
+    if ENGINES[name].sparse:
+        assert sp.issparse(enc.X_train) and enc.categorical is None
+    else:
+        # Dense numerics followed by one code column per categorical; only code
+        # columns are native categoricals (high-cardinality ones stay ordered codes)
+        assert isinstance(enc.X_train, np.ndarray)
+        assert enc.X_train.shape[1] == len(enc.num_cols) + len(enc.cat_cols) == enc.categorical.shape[0]
+        assert not enc.categorical[:len(enc.num_cols)].any() and enc.categorical.any()
+
+    result = run_experiment(config, save=False, reuse=False)
+    assert 0.0 <= result["ood"]["accuracy"] <= 1.0
+    assert result["config"]["model"] == name
+
+
+def test_group_dro_is_pinned_to_logreg(dataset):
+    with pytest.raises(ValueError, match="use_group_dro"):
+        run_experiment(StrategyConfig(name="dro", use_group_dro=True, model="hist_gb"), save=False)
+
+
+@pytest.mark.parametrize("name", sorted(ENGINES))
+def test_only_threaded_engines_get_more_threads(name, monkeypatch):
+    threadpoolctl = pytest.importorskip("threadpoolctl")
+    limits = []
+
+    def threadpool_limits(n):
+        limits.append(n)
+        return contextlib.nullcontext()
+
+    monkeypatch.setattr(threadpoolctl, "threadpool_limits", threadpool_limits)
+    monkeypatch.setattr(parallel, "run_experiment", lambda config, save: config.model)
+    assert parallel._run_config(asdict(StrategyConfig(name=name, model=name)), threads=4) == name
+    assert limits == ([4] if ENGINES[name].threads else [])
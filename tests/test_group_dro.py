@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from src.group_dro import GroupDROLogistic, OnlineGroupWeights
+
+
+@pytest.fixture
+def shifted_groups():
+    """
+    One feature, two groups with different decision thresholds (A: x > 0,
+    B: x > 1) and B only 10% of rows: a single linear threshold cannot fit
+    both, so plain ERM settles near A's and B carries the worst accuracy.
+    """
+    rng = np.random.default_rng(0)
+    n = 4000
+    groups = np.where(rng.random(n) < 0.1, "B", "A")
+    x = rng.normal(size=n)
+    y = np.where(groups == "A", x > 0, x > 1).astype(int)
+    return sp.csr_matrix(np.c_[x, np.ones(n)]), y, groups
+
+
+def _group_accuracy(model, X, y, groups):
+    correct = (model.predict_proba(X)[:, 1] >= 0.5) == y
+    return {g: correct[groups == g].mean() for g in ("A", "B")}
+
+
+def test_group_dro_raises_worst_group_accuracy(shifted_groups):
+    X, y, groups = shifted_groups
+    erm = GroupDROLogistic(C=100.0, eta_q=0.0, epochs=20, lr=0.05).fit(X, y, groups)
+    dro = GroupDROLogistic(C=100.0, eta_q=0.5, epochs=20, lr=0.05).fit(X, y, groups)
+
+    erm_acc, dro_acc = _group_accuracy(erm, X, y, groups), _group_accuracy(dro, X, y, groups)
+    assert erm_acc["B"] < erm_acc["A"]
+    assert min(dro_acc.values()) > min(erm_acc.values()) + 0.05
+
+    # The adversary moved weight to the high-loss minority group, and B's loss went down
+    weights = dro.history_[-1]["group_weight"]
+    assert weights["B"] > 0.25 > (groups == "B").mean()
+    assert sum(weights.values()) == pytest.approx(1.0)
+    assert dro.history_[-1]["group_loss"]["B"] < erm.history_[-1]["group_loss"]["B"]
+
+
+def test_group_dro_converges(shifted_groups):
+    X, y, groups = shifted_groups
+    model = GroupDROLogistic(C=100.0, eta_q=0.5, epochs=20, lr=0.05).fit(X, y, groups)
+    losses = [max(h["group_loss"].values()) for h in model.history_]
+    assert losses[-1] < losses[0]
+    # Later epochs change the worst-group loss far less than the first ones
+    assert abs(losses[-1] - losses[-2]) < abs(losses[1] - losses[0])
+
+
+def test_group_dro_zero_eta_keeps_size_weights(shifted_groups):
+    X, y, groups = shifted_groups
+    model = GroupDROLogistic(eta_q=0.0, epochs=2).fit(X, y, groups)
+    assert model.history_[-1]["group_weight"]["B"] == pytest.approx((groups == "B").mean())
+
+
+def _reference_update(counts, eta_q, groups, losses, q):
+    """OnlineGroupWeights.update, one row at a time."""
+    labels = list(counts)
+    adversarial = np.array(["Unknown" not in g for g in labels])
+    fixed_mass = q[~adversarial].sum()
+    batch = {g: [loss for gg, loss in zip(groups, losses) if gg == g] for g in labels}
+    for i, g in enumerate(labels):
+        if adversarial[i] and batch[g]:
+            q[i] *= np.exp(eta_q * np.mean(batch[g]))
+    q[adversarial] *= (1.0 - fixed_mass) / q[adversarial].sum()
+    n = len(groups)
+    return np.array([q[labels.index(g)] / len(batch[g]) * n if g in labels else 1.0 for g in groups])
+
+
+def test_online_weights_match_reference():
+    counts = {"A": 60, "B": 30, "Unknown/Invalid": 10}
+    rng = np.random.default_rng(1)
+    adversary = OnlineGroupWeights(counts, eta_q=0.3)
+    q = np.array([0.6, 0.3, 0.1])
+    for _ in range(5):
+        # "C" was never seen in the whole-train pass
+        groups = rng.choice(["A", "B", "Unknown/Invalid", "C"], size=40, p=[0.5, 0.3, 0.1, 0.1])
+        losses = rng.random(40) * np.where(groups == "B", 3.0, 1.0)
+        weights = adversary.update(groups, losses)
+        np.testing.assert_allclose(weights, _reference_update(counts, 0.3, groups, losses, q))
+    # Excluded groups keep their share; the adversary favours the high-loss group
+    assert adversary.q[2] == pytest.approx(0.1)
+    assert adversary.q[1] > 0.3
+
+
+def test_online_weights_without_losses_are_size_weights():
+    adversary = OnlineGroupWeights({"A": 3, "B": 1})
+    weights = adversary.update(np.array(["A", "A", "A", "B"]), None)
+    np.testing.assert_allclose(weights, [1.0, 1.0, 1.0, 1.0])
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from sklearn.metrics import roc_auc_score
+
+from src.group_metrics import group_metrics
+
+
+@pytest.fixture
+def cohort():
+    """
+    Rows by patient group. "F" has tied scores and probabilities on ECE bin
+    edges (0.1, 0.5, 1.0); "M" has only positives; "Unknown/Invalid" scores
+    worst but must never be reported as the worst group.
+    """
+    groups = np.array(["F"] * 8 + ["M"] * 3 + ["Unknown/Invalid"] * 3, dtype=object)
+    y = np.array([0, 0, 1, 1, 0, 1, 1, 0] + [1, 1, 1] + [1, 0, 1])
+    proba = np.array([0.1, 0.5, 0.5, 1.0, 0.3, 0.3, 0.9, 0.0] + [0.8, 0.4, 0.95] + [0.2, 0.9, 0.1])
+    return y, proba, groups
+
+
+def test_tied_scores_match_sklearn_auc(cohort):
+    y, proba, groups = cohort
+    out = group_metrics(y, proba, groups)
+    m = groups == "F"
+    assert out["group_auc"]["F"] == pytest.approx(roc_auc_score(y[m], proba[m]))
+    assert out["group_accuracy"]["F"] == pytest.approx(np.mean((proba[m] >= 0.5) == y[m]))
+    assert out["group_tpr"]["F"] == pytest.approx(3 / 4) and out["group_fpr"]["F"] == pytest.approx(1 / 4)
+
+
+def test_ece_bins_include_the_upper_edge(cohort):
+    y, proba, groups = cohort
+    ece = group_metrics(y, proba, groups)["group_ece"]["F"]
+    # Bins of F: [0.0] -> 0, [0.1] -> 1, [0.3, 0.3] -> 3, [0.5, 0.5] -> 5, [0.9, 1.0] -> 9
+    expected = (abs(0 - 0.0) + abs(0 - 0.1) + abs(1 - 0.6) + abs(1 - 1.0) + abs(2 - 1.9)) / 8
+    assert ece == pytest.approx(expected)
+
+
+def test_single_class_group_is_left_out_of_worst_auc(cohort):
+    y, proba, groups = cohort
+    out = group_metrics(y, proba, groups)
+    assert np.isnan(out["group_auc"]["M"]) and np.isnan(out["group_fpr"]["M"])
+    assert out["group_tpr"]["M"] == pytest.approx(2 / 3)
+    assert out["worst_group_auc"] == pytest.approx(out["group_auc"]["F"])
+    assert out["worst_group_fpr"] == pytest.approx(out["group_fpr"]["F"])
+
+
+def test_excluded_group_is_reported_but_never_worst(cohort):
+    y, proba, groups = cohort
+    out = group_metrics(y, proba, groups)
+    assert out["group_accuracy"]["Unknown/Invalid"] == 0.0
+    assert out["worst_group_accuracy"] == min(out["group_accuracy"]["F"], out["group_accuracy"]["M"])
+
+    only_excluded = groups == "Unknown/Invalid"
+    out = group_metrics(y[only_excluded], proba[only_excluded], groups[only_excluded])
+    assert out["group_size"] == {"Unknown/Invalid": 3} and out["worst_group_accuracy"] is None
+
+
+def test_missing_groups_drop_rows_and_their_thresholds(cohort):
+    y, proba, groups = cohort
+    groups = groups.copy()
+    groups[[0, 8]] = None
+    # Per-row thresholds stay aligned with the rows kept
+    threshold = np.where(groups == "M", 0.9, 0.5)
+    out = group_metrics(y, proba, groups, threshold=threshold)
+
+    assert out["group_size"] == {"F": 7, "M": 2, "Unknown/Invalid": 3}
+    assert out["group_accuracy"]["M"] == pytest.approx(0.5)  # 0.4 and 0.95 at threshold 0.9
+
+
+def test_no_grouped_rows_gives_no_worst_group():
+    out = group_metrics([1, 0], [0.7, 0.2], [None, None])
+    assert out["group_size"] == {} and out["worst_group_accuracy"] is None and out["worst_group_ece"] is None
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from src import instrumentation
+from src.instrumentation import add_tokens, chrome_trace, span, summarize, traced
+from src.results_store import list_traces, load_spans
+from src.run_experiment import run_experiment
+from src.strategies import StrategyConfig
+
+
+@pytest.fixture
+def trace(workdir, monkeypatch):
+    monkeypatch.setattr(instrumentation, "ENABLED", True)
+    monkeypatch.setenv(instrumentation.TRACE_ENV, "t-test")
+    return "t-test"
+
+
+def _by_name(spans):
+    return {sp["name"]: sp for sp in spans}
+
+
+def test_nested_spans_flush_when_the_outermost_closes(trace):
+    with span("node", cat="node") as outer:
+        with span("fit", rows=100):
+            add_tokens(3)
+        add_tokens(4)
+        assert load_spans(trace) == []  # still buffered
+
+    spans = _by_name(load_spans(trace))
+    assert spans["fit"]["parent_id"] == outer["span_id"] and spans["node"]["parent_id"] is None
+    # Tokens count towards every open span, rows only where they were given
+    assert spans["node"]["tokens"] == 7 and spans["fit"]["tokens"] == 3
+    assert spans["fit"]["rows"] == 100 and spans["fit"]["wall_ms"] <= spans["node"]["wall_ms"]
+    assert [(t["trace_id"], t["n_spans"]) for t in list_traces()] == [(trace, 2)]
+
+
+def test_failing_span_records_the_error(trace):
+    with pytest.raises(ValueError):
+        with span("fit"):
+            raise ValueError("bad")
+    assert load_spans(trace)[0]["attrs"] == {"error": "ValueError"}
+
+
+def test_concurrent_tasks_keep_their_own_tokens(trace):
+    @traced("agent", cat="llm", attrs=lambda agent, n: {"agent": agent})
+    async def call(agent, n):
+        await asyncio.sleep(0.01)
+        add_tokens(n)
+        await asyncio.sleep(0.01)
+
+    async def session():
+        with span("agents", cat="node"):
+            await asyncio.gather(call("strategy", 10), call("research", 1))
+
+    asyncio.run(session())
+    spans = load_spans(trace)
+    tokens = {sp["attrs"]["agent"]: sp["tokens"] for sp in spans if sp["name"] == "agent"}
+    assert tokens == {"strategy": 10, "research": 1}
+    node = _by_name(spans)["agents"]
+    assert node["tokens"] == 11
+    assert all(sp["parent_id"] == node["span_id"] for sp in spans if sp["name"] == "agent")
+
+
+def test_run_stages_export_as_chrome_events(trace, dataset):
+    run_experiment(StrategyConfig(name="plain"))
+    spans = load_spans(trace)
+    run = _by_name(spans)["run_experiment"]
+    stages = [sp for sp in spans if sp["parent_id"] == run["span_id"]]
+    assert {"fit", "predict", "metrics"} <= {sp["name"] for sp in stages}
+    assert all(sp["rows"] for sp in stages if sp["name"] == "fit")
+
+    events = chrome_trace(spans)["traceEvents"]
+    assert len(events) == len(spans) and {e["ph"] for e in events} == {"X"}
+    assert events[0]["args"]["config"] == "plain"
+
+    totals = summarize(spans)
+    assert [g["wall_ms"] for g in totals] == sorted((g["wall_ms"] for g in totals), reverse=True)
+    assert sum(g["count"] for g in totals) == len(spans)
+
+
+def test_disabled_tracing_records_nothing(trace, monkeypatch):
+    monkeypatch.setattr(instrumentation, "ENABLED", False)
+    with span("fit") as sp:
+        add_tokens(5)
+        sp["rows"] = 10
+    assert load_spans(trace) == []
@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src import llm_cache, llm_client
+from src.llm_cache import LLMCacheMiss, cache_key, cached_call
+
+
+class Backend:
+    """Stands in for an LLM call: counts calls, answers with a new response each time."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        return f"response {self.calls}"
+
+
+@pytest.fixture
+def backend(workdir):
+    return Backend()
+
+
+def test_key_covers_request_options():
+    plain = cache_key("m", 0.0, "sys", "prompt")
+    assert cache_key("m", 0.0, "sys", "prompt", {"json_mode": False, "max_tokens": None}) == plain
+    keys = {plain,
+            cache_key("m", 0.0, "sys", "prompt", {"json_mode": True}),
+            cache_key("m", 0.0, "sys", "prompt", {"max_tokens": 64}),
+            cache_key("m", 0.0, "sys", "prompt", {"json_mode": True, "max_tokens": 64}),
+            cache_key("m", 0.2, "sys", "prompt"),
+            cache_key("m", 0.0, "", "prompt")}
+    assert len(keys) == 6
+
+
+def test_deterministic_mode_caches_only_temperature_zero(backend, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_LLM_CACHE", "deterministic")
+    assert cached_call("m", 0.0, "", "p", backend) == cached_call("m", 0.0, "", "p", backend) == "response 1"
+    cached_call("m", 0.2, "", "p", backend)
+    cached_call("m", 0.2, "", "p", backend)
+    assert backend.calls == 3
+
+
+def test_record_then_replay(backend, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_LLM_CACHE", "record")
+    recorded = cached_call("m", 0.7, "", "p", backend, options={"json_mode": True})
+
+    # Replay serves the recording whatever its age, and never calls the back end
+    monkeypatch.setenv("PROMETHEUS_LLM_CACHE", "replay")
+    monkeypatch.setenv("PROMETHEUS_LLM_CACHE_TTL", "0")
+    assert cached_call("m", 0.7, "", "p", backend, options={"json_mode": True}) == recorded
+    with pytest.raises(LLMCacheMiss):
+        cached_call("m", 0.7, "", "p", backend)  # same prompt, not in JSON mode
+    assert backend.calls == 1
+
+
+def test_off_mode_never_writes(backend, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_LLM_CACHE", "off")
+    cached_call("m", 0.0, "", "p", backend)
+    cached_call("m", 0.0, "", "p", backend)
+    assert backend.calls == 2
+    assert not llm_cache.cache_dir().exists()
+
+
+def test_expired_entries_are_refreshed(backend, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_LLM_CACHE_TTL", "-1")
+    cached_call("m", 0.0, "", "p", backend)
+    assert cached_call("m", 0.0, "", "p", backend) == "response 2"
+
+
+def test_eviction_keeps_cache_under_limit(backend, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_LLM_CACHE_MAX_MB", str(2048 / 2 ** 20))
+    for i in range(40):
+        cached_call("m", 0.0, "", f"prompt {i}", backend)
+    entries, total = llm_cache._scan(llm_cache.cache_dir())
+    assert total <= 2048
+    assert 0 < len(entries) < 40
+    # The newest entry survives eviction
+    assert llm_cache.get(cache_key("m", 0.0, "", "prompt 39")) == "response 40"
+
+
+def _completion(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+def test_chat_keys_json_mode_apart(workdir, monkeypatch):
+    requests = []
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        return _completion("{}" if "response_format" in kwargs else "text")
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(llm_client, "get_groq_client", lambda: fake)
+    assert llm_client.chat("judge", "p", temperature=0.0) == "text"
+    assert llm_client.chat("judge", "p", temperature=0.0, json_mode=True) == "{}"
+    assert llm_client.chat("judge", "p", temperature=0.0, json_mode=True) == "{}"
+    assert len(requests) == 2
+
+
+def test_oumi_strategy_call_keeps_its_temperature(workdir, monkeypatch):
+    seen = {}
+
+    def fake_cached_call(model, temperature, system, prompt, call, **kwargs):
+        seen["temperature"] = temperature
+        return '{"strategies": [{"name": "a"}]}'
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(llm_client, "provider_available", lambda name: True)
+    monkeypatch.setattr(llm_client, "load_provider", lambda name: SimpleNamespace())
+    monkeypatch.setattr(llm_client, "get_oumi_engine", lambda name: None)
+    monkeypatch.setattr(llm_client, "_load_prompt", lambda: "prompt")
+    monkeypatch.setattr(llm_client, "cached_call", fake_cached_call)
+    strategies, _ = llm_client.call_llm_and_get_strategies()
+    assert [s.name for s in strategies] == ["a"]
+    assert seen["temperature"] == llm_client.STRATEGY_TEMPERATURE > 0
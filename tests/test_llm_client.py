@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src import llm_client
+from src.llm_client import achat, chat, get_groq_client, llm_stats
+
+
+class FakeGroq:
+    """Groq SDK stand-in: counts constructions and answers every completion."""
+
+    created = 0
+
+    def __init__(self, api_key, base_url=None, http_client=None):
+        type(self).created += 1
+        self.http_client = http_client
+        self.requests = []
+        self.fail = False
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.requests.append(kwargs)
+        if self.fail:
+            raise ConnectionError("down")
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))], usage=usage)
+
+
+@pytest.fixture
+def groq(workdir, monkeypatch):
+    FakeGroq.created = 0
+    monkeypatch.setattr(llm_client, "_ENV_LOADED", True)
+    monkeypatch.setattr(llm_client, "_CLIENTS", {})
+    monkeypatch.setattr(llm_client, "_STATS", {})
+    monkeypatch.setattr(llm_client, "_PROVIDER_MODULES", {"groq": SimpleNamespace(Groq=FakeGroq)})
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("PROMETHEUS_LLM_HTTP_TIMEOUT", "7")
+    monkeypatch.setenv("PROMETHEUS_LLM_CACHE", "off")
+    return FakeGroq
+
+
+def test_one_pooled_client_per_process(groq):
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(get_groq_client())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert groq.created == 1
+    assert all(c is clients[0] for c in clients)
+    # The keep-alive HTTP client carries the configured timeout
+    assert clients[0].http_client.timeout.read == 7.0
+
+
+def test_missing_key_is_reported(groq, monkeypatch):
+    monkeypatch.delenv("GROQ_API_KEY")
+    with pytest.raises(RuntimeError, match="GROQ_API_KEY"):
+        get_groq_client()
+
+
+def test_agents_share_the_client_and_are_counted_apart(groq):
+    chat("research", "p1", temperature=0.2)
+    chat("critic", "p2", temperature=0.05, system="be brief")
+
+    async def concurrent():
+        return await asyncio.gather(*(achat("research", f"q{i}", temperature=0.2) for i in range(3)))
+
+    assert asyncio.run(concurrent()) == ["ok"] * 3
+
+    client = get_groq_client()
+    assert groq.created == 1 and len(client.requests) == 5
+    assert client.requests[1]["messages"][0] == {"role": "system", "content": "be brief"}
+    stats = llm_stats()
+    assert stats["research"]["calls"] == 4 and stats["critic"]["calls"] == 1
+    assert stats["research"]["prompt_tokens"] == 40 and stats["research"]["completion_tokens"] == 20
+
+
+def test_failed_calls_are_counted_and_raised(groq):
+    get_groq_client().fail = True
+    with pytest.raises(ConnectionError):
+        chat("judge", "p", temperature=0.0)
+    assert llm_stats()["judge"]["errors"] == 1
+
+
+def test_cache_hits_are_counted(groq, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_LLM_CACHE", "deterministic")
+    chat("judge", "p", temperature=0.0)
+    chat("judge", "p", temperature=0.0)
+    assert len(get_groq_client().requests) == 1
+    assert llm_stats()["judge"]["calls"] == 2 and llm_stats()["judge"]["cache_hits"] == 1
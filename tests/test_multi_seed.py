@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from src import multi_seed
+from src.agent_graph import evaluate_node
+from src.multi_seed import _bootstrap_split, evaluate_with_seeds
+from src.results_store import find_run
+from src.strategies import StrategyConfig
+
+LABELS = ["A", "B", "Unknown/Invalid", "C"]
+
+
+def _reference(y, proba, codes, labels, n_boot, seed):
+    """One resample at a time: accuracy, and the minimum over scored groups present in it."""
+    rng = np.random.default_rng(seed)
+    correct = (proba >= 0.5) == y
+    acc, wga = [], []
+    for _ in range(n_boot):
+        idx = rng.integers(0, len(y), size=len(y))
+        acc.append(correct[idx].mean())
+        group_accs = [correct[idx][codes[idx] == g].mean() for g, label in enumerate(labels)
+                      if "Unknown" not in label and (codes[idx] == g).any() and (codes == g).any()]
+        wga.append(min(group_accs))
+    return np.array(acc), np.array(wga)
+
+
+@pytest.fixture
+def split():
+    """30 rows: a large group, a 2-row group often missing from resamples, an excluded one, unlabeled rows."""
+    rng = np.random.default_rng(7)
+    codes = np.array([0] * 20 + [1] * 2 + [2] * 4 + [-1] * 4)
+    y = rng.integers(0, 2, size=len(codes))
+    proba = rng.random(len(codes))
+    return y, proba, codes
+
+
+@pytest.mark.parametrize("block_rows", [1, 45, 10 ** 6])
+def test_bootstrap_matches_reference(split, monkeypatch, block_rows):
+    # block_rows=1 draws one resample per block, 45 splits resamples across uneven blocks
+    monkeypatch.setattr(multi_seed, "BOOTSTRAP_BLOCK_ROWS", block_rows)
+    y, proba, codes = split
+    acc, wga = _bootstrap_split(y, proba, codes, LABELS, 50, np.random.default_rng(3))
+    ref_acc, ref_wga = _reference(y, proba, codes, LABELS, 50, seed=3)
+    np.testing.assert_allclose(acc, ref_acc)
+    np.testing.assert_allclose(wga, ref_wga)
+
+
+def test_bootstrap_without_scored_groups_uses_accuracy(split):
+    y, proba, _ = split
+    codes = np.zeros(len(y), dtype=np.int8)
+    acc, wga = _bootstrap_split(y, proba, codes, ["Unknown"], 20, np.random.default_rng(0))
+    np.testing.assert_array_equal(acc, wga)
+
+
+def test_seed_free_config_is_bootstrapped(dataset):
+    config = StrategyConfig(name="plain")
+    (agg,) = evaluate_with_seeds([config], n_seeds=3, n_workers=1)
+
+    u = agg["uncertainty"]
+    assert u["method"] == "bootstrap" and u["ood_accuracy"]["n"] == multi_seed.DEFAULT_BOOTSTRAP
+    assert u["ood_accuracy"]["se"] > 0
+    # Stored apart from the base run, which keeps its own name
+    assert agg["config"]["name"] == "plain+boot"
+    assert find_run(agg["fingerprint"])["config"]["name"] == "plain+boot"
+    assert evaluate_with_seeds([config], n_seeds=3, n_workers=1)[0]["fingerprint"] == agg["fingerprint"]
+
+
+def test_seeded_config_gets_replicas(dataset):
+    (agg,) = evaluate_with_seeds([StrategyConfig(name="half", sample_frac=0.5)], n_seeds=3, n_workers=1)
+    assert agg["config"]["name"] == "half+seeds"
+    assert agg["uncertainty"]["method"] == "seeds"
+    assert agg["uncertainty"]["ood_accuracy"]["n"] == 3
+
+
+def test_unsaved_seed_free_config_is_rejected(dataset):
+    with pytest.raises(ValueError, match="save=True"):
+        evaluate_with_seeds([StrategyConfig(name="plain")], n_seeds=3, save=False)
+
+
+def test_evaluate_node_keeps_selected_run(dataset):
+    selected = evaluate_with_seeds([StrategyConfig(name="half", sample_frac=0.5)], n_seeds=2, n_workers=1)[0]
+    # Other stored runs do not displace the selection, whatever their OOD accuracy
+    evaluate_with_seeds([StrategyConfig(name="plain")], n_seeds=2, n_workers=1)
+    state = evaluate_node({"best_run": selected})
+    assert state["best_run"] is selected
+    assert len(state["all_runs"]) == 4
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from src import parallel
+from src.parallel import resolve_workers, run_experiments_parallel
+from src.selection import select_best
+from src.strategies import StrategyConfig
+
+
+def _run(name: str, ood: float, wga: float) -> dict:
+    return {"config": {"name": name}, "id": {"accuracy": 0.7},
+            "ood": {"accuracy": ood, "worst_group_accuracy": wga}}
+
+
+def test_resolve_workers(monkeypatch):
+    monkeypatch.setattr(parallel, "DEFAULT_WORKERS", 3)
+    monkeypatch.setattr(parallel.os, "cpu_count", lambda: 8)
+    assert resolve_workers(None) == 3
+    assert resolve_workers(2) == 2
+    assert resolve_workers(0) == resolve_workers(-1) == 8
+
+
+_run_config = parallel._run_config
+
+
+def _slow_first(cfg_dict, **kwargs):
+    """parallel._run_config, with the first config finishing last (module level: sent to workers)."""
+    if cfg_dict["name"] == "slow":
+        time.sleep(0.5)
+    return _run_config(cfg_dict, **kwargs)
+
+
+def test_results_follow_config_order(dataset, monkeypatch):
+    configs = [StrategyConfig(name="slow", l2_C=0.1),
+               StrategyConfig(name="fast", sample_frac=0.3, seed=1),
+               StrategyConfig(name="fast_again", sample_frac=0.3, seed=1),
+               StrategyConfig(name="mid", class_weight="balanced")]
+    monkeypatch.setattr(parallel, "_run_config", _slow_first)
+    results = run_experiments_parallel(configs, n_workers=3, save=False)
+
+    assert [r["config"]["name"] for r in results] == ["slow", "fast", "fast", "mid"]
+    # Same fingerprint: trained once, the result object is shared
+    assert results[1] is results[2]
+    serial = run_experiments_parallel([configs[0], configs[3]], n_workers=1, save=False)
+    for r, s in zip((results[0], results[3]), serial):
+        assert r["ood"]["accuracy"] == pytest.approx(s["ood"]["accuracy"])
+
+
+def test_select_best_folds_in_list_order():
+    a, b = _run("a", 0.70, 0.60), _run("b", 0.70, 0.6005)
+    # b is not better than a by min_imp, so the first in list order wins either way
+    assert select_best([a, b]) is a
+    assert select_best([b, a]) is b
+    # Runs under the baseline floor never displace the incumbent, nor become the first best
+    floor = _run("floor", 0.50, 0.40)
+    assert select_best([floor]) is None
+    assert select_best([floor], a) is a
+    assert select_best([a, _run("c", 0.72, 0.70)])["config"]["name"] == "c"
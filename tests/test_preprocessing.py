@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from src.preprocessing import compact_splits, encode_labels
+
+
+@pytest.mark.parametrize("y, expected", [
+    (pd.Series(["NO", "<30", ">30", "NO"]), [0, 1, 1, 0]),
+    (pd.Series(["NO", "<30", None], dtype="category"), [0, 1, 1]),
+    (pd.Series([0, 1, 1, 0]), [0, 1, 1, 0]),
+    (pd.Series([0.0, 1.0]), [0, 1]),
+    (pd.Series([False, True]), [0, 1]),
+])
+def test_encode_labels(y, expected):
+    out = encode_labels(y)
+    assert out.dtype == np.int8
+    assert out.tolist() == expected
+    pdt.assert_index_equal(out.index, y.index)
+
+
+def test_encode_labels_idempotent():
+    once = encode_labels(pd.Series(["NO", ">30", "<30"]))
+    pdt.assert_series_equal(encode_labels(once), once)
+
+
+def _splits(labels):
+    def frame(n, offset):
+        return pd.DataFrame({
+            "race": np.array(["A", "B", "C"], dtype=object)[(np.arange(n) + offset) % 3],
+            "count": np.arange(n, dtype=np.int64) * (300 if offset == 2 else 1),
+            "score": np.linspace(0, 1, n),
+        })
+    sizes = (6, 4, 3)
+    return tuple(part for i, n in enumerate(sizes)
+                 for part in (frame(n, i), pd.Series(labels[:n])))
+
+
+@pytest.mark.parametrize("labels", [["NO", "<30", ">30", "NO", "NO", ">30"], [0, 1, 1, 0, 0, 1]])
+def test_compact_splits_idempotent(labels):
+    once = compact_splits(_splits(labels))
+    twice = compact_splits(once)
+    for a, b in zip(once, twice):
+        if isinstance(a, pd.DataFrame):
+            pdt.assert_frame_equal(a, b)
+        else:
+            pdt.assert_series_equal(a, b)
+
+    X_train, y_train, X_id, _, X_ood, _ = once
+    assert y_train.dtype == np.int8 and y_train.tolist() == [0, 1, 1, 0, 0, 1]
+    # One category set across parts, integers sized for every part's values
+    assert X_train["race"].dtype == X_id["race"].dtype == X_ood["race"].dtype
+    assert X_train["count"].dtype == X_ood["count"].dtype == np.int16
+    assert X_ood["count"].tolist() == [0, 300, 600]
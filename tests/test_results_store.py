@@ -0,0 +1,119 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src import agent_graph, results_store
+from src.analyze_results import rank_by_ood_accuracy
+from src.results_store import (connect, leaderboard, load_all_runs, pareto_front, run_stats, save_run,
+                               sync_run_files, top_runs)
+from src.selection import run_score
+
+
+def _run(name: str, ood: float, wga: float, id_acc: float = 0.7) -> dict:
+    return {"config": {"name": name}, "fingerprint": name,
+            "id": {"accuracy": id_acc}, "ood": {"accuracy": ood, "worst_group_accuracy": wga}}
+
+
+def _write(workdir, run: dict):
+    path = workdir / f"run_{run['config']['name']}.json"
+    path.write_text(json.dumps(run))
+    return path
+
+
+@pytest.fixture
+def runs(workdir):
+    """Random runs, some under the baseline floor (run_score -1), written as run files."""
+    rng = np.random.default_rng(0)
+    out = [_run(f"r{i}", ood=round(rng.uniform(0.5, 0.8), 3), wga=round(rng.uniform(0.4, 0.7), 3))
+           for i in range(40)]
+    for run in out:
+        _write(workdir, run)
+    return out
+
+
+def _names(records):
+    return [r["config"]["name"] for r in records]
+
+
+def test_queries_match_a_full_scan(runs):
+    # Same order as ranking every stored run in Python, ties included
+    by_ood = rank_by_ood_accuracy(load_all_runs())
+    assert _names(top_runs("ood_accuracy", limit=5)) == _names(by_ood[:5])
+    assert _names(top_runs("ood_accuracy")) == _names(by_ood)
+
+    scored = sorted(load_all_runs(), key=lambda r: (run_score(r), r["ood"]["worst_group_accuracy"]),
+                    reverse=True)
+    board = leaderboard(k=7)
+    assert _names(board) == _names(scored[:7])
+    assert [r["_score"] for r in board] == pytest.approx([run_score(r) for r in scored[:7]])
+
+    points = {r["config"]["name"]: (r["ood"]["worst_group_accuracy"], r["ood"]["accuracy"]) for r in runs}
+    front = {name for name, (wga, ood) in points.items()
+             if not any(w >= wga and o >= ood and (w, o) != (wga, ood) for w, o in points.values())}
+    assert set(_names(pareto_front())) == front
+
+    ood = np.array([r["ood"]["accuracy"] for r in runs])
+    stats = run_stats()["ood_accuracy"]
+    assert stats["n"] == len(runs)
+    assert stats["mean"] == pytest.approx(ood.mean())
+    assert stats["std"] == pytest.approx(ood.std(), abs=1e-6)
+    assert (stats["min"], stats["max"]) == (ood.min(), ood.max())
+
+
+def test_top_runs_rejects_unindexed_columns(workdir):
+    with pytest.raises(ValueError, match="Cannot rank by"):
+        top_runs("name")
+
+
+def test_sync_picks_up_changed_and_deleted_files(runs, workdir):
+    assert len(load_all_runs()) == len(runs)
+    best = top_runs("ood_accuracy", limit=1)[0]
+
+    # The best run's file is deleted; another is rewritten with a new top score
+    os.remove(best["_path"])
+    rewritten = _write(workdir, _run("r3", ood=0.99, wga=0.99))
+    os.utime(rewritten, ns=(0, rewritten.stat().st_mtime_ns + 10 ** 9))
+    conn = connect()
+    try:
+        assert sync_run_files(conn) == 2
+        assert sync_run_files(conn) == 0
+    finally:
+        conn.close()
+
+    assert len(load_all_runs()) == len(runs) - 1
+    assert _names(top_runs("ood_accuracy", limit=1)) == ["r3"]
+    assert _names(pareto_front()) == ["r3"]
+    assert run_stats()["ood_accuracy"]["n"] == len(runs) - 1
+
+
+def test_first_query_syncs_once_per_process(runs, workdir):
+    assert len(top_runs("ood_accuracy")) == len(runs)
+    _write(workdir, _run("late", ood=0.99, wga=0.99))
+    # Files copied in later are picked up by the next explicit sync, not every query
+    assert len(top_runs("ood_accuracy")) == len(runs)
+    results_store._SYNCED.clear()
+    assert _names(top_runs("ood_accuracy", limit=1)) == ["late"]
+
+
+def test_saved_runs_are_indexed_without_a_rescan(workdir):
+    path = _write(workdir, _run("a", ood=0.6, wga=0.55))
+    assert _names(load_all_runs()) == ["a"]
+    save_run(_run("b", ood=0.7, wga=0.6), path=workdir / "run_b.json")
+    assert _names(top_runs("ood_accuracy")) == ["b", "a"]
+    # Saving to an existing path replaces its row
+    save_run(_run("a", ood=0.8, wga=0.6), path=path)
+    assert _names(top_runs("ood_accuracy")) == ["a", "b"]
+
+
+def test_graph_nodes_keep_only_the_top_runs(runs, monkeypatch):
+    monkeypatch.setattr(agent_graph, "STATE_RUNS", 3)
+    state = agent_graph.load_results_node({})
+    by_ood = rank_by_ood_accuracy(load_all_runs())
+    assert _names(state["all_runs"]) == _names(by_ood[:3])
+    assert state["best_run"]["config"]["name"] == by_ood[0]["config"]["name"]
+
+    kept = _run("selected", ood=0.6, wga=0.6)
+    state = agent_graph.evaluate_node({"best_run": kept})
+    assert state["best_run"] is kept and len(state["all_runs"]) == 3
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from src import results_store, results_text
+from src.results_store import save_run
+from src.results_text import results_to_text
+
+
+def _save(workdir, name: str, ood: float, wga: float):
+    run = {"config": {"name": name}, "fingerprint": name,
+           "id": {"accuracy": 0.72}, "ood": {"accuracy": ood, "worst_group_accuracy": wga}}
+    path = workdir / f"run_{name}.json"
+    path.write_text(json.dumps(run))  # as run_experiment does: the file, then its row
+    save_run(run, path=path)
+
+
+def _section(text: str, title: str):
+    """Strategy names of the table under a heading."""
+    lines = text.split(title, 1)[1].split("\n\n", 1)[0].splitlines()[3:]
+    return [line.split("|")[1].strip() for line in lines]
+
+
+def test_no_runs(workdir):
+    assert results_to_text() == "No experiment results available yet."
+
+
+def test_prompt_block_is_bounded(workdir):
+    for i in range(60):
+        _save(workdir, f"r{i:02d}", ood=0.60 + i * 0.001, wga=0.55 + (i % 7) * 0.01)
+    text = results_to_text(top_k=4, pareto_limit=2)
+
+    assert "### Top 4 of 60 runs by score" in text
+    assert len(_section(text, "by score")) == 4
+    assert len(_section(text, "OOD accuracy)")) == 2
+    assert "n=60" in text
+    # Independent of the number of runs
+    assert len(text) < 2000
+
+
+def test_new_runs_update_the_leaderboard(workdir, monkeypatch):
+    _save(workdir, "first", ood=0.62, wga=0.56)
+    assert _section(results_to_text(), "by score") == ["first"]
+
+    # Runs saved later are folded in as they are written, without a rescan
+    scans = []
+    monkeypatch.setattr(results_store, "sync_run_files", lambda conn: scans.append(conn) or 0)
+    _save(workdir, "better", ood=0.65, wga=0.62)
+    text = results_to_text()
+    assert not scans
+    assert _section(text, "by score") == ["better", "first"]
+    assert _section(text, "OOD accuracy)") == ["better"]
+    assert "### Top 2 of 2 runs" in text
+
+
+@pytest.mark.parametrize("wga, shown", [(None, "n/a"), (0.61, "0.610")])
+def test_rows_show_missing_worst_group(workdir, wga, shown):
+    run = {"config": {"name": "x"}, "id": {"accuracy": 0.7}, "ood": {"accuracy": 0.6, "worst_group_accuracy": wga}}
+    assert results_text._run_row(run).split("|")[5].strip() == shown
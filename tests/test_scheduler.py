@@ -0,0 +1,69 @@
+import pytest
+
+from src import scheduler
+from src.results_store import load_schedule
+from src.scheduler import successive_halving
+from src.strategies import StrategyConfig
+
+# Final OOD / worst-group accuracy of each config; partial fits score a bit lower
+QUALITY = {"a": 0.60, "b": 0.70, "c": 0.65, "d": 0.62, "e": 0.68, "f": 0.55, "g": 0.66, "h": 0.61, "i": 0.64}
+
+
+class FakeRuns:
+    """Stands in for run_experiments_parallel: records every rung's configs."""
+
+    def __init__(self):
+        self.rungs = []
+
+    def __call__(self, configs, n_workers=None, save=True):
+        self.rungs.append(([cfg.name for cfg in configs], [cfg.sample_frac for cfg in configs], save))
+        runs = []
+        for cfg in configs:
+            q = QUALITY[cfg.name.split("@")[0]] - 0.05 * (1.0 - cfg.sample_frac)
+            runs.append({"config": {"name": cfg.name}, "id": {"accuracy": 0.7},
+                         "ood": {"accuracy": q, "worst_group_accuracy": q}})
+        return runs
+
+
+@pytest.fixture
+def fake_runs(workdir, monkeypatch):
+    fake = FakeRuns()
+    monkeypatch.setattr(scheduler, "run_experiments_parallel", fake)
+    return fake
+
+
+def test_halving_keeps_the_top_third_per_rung(fake_runs):
+    configs = [StrategyConfig(name=name, sample_frac=0.5) for name in QUALITY]
+    final = successive_halving(configs, budgets=(0.1, 0.3, 1.0), eta=3, schedule_id="s")
+
+    (names0, fracs0, save0), (names1, fracs1, save1), (names2, fracs2, save2) = fake_runs.rungs
+    assert len(names0) == 9 and fracs0 == [pytest.approx(0.05)] * 9 and not save0
+    # Budgets scale each config's own sample_frac; only the full fit is saved
+    assert sorted(names1) == ["b@0.3", "e@0.3", "g@0.3"] and fracs1 == [pytest.approx(0.15)] * 3 and not save1
+    assert names2 == ["b"] and fracs2 == [0.5] and save2
+    assert [r["config"]["name"] for r in final] == ["b"]
+
+    events = load_schedule("s")
+    assert [e["rung"] for e in events] == [0] * 9 + [1] * 3 + [2]
+    assert sum(not e["eliminated"] for e in events if e["rung"] == 0) == 3
+    assert [e["config_name"] for e in events if e["rung"] == 1 and not e["eliminated"]] == ["b"]
+    assert not events[-1]["eliminated"]
+
+
+def test_survivors_come_back_in_proposal_order(fake_runs):
+    configs = [StrategyConfig(name=name) for name in ("a", "e", "b", "c")]
+    final = successive_halving(configs, budgets=(0.5, 1.0), eta=2)
+    # b beats e, but e was proposed first
+    assert [r["config"]["name"] for r in final] == ["e", "b"]
+
+
+def test_single_config_skips_to_the_full_fit(fake_runs):
+    final = successive_halving([StrategyConfig(name="a")])
+    assert [rung[0] for rung in fake_runs.rungs] == [["a"]]
+    assert final[0]["config"]["name"] == "a"
+    assert successive_halving([]) == []
+
+
+def test_last_budget_must_be_a_full_fit(fake_runs):
+    with pytest.raises(ValueError, match="last budget"):
+        successive_halving([StrategyConfig(name="a"), StrategyConfig(name="b")], budgets=(0.1, 0.5))
@@ -0,0 +1,88 @@
+import functools
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from src import split_cache
+from src.split_cache import SPLIT_PARTS, clear_split_cache, get_splits, split_key
+from tests.conftest import use_dataset
+
+
+@pytest.fixture
+def source(synthetic_csvs, workdir, monkeypatch):
+    """A private copy of the diabetes extract (it gets edited), with make_splits calls counted."""
+    csv = workdir / "diabetes.csv"
+    shutil.copy(synthetic_csvs["diabetes"], csv)
+    ds = use_dataset(monkeypatch, "diabetes", csv)
+    calls = []
+    make_splits = ds.make_splits
+
+    @functools.wraps(make_splits)  # keeps the signature split_key binds against
+    def counted(**kwargs):
+        calls.append(kwargs)
+        return make_splits(**kwargs)
+
+    monkeypatch.setattr(ds, "make_splits", counted)
+    return ds, csv, calls
+
+
+def _touch(path, seconds: int = 10):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 10 ** 9))
+
+
+def test_disk_cache_serves_a_new_process(source):
+    ds, _, calls = source
+    first = get_splits(ds)
+    clear_split_cache()  # a fresh process: empty memo, warm disk
+    second = get_splits(ds)
+    assert len(calls) == 1
+    for a, b in zip(first, second):
+        pd.testing.assert_frame_equal(pd.DataFrame(a), pd.DataFrame(b))
+
+
+@pytest.mark.parametrize("edit", ["mtime", "size"])
+def test_edited_source_invalidates_splits(source, edit):
+    ds, csv, calls = source
+    key = split_key(ds)
+    n_train = len(get_splits(ds)[0])
+    if edit == "mtime":
+        _touch(csv)
+    else:
+        # Drop the last rows, keeping the mtime: only the size changes
+        st = csv.stat()
+        lines = csv.read_text().splitlines(keepends=True)
+        csv.write_text("".join(lines[:-300]))
+        os.utime(csv, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    assert split_key(ds) != key
+    splits = get_splits(ds)
+    assert len(calls) == 2
+    assert (len(splits[0]) < n_train) == (edit == "size")
+
+
+def test_split_params_are_part_of_the_key(source):
+    ds, _, calls = source
+    assert split_key(ds) == split_key(ds, random_state=42)  # the make_splits default
+    assert split_key(ds, random_state=1) != split_key(ds)
+    get_splits(ds)
+    get_splits(ds, random_state=42)
+    get_splits(ds, random_state=1)
+    assert calls == [{}, {"random_state": 1}]
+
+
+def test_corrupt_cache_is_rebuilt(source):
+    ds, _, calls = source
+    get_splits(ds)
+    cache_dir = split_cache.CACHE_DIR / split_key(ds)
+    part = next(p for p in cache_dir.iterdir() if p.stem == SPLIT_PARTS[0])
+    part.write_bytes(b"truncated")
+    clear_split_cache()
+
+    X_train = get_splits(ds)[0]
+    assert len(calls) == 2 and len(X_train) > 0
+    clear_split_cache()
+    get_splits(ds)
+    assert len(calls) == 2  # the rebuilt cache is readable
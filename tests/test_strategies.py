@@ -0,0 +1,36 @@
+from dataclasses import dataclass
+
+from src.strategies import StrategyConfig, config_fingerprint, config_params
+
+SPLIT = "diabetes-abc"
+
+
+@dataclass
+class _ConfigWithNewField(StrategyConfig):
+    """A StrategyConfig as it would look after adding a defaulted field."""
+    new_knob: int = 0
+
+
+def test_fingerprint_is_pinned():
+    # Stored runs are looked up by these values; a change here orphans them
+    assert config_fingerprint(StrategyConfig(name="x"), SPLIT) == "dfdb4ed21c106c6f"
+    assert config_fingerprint(StrategyConfig(name="x", l2_C=0.5, use_group_dro=True), SPLIT) == "2c8dec47aa00be5b"
+
+
+def test_new_default_field_keeps_fingerprint():
+    for kwargs in ({}, {"l2_C": 0.5}, {"use_group_dro": True, "sample_frac": 0.5}):
+        old = StrategyConfig(name="x", **kwargs)
+        new = _ConfigWithNewField(name="x", **kwargs)
+        assert config_fingerprint(new, SPLIT) == config_fingerprint(old, SPLIT)
+    assert config_fingerprint(_ConfigWithNewField(name="x", new_knob=1), SPLIT) != \
+        config_fingerprint(StrategyConfig(name="x"), SPLIT)
+
+
+def test_fingerprint_ignores_name_but_not_split():
+    a, b = StrategyConfig(name="a"), StrategyConfig(name="b")
+    assert config_fingerprint(a, SPLIT) == config_fingerprint(b, SPLIT)
+    assert config_fingerprint(a, SPLIT) != config_fingerprint(a, "diabetes-def")
+
+
+def test_config_params_drop_defaults():
+    assert config_params(StrategyConfig(name="x", model="logreg", l2_C=2.0)) == {"l2_C": 2.0}
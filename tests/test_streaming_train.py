@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from src.array_store import load_split_arrays
+from src.run_experiment import run_experiment
+from src.split_cache import split_key
+from src.strategies import StrategyConfig, config_fingerprint
+from src.streaming_train import run_streaming_experiment
+
+
+def test_streaming_runs_on_each_dataset(dataset):
+    config = StrategyConfig(name="stream", streaming=True, seed=0, class_weight="balanced")
+    fp = config_fingerprint(config, split_key(dataset))
+    # Small batches, so train and both test parts span several of them
+    result = run_streaming_experiment(config, fp, batch_rows=256, epochs=2)
+
+    for part in ("id", "ood"):
+        assert 0.0 <= result[part]["accuracy"] <= 1.0
+        assert result[part]["group_accuracy"]
+    # Meta columns are the ones the dataset has: COMPAS has no er_flag
+    arrays = load_split_arrays(result["arrays"]["split"])
+    meta = {key for key in arrays if key.startswith("meta_")}
+    expected = {"meta_sex_id", "meta_sex_ood"}
+    if dataset.name == "diabetes":
+        expected |= {"meta_er_flag_id", "meta_er_flag_ood"}
+    assert meta == expected
+
+
+def test_streaming_subsample_is_reproducible(dataset):
+    config = StrategyConfig(name="stream", streaming=True, seed=3, sample_frac=0.5)
+    fp = config_fingerprint(config, split_key(dataset))
+    first = run_streaming_experiment(config, fp, save=False, batch_rows=512, epochs=2)
+    again = run_streaming_experiment(config, fp, save=False, batch_rows=512, epochs=2)
+    assert first["ood"]["accuracy"] == again["ood"]["accuracy"]
+    assert first["ood"]["auc"] == again["ood"]["auc"]
+
+
+def test_streaming_linear_engines_share_fingerprint():
+    fps = {config_fingerprint(StrategyConfig(name=m, streaming=True, model=m), "split")
+           for m in ("logreg", "sgd")}
+    assert len(fps) == 1
+    # In memory the two engines are different models
+    assert (config_fingerprint(StrategyConfig(name="a", model="logreg"), "split")
+            != config_fingerprint(StrategyConfig(name="b", model="sgd"), "split"))
+
+
+def test_streaming_reuses_run_across_linear_engine_names(dataset):
+    first = run_experiment(StrategyConfig(name="a", streaming=True, seed=0, model="sgd"))
+    again = run_experiment(StrategyConfig(name="b", streaming=True, seed=0, model="logreg"))
+    assert again["fingerprint"] == first["fingerprint"]
+    assert "_path" in again
+
+
+def test_streaming_rejects_non_linear_engine(dataset):
+    config = StrategyConfig(name="gb", streaming=True, model="hist_gb")
+    with pytest.raises(ValueError, match="linear engine"):
+        run_streaming_experiment(config, "0" * 16, save=False)
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from src.threshold_sweep import _sweep_arrays, best_threshold_policy, row_thresholds
+
+GRID = np.array([0.0, 0.25, 0.5, 0.75, 1.0])
+
+
+@pytest.fixture
+def stored():
+    """
+    Predictions as load_predictions returns them. Probabilities sit on grid
+    points (>= must count them as positive), some rows have no group (-1),
+    and group "C" has rows on ID but none on OOD.
+    """
+    labels = ["A", "B", "C", "Unknown/Invalid"]
+    #                   A    A     A    B    B     B    C     C    U    -
+    id_codes = np.array([0, 0, 0, 1, 1, 1, 2, 2, 3, -1], dtype=np.int8)
+    id_proba = np.array([0.25, 0.5, 0.75, 0.5, 0.75, 1.0, 0.0, 0.6, 0.9, 0.9])
+    y_id = np.array([0, 1, 1, 0, 0, 1, 0, 1, 0, 1])
+    ood_codes = np.array([0, 0, 1, 1, 3, -1, -1], dtype=np.int8)
+    ood_proba = np.array([0.5, 0.2, 0.75, 0.3, 0.1, 0.8, 0.2])
+    y_ood = np.array([1, 0, 1, 0, 1, 1, 0])
+    return {"labels": {"groups_id": labels, "groups_ood": labels},
+            "y_id": y_id, "id_proba": id_proba, "groups_id": id_codes,
+            "y_ood": y_ood, "ood_proba": ood_proba, "groups_ood": ood_codes}
+
+
+def _accuracy(y, proba, rows, grid=GRID):
+    return np.array([np.mean((proba[rows] >= t) == y[rows]) for t in grid])
+
+
+@pytest.mark.parametrize("part", ["id", "ood"])
+def test_sweep_counts_rows_on_the_threshold_as_positive(stored, part):
+    sweep = _sweep_arrays(stored, GRID)[part]
+    y, proba, codes = stored[f"y_{part}"], stored[f"{part}_proba"], stored[f"groups_{part}"]
+    for g in np.unique(codes[codes >= 0]):
+        np.testing.assert_allclose(sweep["group_accuracy"][g], _accuracy(y, proba, codes == g))
+    # Rows without a group are left out of every count
+    np.testing.assert_allclose(sweep["accuracy"], _accuracy(y, proba, codes >= 0))
+    assert sweep["size"].sum() == (codes >= 0).sum()
+
+
+def test_unsorted_grid_gives_the_sorted_sweep(stored):
+    shuffled = GRID[[3, 0, 4, 1, 2]]
+    a, b = _sweep_arrays(stored, GRID), _sweep_arrays(stored, shuffled)
+    np.testing.assert_array_equal(b["grid"], GRID)
+    for part in ("id", "ood"):
+        np.testing.assert_allclose(b[part]["group_accuracy"], a[part]["group_accuracy"])
+    np.testing.assert_allclose(b["gap"], a["gap"])
+    assert best_threshold_policy(b) == best_threshold_policy(a)
+
+
+def test_empty_group_is_not_eligible(stored):
+    ood = _sweep_arrays(stored, GRID)["ood"]
+    assert ood["size"].tolist() == [2, 2, 0, 1]
+    # "C" has no OOD rows and "Unknown/Invalid" is excluded by name
+    assert ood["eligible"].tolist() == [True, True, False, False]
+    worst = np.minimum(_accuracy(stored["y_ood"], stored["ood_proba"], stored["groups_ood"] == 0),
+                       _accuracy(stored["y_ood"], stored["ood_proba"], stored["groups_ood"] == 1))
+    np.testing.assert_allclose(ood["worst_group_accuracy"], worst)
+
+    policy = best_threshold_policy(_sweep_arrays(stored, GRID), select_on="ood", objective="accuracy")
+    assert policy["kind"] == "per_group" and "C" not in policy["thresholds"]
+
+
+def test_per_group_thresholds_take_the_first_best(stored):
+    policy = best_threshold_policy(_sweep_arrays(stored, GRID), objective="accuracy")
+    # A: 0.25 is negative, 0.5 and 0.75 positive -> (0.25, 0.5] is perfect; first grid point is 0.5.
+    # B: only 1.0 is positive -> 0.75 misclassifies it, 1.0 is perfect.
+    assert policy["kind"] == "per_group"
+    assert policy["thresholds"]["A"] == 0.5 and policy["thresholds"]["B"] == 1.0
+    assert policy["thresholds"]["C"] == 0.25
+
+
+def test_unknown_objective_is_rejected(stored):
+    with pytest.raises(ValueError, match="Unknown objective"):
+        best_threshold_policy(_sweep_arrays(stored, GRID), objective="auc")
+
+
+def test_row_thresholds_default_to_global():
+    policy = {"kind": "per_group", "global_threshold": 0.5, "thresholds": {"A": 0.3}}
+    np.testing.assert_allclose(row_thresholds(policy, np.array([0, 1, -1]), ["A", "B"]), [0.3, 0.5, 0.5])
+    policy["kind"] = "global"
+    np.testing.assert_allclose(row_thresholds(policy, np.array([0, 1, -1]), ["A", "B"]), [0.5] * 3)